@@ -2,16 +2,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
+from data.constants import ANALYTICS_DATA_VERSIONS
 from departments.models import Department
 from documents.models import Document
 from news_articles.models import NewsArticle
 from officers.models import Officer
-from utils.cache_utils import custom_cache
+from utils.cache_utils import custom_cache, get_summary_cache_tags
+from utils.data_version import versioned_cache_control
 
 
 class AnalyticsViewSet(ViewSet):
     @action(detail=False, methods=["get"], url_path="summary")
-    @custom_cache
+    @versioned_cache_control(ANALYTICS_DATA_VERSIONS)
+    @custom_cache(tags=get_summary_cache_tags)
     def summary(self, request):
         summary_data = {
             "documents_count": Document.objects.count(),
@@ -2,9 +2,10 @@ from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
 from appeals.models import Appeal
+from utils.data_version import RowFingerprintAdminMixin
 
 
-class AppealAdmin(ModelAdmin):
+class AppealAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = ("id", "appeal_uid", "created_at", "updated_at")
     search_fields = (
         "id",
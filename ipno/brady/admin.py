@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from utils.data_version import RowFingerprintAdminMixin
+
 from .models import Brady
 
 
-class BradyAdmin(ModelAdmin):
+class BradyAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = ("id", "brady_uid", "created_at", "updated_at")
     search_fields = (
         "brady_uid",
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.13 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("brady", "0002_make_brady_uid_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="brady",
+            name="row_fingerprint",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
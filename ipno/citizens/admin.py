@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from utils.data_version import RowFingerprintAdminMixin
+
 from .models import Citizen
 
 
-class CitizenAdmin(ModelAdmin):
+class CitizenAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = ("id", "citizen_uid", "created_at", "updated_at")
     search_fields = ("citizen_uid",)
     raw_id_fields = ("department",)
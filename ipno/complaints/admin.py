@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
 from complaints.models import Complaint
+from utils.data_version import RowFingerprintAdminMixin
 
 
 class EventInlineAdmin(admin.TabularInline):
@@ -11,7 +12,7 @@ class EventInlineAdmin(admin.TabularInline):
     raw_id_fields = ("event",)
 
 
-class ComplaintAdmin(ModelAdmin):
+class ComplaintAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = ("id", "allegation_uid", "created_at", "updated_at")
     search_fields = (
         "tracking_id",
@@ -114,13 +114,6 @@ MIDDLEWARE = [
     "django_structlog.middlewares.RequestMiddleware",
 ]
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
-        "LOCATION": "ipno_cache_table",
-    }
-}
-
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -294,6 +287,29 @@ if USE_SENTINEL_REDIS:
         "sentinel_kwargs": {"password": REDIS_SENTINEL_PASSWORD},
     }
 
+# Responses are cached in the Redis used by Celery, in another database, and
+# the recently used ones in the memory of each worker.
+CACHES = {
+    "default": {
+        "BACKEND": "utils.tiered_cache.TieredCache",
+        "LOCATION": env.str("CACHE_REDIS_URL", CELERY_BROKER_URL),
+        "KEY_PREFIX": "ipno",
+        "OPTIONS": {
+            "DB": env.int("CACHE_REDIS_DB", 1),
+            "LOCAL_MAX_BYTES": env.int("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024),
+            "LOCAL_TIMEOUT": env.int("CACHE_LOCAL_TIMEOUT", 10),
+        },
+    }
+}
+
+if USE_SENTINEL_REDIS:
+    CACHES["default"]["OPTIONS"].update(
+        {
+            "SENTINEL_MASTER_NAME": REDIS_SENTINEL_MASTER_NAME,
+            "SENTINEL_KWARGS": {"password": REDIS_SENTINEL_PASSWORD},
+        }
+    )
+
 ENVIRONMENT = os.environ.get("DJANGO_SETTINGS_MODULE").split(".")[-1]
 
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN", "")
@@ -303,4 +319,26 @@ SCHEMA_BUCKET_NAME = "llead-schema"
 
 CSV_DATA_PATH = "./ipno/csv_data"
 
+DATA_IMPORTER_MAX_WORKERS = env.int("DATA_IMPORTER_MAX_WORKERS", 4)
+DATA_IMPORTER_STAGED = env.bool("DATA_IMPORTER_STAGED", False)
+DOCUMENT_TRANSFER_MAX_WORKERS = env.int("DOCUMENT_TRANSFER_MAX_WORKERS", 8)
+DOCUMENT_TRANSFER_CONNECT_TIMEOUT = env.int("DOCUMENT_TRANSFER_CONNECT_TIMEOUT", 10)
+DOCUMENT_TRANSFER_READ_TIMEOUT = env.int("DOCUMENT_TRANSFER_READ_TIMEOUT", 60)
+DOCUMENT_PREVIEW_MAX_WORKERS = env.int("DOCUMENT_PREVIEW_MAX_WORKERS", 2)
+DOCUMENT_PREVIEW_CACHE_PATH = env.str(
+    "DOCUMENT_PREVIEW_CACHE_PATH", "/tmp/document_previews"
+)
+DOCUMENT_PREVIEW_CACHE_MAX_SIZE = env.int(
+    "DOCUMENT_PREVIEW_CACHE_MAX_SIZE", 1024 * 1024 * 1024
+)
+DOCUMENT_OCR_MAX_WORKERS = env.int("DOCUMENT_OCR_MAX_WORKERS", 8)
+API_PRE_WARMER_MAX_WORKERS = env.int("API_PRE_WARMER_MAX_WORKERS", 4)
+API_PRE_WARMER_OFFICERS_LIMIT = env.int("API_PRE_WARMER_OFFICERS_LIMIT", 1000)
+DOCUMENT_OCR_TEXT_CACHE_PATH = env.str(
+    "DOCUMENT_OCR_TEXT_CACHE_PATH", "/tmp/document_ocr_texts"
+)
+DOCUMENT_OCR_TEXT_CACHE_MAX_SIZE = env.int(
+    "DOCUMENT_OCR_TEXT_CACHE_MAX_SIZE", 512 * 1024 * 1024
+)
+
 IPNO_API_KEY = env.str("IPNO_API_KEY", default="")
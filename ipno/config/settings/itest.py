@@ -17,6 +17,13 @@ ELASTICSEARCH_DSL = {
     },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "ipno_cache_table",
+    }
+}
+
 DATABASES = {
     "default": {
         "ENGINE": "django_db_geventpool.backends.postgresql_psycopg2",
@@ -19,6 +19,21 @@ GC_RAW_DATA_BUCKET_PATH = f"https://storage.googleapis.com/{RAW_DATA_BUCKET_NAME
 
 HOST = "http://localhost:8080"
 
+DATA_IMPORTER_MAX_WORKERS = 1
+DOCUMENT_TRANSFER_MAX_WORKERS = 1
+DOCUMENT_PREVIEW_MAX_WORKERS = 0
+DOCUMENT_PREVIEW_CACHE_PATH = None
+DOCUMENT_OCR_MAX_WORKERS = 1
+API_PRE_WARMER_MAX_WORKERS = 1
+DOCUMENT_OCR_TEXT_CACHE_PATH = None
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "ipno_cache_table",
+    }
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+from django.urls import get_resolver
+
+import structlog
+
+from utils.cache_utils import get_cache_stats
+
+logger = structlog.get_logger("IPNO")
+
+
+class Command(BaseCommand):
+    help = "Log the response cache outcomes and hit rate of each endpoint"
+
+    def handle(self, *args, **options):
+        # The cached endpoints are registered when their views are imported
+        get_resolver().url_patterns
+
+        for endpoint, stats in get_cache_stats().items():
+            logger.info("Response cache stats", endpoint=endpoint, **stats)
@@ -0,0 +1,18 @@
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class CacheStatsTestCase(TestCase):
+    @patch("core.management.commands.cache_stats.logger")
+    @patch("core.management.commands.cache_stats.get_cache_stats")
+    def test_log_stats(self, mock_get_cache_stats, mock_logger):
+        stats = {"hit": 3, "stale": 0, "miss": 1, "not_modified": 0, "hit_rate": 0.75}
+        mock_get_cache_stats.return_value = {"OfficersViewSet.list": stats}
+
+        call_command("cache_stats")
+
+        mock_logger.info.assert_called_once_with(
+            "Response cache stats", endpoint="OfficersViewSet.list", **stats
+        )
@@ -14,6 +14,8 @@ class ImportLogAdmin(admin.ModelAdmin):
         "deleted_rows",
         "started_at",
         "finished_at",
+        "waiting_time",
+        "running_time",
     )
 
     def has_add_permission(self, request, obj=None):
@@ -20,6 +20,7 @@ IMPORT_LOG_STATUS_NO_NEW_DATA = "no_new_data"
 IMPORT_LOG_STATUS_RUNNING = "running"
 IMPORT_LOG_STATUS_FINISHED = "finished"
 IMPORT_LOG_STATUS_ERROR = "error"
+IMPORT_LOG_STATUS_NO_FILE_CHANGE = "no_file_change"
 
 IMPORT_LOG_STATUSES = (
     (IMPORT_LOG_STATUS_STARTED, "Started"),
@@ -28,8 +29,71 @@ IMPORT_LOG_STATUSES = (
     (IMPORT_LOG_STATUS_RUNNING, "Running"),
     (IMPORT_LOG_STATUS_FINISHED, "Finished"),
     (IMPORT_LOG_STATUS_ERROR, "Error"),
+    (IMPORT_LOG_STATUS_NO_FILE_CHANGE, "No file change"),
 )
 
 MAP_IMAGES_SUB_DIR = "map_images"
 
 IMPORT_TASK_ID_CACHE_KEY = "import_task_id_cache_key"
+
+CSV_DOWNLOAD_MAX_WORKERS = 8
+CSV_DOWNLOAD_ATTEMPTS = 3
+
+DOCUMENT_TRANSFER_ATTEMPTS = 3
+DOCUMENT_TRANSFER_RETRY_DELAY = 2
+
+OCR_TEXT_TIMEOUT = 60
+OCR_TEXT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Must be a multiple of 256 KB
+GCS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+RECONCILIATION_MEMORY_BUDGET = 512 * 1024 * 1024
+RECONCILIATION_CHUNK_SIZE = 10000
+# Rough ratio between the in-memory size of a reconciled partition (CSV frame,
+# DB frame and their outer merge) and its size on disk.
+RECONCILIATION_MEMORY_OVERHEAD_FACTOR = 10
+
+ROW_FINGERPRINT_FIELD = "row_fingerprint"
+
+EVENT_DEPARTMENTS_CHANGED_IDS = "event_departments"
+POST_OFFICER_HISTORY_CHANGED_IDS = "post_officer_history_ids"
+OFFICERS_CHANGED_IDS = "officers"
+DEPARTMENTS_CHANGED_IDS = "departments"
+PEOPLE_CHANGED_IDS = "people"
+
+IMPORT_SHADOW_SCHEMA = "import_shadow"
+IMPORT_PREVIOUS_SCHEMA = "import_previous"
+
+DATA_VERSION_OFFICERS = "officers"
+DATA_VERSION_DEPARTMENTS = "departments"
+DATA_VERSION_DOCUMENTS = "documents"
+DATA_VERSION_NEWS_ARTICLES = "news_articles"
+
+DATA_VERSION_ENTITY_TYPES = (
+    (DATA_VERSION_OFFICERS, "Officers"),
+    (DATA_VERSION_DEPARTMENTS, "Departments"),
+    (DATA_VERSION_DOCUMENTS, "Documents"),
+    (DATA_VERSION_NEWS_ARTICLES, "News articles"),
+)
+
+# The entity types whose data the responses of each viewset depend on
+OFFICER_DATA_VERSIONS = [
+    DATA_VERSION_OFFICERS,
+    DATA_VERSION_DEPARTMENTS,
+    DATA_VERSION_DOCUMENTS,
+    DATA_VERSION_NEWS_ARTICLES,
+]
+DEPARTMENT_DATA_VERSIONS = [
+    DATA_VERSION_OFFICERS,
+    DATA_VERSION_DEPARTMENTS,
+    DATA_VERSION_DOCUMENTS,
+    DATA_VERSION_NEWS_ARTICLES,
+]
+DOCUMENT_DATA_VERSIONS = [DATA_VERSION_DOCUMENTS, DATA_VERSION_DEPARTMENTS]
+ANALYTICS_DATA_VERSIONS = [
+    DATA_VERSION_OFFICERS,
+    DATA_VERSION_DEPARTMENTS,
+    DATA_VERSION_DOCUMENTS,
+    DATA_VERSION_NEWS_ARTICLES,
+]
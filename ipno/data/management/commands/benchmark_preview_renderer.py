@@ -0,0 +1,65 @@
+import time
+
+from django.core.management import BaseCommand
+
+import structlog
+
+from utils.image_generator import generate_from_blob, generate_from_file
+
+logger = structlog.get_logger("IPNO")
+
+
+class Command(BaseCommand):
+    help = "Compare the document preview renderers on sample PDF files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("pdf_files", nargs="+", help="Sample PDF file paths")
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Number of renders per file"
+        )
+
+    def _time_render(self, render, repeat):
+        started_at = time.perf_counter()
+
+        for _ in range(repeat):
+            preview_blob = render()
+
+        return (time.perf_counter() - started_at) / repeat, preview_blob
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        total_blob_duration = 0
+        total_file_duration = 0
+
+        for pdf_file in options["pdf_files"]:
+            with open(pdf_file, "rb") as file:
+                blob = file.read()
+
+            blob_duration, blob_preview = self._time_render(
+                lambda: generate_from_blob(blob), repeat
+            )
+            file_duration, file_preview = self._time_render(
+                lambda: generate_from_file(pdf_file), repeat
+            )
+            total_blob_duration += blob_duration
+            total_file_duration += file_duration
+
+            logger.info(
+                "Rendered preview",
+                pdf_file=pdf_file,
+                file_size=len(blob),
+                full_document_seconds=round(blob_duration, 3),
+                first_page_seconds=round(file_duration, 3),
+                full_document_preview_size=len(blob_preview or b""),
+                first_page_preview_size=len(file_preview or b""),
+            )
+
+        logger.info(
+            "Preview renderers benchmark",
+            files_count=len(options["pdf_files"]),
+            full_document_seconds=round(total_blob_duration, 3),
+            first_page_seconds=round(total_file_duration, 3),
+            speedup=round(total_blob_duration / total_file_duration, 2)
+            if total_file_duration
+            else None,
+        )
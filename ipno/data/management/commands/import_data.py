@@ -6,9 +6,15 @@ from data.services.data_importer import DataImporter
 class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("folder_name", type=str, help="Folder name in the bucket")
+        parser.add_argument(
+            "--staged",
+            action="store_true",
+            default=None,
+            help="Import into shadow tables swapped with the live tables at the end",
+        )
 
     def handle(self, *args, **options):
         folder_name = options["folder_name"]
 
         data_importer = DataImporter()
-        data_importer.execute(folder_name)
+        data_importer.execute(folder_name, staged=options["staged"])
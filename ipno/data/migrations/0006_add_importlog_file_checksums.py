@@ -0,0 +1,43 @@
+# Generated by Django 3.1.13 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0005_delete_wrglrepo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='file_crc32c',
+            field=models.CharField(max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='file_md5',
+            field=models.CharField(max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='file_row_count',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='importlog',
+            name='status',
+            field=models.CharField(
+                choices=[
+                    ('started', 'Started'),
+                    ('no_new_commit', 'No new commit'),
+                    ('no_new_data', 'No new data'),
+                    ('running', 'Running'),
+                    ('finished', 'Finished'),
+                    ('error', 'Error'),
+                    ('no_file_change', 'No file change')
+                ],
+                max_length=32),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.13 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0006_add_importlog_file_checksums'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('entity_type', models.CharField(choices=[
+                    ('officers', 'Officers'),
+                    ('departments', 'Departments'),
+                    ('documents', 'Documents'),
+                    ('news_articles', 'News articles')
+                ], max_length=32, unique=True)),
+                ('version', models.IntegerField(default=0)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.13 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0007_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='running_time',
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name='importlog',
+            name='waiting_time',
+            field=models.FloatField(null=True),
+        ),
+    ]
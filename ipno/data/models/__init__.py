@@ -1,3 +1,4 @@
+from .data_version import DataVersion
 from .import_log import ImportLog
 
-__all__ = ["ImportLog"]
+__all__ = ["DataVersion", "ImportLog"]
@@ -0,0 +1,11 @@
+from django.db import models
+
+from data.constants import DATA_VERSION_ENTITY_TYPES
+from utils.models import TimeStampsModel
+
+
+class DataVersion(TimeStampsModel):
+    entity_type = models.CharField(
+        max_length=32, choices=DATA_VERSION_ENTITY_TYPES, unique=True
+    )
+    version = models.IntegerField(default=0)
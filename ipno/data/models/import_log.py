@@ -15,3 +15,8 @@ class ImportLog(TimeStampsModel):
     started_at = models.DateTimeField(null=True)
     finished_at = models.DateTimeField(null=True)
     error_message = models.TextField(null=True)
+    file_md5 = models.CharField(max_length=32, null=True)
+    file_crc32c = models.CharField(max_length=32, null=True)
+    file_row_count = models.IntegerField(null=True)
+    waiting_time = models.FloatField(null=True)
+    running_time = models.FloatField(null=True)
@@ -6,7 +6,7 @@ from django.conf import settings
 import structlog
 from tqdm import tqdm
 
-from data.constants import AGENCY_MODEL_NAME, MAP_IMAGES_SUB_DIR
+from data.constants import AGENCY_MODEL_NAME, MAP_IMAGES_SUB_DIR, ROW_FINGERPRINT_FIELD
 from data.services import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 from departments.models import Department
@@ -53,8 +53,7 @@ class AgencyImporter(BaseImporter):
         except Exception:
             pass
 
-    def handle_record_data(self, row):
-        agency_data = self.parse_row_data(row, self.column_mappings)
+    def handle_record_data(self, row, agency_data):
         agency_slug = agency_data["agency_slug"]
         agency_name = agency_data["agency_name"]
         location = (
@@ -93,6 +92,9 @@ class AgencyImporter(BaseImporter):
             "location_map_url": location_map_url,
         }
 
+        if ROW_FINGERPRINT_FIELD in agency_data:
+            department_data[ROW_FINGERPRINT_FIELD] = agency_data[ROW_FINGERPRINT_FIELD]
+
         if department:
             department_data["id"] = department.id
             self.update_agency_attrs.append(department_data)
@@ -101,8 +103,11 @@ class AgencyImporter(BaseImporter):
             self.new_agency_attrs.append(department_data)
 
     def import_data(self, data):
-        for row in tqdm(data.get("added_rows"), desc="Create departments"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create departments"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete departments"):
             agency_slug = row[self.column_mappings["agency_slug"]]
@@ -110,8 +115,11 @@ class AgencyImporter(BaseImporter):
             if agency:
                 self.delete_agency_ids.append(agency.id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update departments"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update departments"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             Department,
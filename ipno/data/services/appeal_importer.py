@@ -3,13 +3,17 @@ from itertools import chain
 from tqdm import tqdm
 
 from appeals.models import Appeal
-from data.constants import APPEAL_MODEL_NAME
+from data.constants import AGENCY_MODEL_NAME, APPEAL_MODEL_NAME, OFFICER_MODEL_NAME
 from data.services import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 
 
 class AppealImporter(BaseImporter):
     data_model = APPEAL_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
 
     ATTRIBUTES = list(
         {field.name for field in Appeal._meta.fields}
@@ -21,17 +25,16 @@ class AppealImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_appeals_attrs = []
         self.update_appeals_attrs = []
-        self.new_appeal_uids = []
+        self.new_appeal_uids = set()
         self.delete_appeals_ids = []
         self.officer_mappings = {}
         self.department_mappings = {}
         self.appeal_mappings = {}
         self.data_reconciliation = DataReconciliation(APPEAL_MODEL_NAME, csv_file_path)
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, appeal_data):
         agency = row[self.column_mappings["agency"]]
         officer_uid = row[self.column_mappings["uid"]]
-        appeal_data = self.parse_row_data(row, self.column_mappings)
 
         appeal_uid = appeal_data["appeal_uid"]
 
@@ -47,7 +50,7 @@ class AppealImporter(BaseImporter):
             appeal_data["id"] = appeal_id
             self.update_appeals_attrs.append(appeal_data)
         elif appeal_uid not in self.new_appeal_uids:
-            self.new_appeal_uids.append(appeal_uid)
+            self.new_appeal_uids.add(appeal_uid)
             self.new_appeals_attrs.append(appeal_data)
 
     def import_data(self, data):
@@ -76,8 +79,11 @@ class AppealImporter(BaseImporter):
 
         self.appeal_mappings = self.get_appeal_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new appeals"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new appeals"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed appeals"):
             appeal_uid = row[self.old_column_mappings["appeal_uid"]]
@@ -85,8 +91,11 @@ class AppealImporter(BaseImporter):
             if appeal_id:
                 self.delete_appeals_ids.append(appeal_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified appeals"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified appeals"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             Appeal,
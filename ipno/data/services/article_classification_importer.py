@@ -34,9 +34,7 @@ class ArticleClassificationImporter(BaseImporter):  # pragma: no cover
             NEWS_ARTICLE_CLASSIFICATION_MODEL_NAME, csv_file_path
         )
 
-    def handle_record_data(self, row):
-        article_classification_data = self.parse_row_data(row, self.column_mappings)
-
+    def handle_record_data(self, row, article_classification_data):
         article_id = article_classification_data["article_id"]
         relation_article_id = article_id if article_id in self.article_ids else None
 
@@ -55,10 +53,11 @@ class ArticleClassificationImporter(BaseImporter):  # pragma: no cover
             self.get_article_classification_mappings()
         )
 
-        for row in tqdm(
-            data.get("added_rows"), desc="Create new article classifications"
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new article classifications"),
+            self.column_mappings,
         ):
-            self.handle_record_data(row)
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(
             data.get("deleted_rows"), desc="Delete removed article classifications"
@@ -70,10 +69,13 @@ class ArticleClassificationImporter(BaseImporter):  # pragma: no cover
             if article_classification_id:
                 self.delete_classification_ids.append(article_classification_id)
 
-        for row in tqdm(
-            data.get("updated_rows"), desc="Update modified article classifications"
+        for row, row_data in self.iter_rows_data(
+            tqdm(
+                data.get("updated_rows"), desc="Update modified article classifications"
+            ),
+            self.column_mappings,
         ):
-            self.handle_record_data(row)
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             NewsArticleClassification,
@@ -1,9 +1,12 @@
 import traceback
 from datetime import datetime
+from itertools import chain, islice
 
 from django.utils.text import slugify
 
+import pandas as pd
 import pytz
+import structlog
 
 from appeals.models import Appeal
 from brady.models import Brady
@@ -13,24 +16,38 @@ from data.constants import (
     IMPORT_LOG_STATUS_FINISHED,
     IMPORT_LOG_STATUS_NO_NEW_DATA,
     IMPORT_LOG_STATUS_STARTED,
+    ROW_FINGERPRINT_FIELD,
 )
 from data.models import ImportLog
+from data.services.copy_loader import CopyLoader
+from data.services.import_session import (
+    CHANGED_ENTITY_NAMES,
+    MAPPING_KEY_FIELDS,
+    load_mappings,
+)
 from departments.models import Department
 from officers.models import Officer
 from use_of_forces.models import UseOfForce
 from utils.parse_utils import parse_int
 
+logger = structlog.get_logger("IPNO")
+
 
 class BaseImporter(object):
     data_model = None
+    DEPENDENCIES = []
     ATTRIBUTES = []
     NA_ATTRIBUTES = []
     INT_ATTRIBUTES = []
     SLUG_ATTRIBUTES = []
     DATE_ATTRIBUTES = []
+    UPDATE_ATTRIBUTES = []
     BATCH_SIZE = 500
+    COPY_BULK_IMPORT = False
+    PARSE_CHUNK_SIZE = 10000
     column_mappings = {}
     old_column_mappings = {}
+    import_session = None
 
     def parse_row_data(self, row, mappings):
         row_data = {
@@ -63,41 +80,126 @@ class BaseImporter(object):
 
         return row_data
 
-    def get_department_mappings(self):
-        slugify_mappings = {
-            department.agency_slug: department.id
-            for department in Department.objects.only("id", "agency_slug")
-        }
+    def _parse_column(self, values, parse):
+        parsed_values = {value: parse(value) for value in values.unique()}
+
+        return [parsed_values[value] for value in values]
+
+    def parse_rows_data(self, rows, mappings):
+        """Parse rows column by column, giving the same output as parse_row_data.
+
+        Each distinct value of a column is only parsed once.
+        """
+        if not rows:
+            return []
+
+        df = pd.DataFrame(rows, dtype=object)
+        columns = {}
+
+        for attr in self.ATTRIBUTES:
+            if attr in mappings:
+                columns[attr] = self._parse_column(
+                    df[mappings[attr]], lambda value: value if value else None
+                )
 
-        return slugify_mappings
+        for attr in self.NA_ATTRIBUTES:
+            columns[attr] = self._parse_column(
+                df[mappings[attr]], lambda value: value if value != "NA" else None
+            )
+
+        for attr in self.INT_ATTRIBUTES:
+            columns[attr] = self._parse_column(
+                df[mappings[attr]], lambda value: parse_int(value) if value else None
+            )
+
+        for attr in self.SLUG_ATTRIBUTES:
+            columns[attr] = self._parse_column(
+                df[mappings[attr]], lambda value: slugify(value) if value else None
+            )
+
+        for attr in self.DATE_ATTRIBUTES:
+            columns[attr] = self._parse_column(
+                df[mappings[attr]],
+                lambda value: datetime.strptime(value, "%m/%d/%Y").date()
+                if value
+                else None,
+            )
+
+        attrs = list(columns)
+
+        return [dict(zip(attrs, values)) for values in zip(*columns.values())]
+
+    def iter_rows_data(self, rows, mappings):
+        """Yield each row along with its data, parsed by chunks of rows.
+
+        Only the chunk being handled is kept in memory, so that the rows can be
+        streamed from disk. The CSV rows of a fingerprinted model also get their
+        fingerprint, computed from the raw values.
+        """
+        data_reconciliation = getattr(self, "data_reconciliation", None)
+        use_fingerprint = (
+            data_reconciliation is not None and data_reconciliation.use_fingerprint
+        )
+        rows = iter(rows)
+        rows_count = 0
+
+        while True:
+            chunk = list(islice(rows, self.PARSE_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            try:
+                rows_data = self.parse_rows_data(chunk, mappings)
+            except Exception as e:
+                logger.error(
+                    f"Failed to parse {self.data_model} rows",
+                    first_row=rows_count,
+                    last_row=rows_count + len(chunk) - 1,
+                    error=str(e),
+                )
+                raise
+
+            if use_fingerprint:
+                for row, row_data in zip(chunk, rows_data):
+                    row_data[
+                        ROW_FINGERPRINT_FIELD
+                    ] = data_reconciliation.get_row_fingerprint(row)
+
+            yield from zip(chunk, rows_data)
+            rows_count += len(chunk)
+
+    def get_model_mappings(self, klass):
+        if self.import_session:
+            return self.import_session.get_mappings(klass)
+
+        return load_mappings(klass)
+
+    def get_department_mappings(self):
+        return self.get_model_mappings(Department)
 
     def get_officer_mappings(self):
-        return {
-            officer.uid: officer.id for officer in Officer.objects.only("id", "uid")
-        }
+        return self.get_model_mappings(Officer)
 
     def get_uof_mappings(self):
-        return {
-            use_of_force.uof_uid: use_of_force.id
-            for use_of_force in UseOfForce.objects.only("id", "uof_uid")
-        }
+        return self.get_model_mappings(UseOfForce)
 
     def get_appeal_mappings(self):
-        return {
-            appeal.appeal_uid: appeal.id
-            for appeal in Appeal.objects.only("id", "appeal_uid")
-        }
+        return self.get_model_mappings(Appeal)
 
     def get_complaint_mappings(self):
-        return {
-            complaint.allegation_uid: complaint.id
-            for complaint in Complaint.objects.only("id", "allegation_uid")
-        }
+        return self.get_model_mappings(Complaint)
 
     def get_brady_mappings(self):
-        return {
-            brady.brady_uid: brady.id for brady in Brady.objects.only("id", "brady_uid")
-        }
+        return self.get_model_mappings(Brady)
+
+    def is_fingerprinted(self, klass):
+        data_reconciliation = getattr(self, "data_reconciliation", None)
+
+        return (
+            data_reconciliation is not None
+            and data_reconciliation.use_fingerprint
+            and data_reconciliation.model_class is klass
+        )
 
     def bulk_import(
         self,
@@ -107,6 +209,23 @@ class BaseImporter(object):
         delete_items_ids,
         cleanup_action=None,
     ):
+        update_attributes = self.UPDATE_ATTRIBUTES
+
+        if self.is_fingerprinted(klass):
+            # Rows which are not parsed from the CSV rows are compared again later
+            new_items_attrs = [
+                {ROW_FINGERPRINT_FIELD: None, **attrs} for attrs in new_items_attrs
+            ]
+            update_items_attrs = [
+                {ROW_FINGERPRINT_FIELD: None, **attrs} for attrs in update_items_attrs
+            ]
+            update_attributes = update_attributes + [ROW_FINGERPRINT_FIELD]
+
+        if self.import_session:
+            self.record_changed_entities(
+                klass, new_items_attrs, update_items_attrs, delete_items_ids
+            )
+
         delete_items = klass.objects.filter(id__in=delete_items_ids)
 
         if cleanup_action:
@@ -115,17 +234,32 @@ class BaseImporter(object):
         delete_items_count = delete_items.count()
         delete_items.delete()
 
-        for i in range(0, len(new_items_attrs), self.BATCH_SIZE):
-            new_objects = [
-                klass(**attrs) for attrs in new_items_attrs[i : i + self.BATCH_SIZE]
-            ]
-            klass.objects.bulk_create(new_objects)
-
-        for i in range(0, len(update_items_attrs), self.BATCH_SIZE):
-            update_objects = [
-                klass(**attrs) for attrs in update_items_attrs[i : i + self.BATCH_SIZE]
-            ]
-            klass.objects.bulk_update(update_objects, self.UPDATE_ATTRIBUTES)
+        if self.COPY_BULK_IMPORT:
+            CopyLoader(klass).load(
+                (klass(**attrs) for attrs in new_items_attrs),
+                (klass(**attrs) for attrs in update_items_attrs),
+                update_attributes,
+            )
+        else:
+            for i in range(0, len(new_items_attrs), self.BATCH_SIZE):
+                new_objects = [
+                    klass(**attrs) for attrs in new_items_attrs[i : i + self.BATCH_SIZE]
+                ]
+                klass.objects.bulk_create(new_objects)
+
+            for i in range(0, len(update_items_attrs), self.BATCH_SIZE):
+                update_objects = [
+                    klass(**attrs)
+                    for attrs in update_items_attrs[i : i + self.BATCH_SIZE]
+                ]
+                klass.objects.bulk_update(update_objects, update_attributes)
+
+        if self.import_session and klass in MAPPING_KEY_FIELDS:
+            self.import_session.update_mappings(
+                klass,
+                [attrs.get(MAPPING_KEY_FIELDS[klass]) for attrs in new_items_attrs],
+                delete_items_ids,
+            )
 
         return {
             "created_rows": len(new_items_attrs),
@@ -133,6 +267,64 @@ class BaseImporter(object):
             "deleted_rows": delete_items_count,
         }
 
+    def add_changed_ids(self, name, ids):
+        if self.import_session:
+            self.import_session.add_changed_ids(name, ids)
+
+    def record_changed_entities(
+        self, klass, new_items_attrs, update_items_attrs, delete_items_ids
+    ):
+        """Record the officers, departments and people whose pages the rows change.
+
+        These are the entities the rows refer to after the import, and the ones
+        the updated or deleted rows refer to before it, directly or through many
+        to many relations.
+        """
+        changed_ids = [attrs["id"] for attrs in update_items_attrs] + list(
+            delete_items_ids
+        )
+        fields = [
+            field
+            for field in klass._meta.concrete_fields
+            if field.is_relation and field.related_model in CHANGED_ENTITY_NAMES
+        ]
+        relations = [
+            field
+            for field in klass._meta.local_many_to_many
+            if field.related_model in CHANGED_ENTITY_NAMES
+        ]
+
+        if klass in CHANGED_ENTITY_NAMES:
+            self.add_changed_ids(CHANGED_ENTITY_NAMES[klass], changed_ids)
+
+        for field in fields:
+            self.add_changed_ids(
+                CHANGED_ENTITY_NAMES[field.related_model],
+                [
+                    attrs.get(field.attname)
+                    for attrs in chain(new_items_attrs, update_items_attrs)
+                ],
+            )
+
+        for i in range(0, len(changed_ids), self.BATCH_SIZE):
+            batch_ids = changed_ids[i : i + self.BATCH_SIZE]
+
+            if fields:
+                rows = klass.objects.filter(id__in=batch_ids).values_list(
+                    *[field.attname for field in fields]
+                )
+
+                for field, ids in zip(fields, zip(*rows)):
+                    self.add_changed_ids(CHANGED_ENTITY_NAMES[field.related_model], ids)
+
+            for field in relations:
+                self.add_changed_ids(
+                    CHANGED_ENTITY_NAMES[field.related_model],
+                    field.remote_field.through.objects.filter(
+                        **{f"{field.m2m_field_name()}__in": batch_ids}
+                    ).values_list(field.m2m_reverse_field_name(), flat=True),
+                )
+
     def import_data(self, data):
         raise NotImplementedError
 
@@ -141,15 +333,19 @@ class BaseImporter(object):
             setattr(import_log, key, value)
         import_log.save()
 
-    def process(self):
+    def process(self, file_metadata=None):
         import_log = ImportLog.objects.create(
             data_model=self.data_model,
             status=IMPORT_LOG_STATUS_STARTED,
             started_at=datetime.now(pytz.utc),
+            **(file_metadata or {}),
         )
 
         try:
-            data = self.data_reconciliation.reconcile_data()
+            if self.data_reconciliation.is_unchanged():
+                data = {}
+            else:
+                data = self.data_reconciliation.reconcile_data()
 
             if (
                 data.get("added_rows")
@@ -171,6 +367,7 @@ class BaseImporter(object):
                         "created_rows": import_results.get("created_rows"),
                         "updated_rows": import_results.get("updated_rows"),
                         "deleted_rows": import_results.get("deleted_rows"),
+                        "file_row_count": self.data_reconciliation.csv_rows_count,
                     },
                 )
 
@@ -181,6 +378,7 @@ class BaseImporter(object):
                     {
                         "status": IMPORT_LOG_STATUS_NO_NEW_DATA,
                         "finished_at": datetime.now(pytz.utc),
+                        "file_row_count": self.data_reconciliation.csv_rows_count,
                     },
                 )
 
@@ -1,13 +1,17 @@
 from tqdm import tqdm
 
 from brady.models import Brady
-from data.constants import BRADY_MODEL_NAME
+from data.constants import AGENCY_MODEL_NAME, BRADY_MODEL_NAME, OFFICER_MODEL_NAME
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 
 
 class BradyImporter(BaseImporter):  # pragma: no cover
     data_model = BRADY_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
 
     ATTRIBUTES = list(
         {field.name for field in Brady._meta.fields}
@@ -20,7 +24,7 @@ class BradyImporter(BaseImporter):  # pragma: no cover
     def __init__(self, csv_file_path):
         self.new_brady_attrs = []
         self.update_brady_attrs = []
-        self.new_brady_uids = []
+        self.new_brady_uids = set()
         self.delete_brady_ids = []
         self.officer_mappings = {}
         self.department_mappings = {}
@@ -28,14 +32,13 @@ class BradyImporter(BaseImporter):  # pragma: no cover
 
         self.data_reconciliation = DataReconciliation(BRADY_MODEL_NAME, csv_file_path)
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, brady_data):
         uid = row[self.column_mappings["uid"]]
         officer_id = self.officer_mappings[uid]
 
         agency = row[self.column_mappings["agency"]]
         department_id = self.department_mappings[agency]
 
-        brady_data = self.parse_row_data(row, self.column_mappings)
         brady_uid = brady_data["brady_uid"]
 
         brady_id = self.brady_mappings.get(brady_uid)
@@ -46,7 +49,7 @@ class BradyImporter(BaseImporter):  # pragma: no cover
             brady_data["id"] = brady_id
             self.update_brady_attrs.append(brady_data)
         elif brady_uid not in self.new_brady_uids:
-            self.new_brady_uids.append(brady_uid)
+            self.new_brady_uids.add(brady_uid)
             self.new_brady_attrs.append(brady_data)
 
     def import_data(self, data):
@@ -54,8 +57,10 @@ class BradyImporter(BaseImporter):  # pragma: no cover
         self.officer_mappings = self.get_officer_mappings()
         self.department_mappings = self.get_department_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new brady"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new brady"), self.column_mappings
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed brady"):
             brady_uid = row[self.old_column_mappings["brady_uid"]]
@@ -63,8 +68,11 @@ class BradyImporter(BaseImporter):  # pragma: no cover
             if brady_id:
                 self.delete_brady_ids.append(brady_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified brady"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified brady"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             Brady,
@@ -1,13 +1,23 @@
 from tqdm import tqdm
 
 from citizens.models import Citizen
-from data.constants import CITIZEN_MODEL_NAME
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    CITIZEN_MODEL_NAME,
+    COMPLAINT_MODEL_NAME,
+    USE_OF_FORCE_MODEL_NAME,
+)
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 
 
 class CitizenImporter(BaseImporter):
     data_model = CITIZEN_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        COMPLAINT_MODEL_NAME,
+        USE_OF_FORCE_MODEL_NAME,
+    ]
 
     INT_ATTRIBUTES = [
         "citizen_age",
@@ -29,7 +39,7 @@ class CitizenImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_citizens_attrs = []
         self.update_citizens_attrs = []
-        self.new_citizen_uids = []
+        self.new_citizen_uids = set()
         self.delete_citizen_ids = []
         self.uof_mappings = {}
         self.complaint_mappings = {}
@@ -38,7 +48,7 @@ class CitizenImporter(BaseImporter):
 
         self.data_reconciliation = DataReconciliation(CITIZEN_MODEL_NAME, csv_file_path)
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, citizen_data):
         agency = row[self.column_mappings["agency"]]
         department_id = self.department_mappings[agency]
 
@@ -48,7 +58,6 @@ class CitizenImporter(BaseImporter):
         allegation_uid = row[self.column_mappings["allegation_uid"]]
         complaint_id = self.complaint_mappings.get(allegation_uid)
 
-        citizen_data = self.parse_row_data(row, self.column_mappings)
         citizen_uid = citizen_data["citizen_uid"]
 
         citizen_id = self.citizen_mappings.get(citizen_uid)
@@ -60,7 +69,7 @@ class CitizenImporter(BaseImporter):
             citizen_data["id"] = citizen_id
             self.update_citizens_attrs.append(citizen_data)
         elif citizen_uid not in self.new_citizen_uids:
-            self.new_citizen_uids.append(citizen_uid)
+            self.new_citizen_uids.add(citizen_uid)
             self.new_citizens_attrs.append(citizen_data)
 
     def import_data(self, data):
@@ -69,8 +78,11 @@ class CitizenImporter(BaseImporter):
         self.uof_mappings = self.get_uof_mappings()
         self.department_mappings = self.get_department_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new citizens"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new citizens"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed citizens"):
             citizen_uid = row[self.old_column_mappings["citizen_uid"]]
@@ -78,8 +90,11 @@ class CitizenImporter(BaseImporter):
             if citizen_id:
                 self.delete_citizen_ids.append(citizen_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified citizens"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified citizens"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             Citizen,
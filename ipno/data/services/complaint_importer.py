@@ -3,13 +3,24 @@ from itertools import chain
 from tqdm import tqdm
 
 from complaints.models import Complaint
-from data.constants import COMPLAINT_MODEL_NAME
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    COMPLAINT_MODEL_NAME,
+    DEPARTMENTS_CHANGED_IDS,
+    OFFICER_MODEL_NAME,
+    OFFICERS_CHANGED_IDS,
+)
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
+from data.services.relation_sync import sync_relations
 
 
 class ComplaintImporter(BaseImporter):
     data_model = COMPLAINT_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
 
     ATTRIBUTES = list(
         {field.name for field in Complaint._meta.fields}
@@ -21,7 +32,7 @@ class ComplaintImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_complaints_attrs = []
         self.update_complaints_attrs = []
-        self.new_allegation_uids = []
+        self.new_allegation_uids = set()
         self.delete_complaints_ids = []
         self.complaint_mappings = {}
 
@@ -61,10 +72,12 @@ class ComplaintImporter(BaseImporter):
 
         complaint_mappings = self.get_complaint_mappings()
 
-        for row in tqdm(saved_data, desc="Update complaints' relations"):
+        for row, complaint_data in self.iter_rows_data(
+            tqdm(saved_data, desc="Update complaints' relations"),
+            self.column_mappings,
+        ):
             officer_uid = row[self.column_mappings["uid"]]
             agency = row[self.column_mappings["agency"]]
-            complaint_data = self.parse_row_data(row, self.column_mappings)
 
             if officer_uid or agency:
                 allegation_uid = complaint_data.get("allegation_uid")
@@ -83,32 +96,26 @@ class ComplaintImporter(BaseImporter):
                         department_id = department_mappings[agency]
 
                         department_relation_ids[complaint_id] = department_id
-        department_relations = [
-            DepartmentRelation(complaint_id=complaint_id, department_id=department_id)
-            for complaint_id, department_id in department_relation_ids.items()
-        ]
-
-        officer_relations = [
-            OfficerRelation(complaint_id=complaint_id, officer_id=officer_id)
-            for complaint_id, officer_id in officer_relation_ids.items()
-        ]
-
-        DepartmentRelation.objects.filter(
-            complaint_id__in=modified_complaints_ids
-        ).delete()
-        DepartmentRelation.objects.bulk_create(
-            department_relations, batch_size=self.BATCH_SIZE
-        )
 
-        OfficerRelation.objects.filter(
-            complaint_id__in=modified_complaints_ids
-        ).delete()
-        OfficerRelation.objects.bulk_create(
-            officer_relations, batch_size=self.BATCH_SIZE
+        self.add_changed_ids(DEPARTMENTS_CHANGED_IDS, department_relation_ids.values())
+        self.add_changed_ids(OFFICERS_CHANGED_IDS, officer_relation_ids.values())
+
+        sync_relations(
+            DepartmentRelation,
+            "complaint",
+            "department",
+            department_relation_ids.items(),
+            source_ids=modified_complaints_ids,
+        )
+        sync_relations(
+            OfficerRelation,
+            "complaint",
+            "officer",
+            officer_relation_ids.items(),
+            source_ids=modified_complaints_ids,
         )
 
-    def handle_record_data(self, row):
-        complaint_data = self.parse_row_data(row, self.column_mappings)
+    def handle_record_data(self, row, complaint_data):
         allegation_uid = complaint_data["allegation_uid"]
 
         complaint_id = self.complaint_mappings.get(allegation_uid)
@@ -118,13 +125,16 @@ class ComplaintImporter(BaseImporter):
             self.update_complaints_attrs.append(complaint_data)
         elif allegation_uid not in self.new_allegation_uids:
             self.new_complaints_attrs.append(complaint_data)
-            self.new_allegation_uids.append(allegation_uid)
+            self.new_allegation_uids.add(allegation_uid)
 
     def import_data(self, data):
         self.complaint_mappings = self.get_complaint_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new complaints"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new complaints"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed complaints"):
             complaint_data = self.parse_row_data(row, self.old_column_mappings)
@@ -133,8 +143,11 @@ class ComplaintImporter(BaseImporter):
             complaint_id = self.complaint_mappings.get(allegation_uid)
             self.delete_complaints_ids.append(complaint_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified complaints"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified complaints"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         import_result = self.bulk_import(
             Complaint,
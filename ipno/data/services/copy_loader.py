@@ -0,0 +1,117 @@
+import tempfile
+
+from django.db import connection, transaction
+
+COPY_NULL = "\\N"
+COPY_SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+
+def to_copy_value(value):
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, (list, tuple)):
+        value = to_array_literal(value)
+
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def to_array_literal(values):
+    items = []
+
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        else:
+            escaped_value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{escaped_value}"')
+
+    return "{" + ",".join(items) + "}"
+
+
+class CopyLoader:
+    """Load rows into a model table through a temporary staging table.
+
+    Rows are streamed into the staging table with `COPY FROM STDIN`, new rows
+    are then inserted and updated rows applied with one statement each, instead
+    of the batched `bulk_create` and `bulk_update` queries.
+    """
+
+    def __init__(self, klass):
+        self.klass = klass
+        self.table_name = connection.ops.quote_name(klass._meta.db_table)
+        self.staging_table_name = connection.ops.quote_name(
+            f"{klass._meta.db_table}_staging"
+        )
+        self.fields = [
+            field
+            for field in klass._meta.concrete_fields
+            if field is not klass._meta.pk
+        ]
+
+    def _get_row_values(self, obj, add):
+        return [obj.pk] + [
+            field.get_db_prep_save(field.pre_save(obj, add), connection)
+            for field in self.fields
+        ]
+
+    def _write_rows(self, copy_file, objects, add):
+        for obj in objects:
+            copy_file.write(
+                ",".join(
+                    to_copy_value(value) for value in self._get_row_values(obj, add)
+                )
+                + "\n"
+            )
+
+    def _get_columns(self, fields):
+        return ", ".join(connection.ops.quote_name(field.column) for field in fields)
+
+    def load(self, new_objects, update_objects, update_attributes):
+        pk_column = connection.ops.quote_name(self.klass._meta.pk.column)
+        columns = self._get_columns(self.fields)
+        update_fields = [
+            self.klass._meta.get_field(attribute) for attribute in update_attributes
+        ]
+
+        with tempfile.SpooledTemporaryFile(
+            max_size=COPY_SPOOL_MAX_SIZE, mode="w+"
+        ) as copy_file:
+            self._write_rows(copy_file, new_objects, add=True)
+            self._write_rows(copy_file, update_objects, add=False)
+            copy_file.seek(0)
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                # The staging table copies the columns only, so rows to update do
+                # not need values for the non nullable columns they leave as is.
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE {self.staging_table_name} ON COMMIT DROP"
+                    f" AS SELECT * FROM {self.table_name} WITH NO DATA"
+                )
+                cursor.copy_expert(
+                    f"COPY {self.staging_table_name} ({pk_column}, {columns})"
+                    f" FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                    copy_file,
+                )
+
+                cursor.execute(
+                    f"INSERT INTO {self.table_name} ({columns})"
+                    f" SELECT {columns} FROM {self.staging_table_name}"
+                    f" WHERE {pk_column} IS NULL"
+                )
+
+                if update_fields:
+                    assignments = ", ".join(
+                        "{column} = staging.{column}".format(
+                            column=connection.ops.quote_name(field.column)
+                        )
+                        for field in update_fields
+                    )
+                    cursor.execute(
+                        f"UPDATE {self.table_name} SET {assignments}"
+                        f" FROM {self.staging_table_name} AS staging"
+                        f" WHERE {self.table_name}.{pk_column} = staging.{pk_column}"
+                    )
+
+                cursor.execute(f"DROP TABLE {self.staging_table_name}")
@@ -1,11 +1,18 @@
+from datetime import datetime
 from shutil import rmtree
 
 from django.conf import settings
-from django.core.cache import cache
+from django.db.models import Count, Max
 from django.utils import timezone
 
+import pytz
 import structlog
 
+from appeals.models import Appeal
+from brady.models import Brady
+from citizens.models import Citizen
+from complaints.models import Complaint
+from data.models import ImportLog
 from data.services import (
     AgencyImporter,
     AppealImporter,
@@ -20,132 +27,417 @@ from data.services import (
     PostOfficerHistoryImporter,
     UofImporter,
 )
+from data.services.data_reconciliation import DataReconciliation
+from data.services.import_session import ImportSession
+from data.services.importer_scheduler import ImporterScheduler
 from data.services.schema_validation import SchemaValidation
+from data.services.shadow_tables import ShadowTables, drop_shadow_schemas
+from departments.models import Department, OfficerMovement
+from documents.models import Document
 from ipno.data.constants import (
     AGENCY_MODEL_NAME,
     APPEAL_MODEL_NAME,
     BRADY_MODEL_NAME,
     CITIZEN_MODEL_NAME,
     COMPLAINT_MODEL_NAME,
+    DATA_VERSION_DEPARTMENTS,
+    DATA_VERSION_DOCUMENTS,
+    DATA_VERSION_NEWS_ARTICLES,
+    DATA_VERSION_OFFICERS,
+    DEPARTMENTS_CHANGED_IDS,
     DOCUMENT_MODEL_NAME,
+    EVENT_DEPARTMENTS_CHANGED_IDS,
     EVENT_MODEL_NAME,
+    IMPORT_LOG_STATUS_ERROR,
+    IMPORT_LOG_STATUS_FINISHED,
+    IMPORT_LOG_STATUS_NO_FILE_CHANGE,
+    IMPORT_LOG_STATUS_NO_NEW_DATA,
     OFFICER_MODEL_NAME,
+    OFFICERS_CHANGED_IDS,
+    PEOPLE_CHANGED_IDS,
     PERSON_MODEL_NAME,
     POST_OFFICE_HISTORY_MODEL_NAME,
+    POST_OFFICER_HISTORY_CHANGED_IDS,
     USE_OF_FORCE_MODEL_NAME,
 )
 from news_articles.services import ProcessRematchOfficers
+from officers.models import Event, Officer
+from people.models import Person
+from post_officer_history.models import PostOfficerHistory
+from use_of_forces.models import UseOfForce
+from utils.cache_utils import flush_entity_caches, flush_news_article_related_caches
 from utils.count_data import (
     calculate_complaint_fraction,
     calculate_officer_fraction,
     count_complaints,
 )
 from utils.data_utils import compute_department_data_period
-from utils.google_cloud import GoogleCloudService
+from utils.data_version import bump_data_versions
+from utils.google_cloud import GoogleCloudService, csv_file_name_mapping
 from utils.search_index import rebuild_search_index
 
 logger = structlog.get_logger("IPNO")
 
 
 class DataImporter:
-    def execute(self, folder_name):
-        gs = GoogleCloudService(
-            settings.RAW_DATA_BUCKET_NAME,
+    IMPORTERS = [
+        AgencyImporter,
+        OfficerImporter,
+        ComplaintImporter,
+        BradyImporter,
+        UofImporter,
+        CitizenImporter,
+        AppealImporter,
+        EventImporter,
+        DocumentImporter,
+        PostOfficerHistoryImporter,
+        PersonImporter,
+    ]
+
+    STAGED_MODELS = [
+        Department,
+        Officer,
+        Person,
+        Complaint,
+        Brady,
+        UseOfForce,
+        Citizen,
+        Appeal,
+        Event,
+        Document,
+        PostOfficerHistory,
+        OfficerMovement,
+    ]
+
+    def _get_last_import_log(self, model_name):
+        return (
+            ImportLog.objects.filter(data_model=model_name)
+            .order_by("-created_at")
+            .first()
         )
 
-        data_mapping = gs.download_csv_data_sequentially(folder_name)
+    def _is_file_unchanged(self, model_name, file_metadata):
+        last_import_log = self._get_last_import_log(model_name)
+        data_reconciliation = DataReconciliation(model_name, None)
 
-        try:
-            is_validating_success = SchemaValidation().validate_schemas(data_mapping)
+        # The file is reconciled again when rows were deleted or left without
+        # fingerprint since it was imported, even if it did not change.
+        return bool(
+            last_import_log
+            and last_import_log.status
+            in [
+                IMPORT_LOG_STATUS_FINISHED,
+                IMPORT_LOG_STATUS_NO_NEW_DATA,
+                IMPORT_LOG_STATUS_NO_FILE_CHANGE,
+            ]
+            and file_metadata["file_crc32c"]
+            and last_import_log.file_crc32c == file_metadata["file_crc32c"]
+            and last_import_log.file_md5 == file_metadata["file_md5"]
+            and data_reconciliation.model_class.objects.count()
+            == last_import_log.file_row_count
+            and not data_reconciliation.has_unfingerprinted_rows()
+        )
 
-            if not is_validating_success:
-                logger.error("Schema validation failed")
-                return
+    def _skip_unchanged_file(self, model_name, file_metadata):
+        last_import_log = self._get_last_import_log(model_name)
 
-            start_time = timezone.now()
+        ImportLog.objects.create(
+            data_model=model_name,
+            status=IMPORT_LOG_STATUS_NO_FILE_CHANGE,
+            started_at=datetime.now(pytz.utc),
+            finished_at=datetime.now(pytz.utc),
+            file_row_count=last_import_log.file_row_count,
+            **file_metadata,
+        )
 
-            agency_imported = AgencyImporter(data_mapping[AGENCY_MODEL_NAME]).process()
-            officer_imported = OfficerImporter(
-                data_mapping[OFFICER_MODEL_NAME]
-            ).process()
-            complaint_imported = ComplaintImporter(
-                data_mapping[COMPLAINT_MODEL_NAME]
-            ).process()
-            brady_imported = BradyImporter(data_mapping[BRADY_MODEL_NAME]).process()
-            uof_imported = UofImporter(data_mapping[USE_OF_FORCE_MODEL_NAME]).process()
-            citizen_imported = CitizenImporter(
-                data_mapping[CITIZEN_MODEL_NAME]
-            ).process()
-
-            appeal_imported = AppealImporter(data_mapping[APPEAL_MODEL_NAME]).process()
-            event_imported = EventImporter(data_mapping[EVENT_MODEL_NAME]).process()
-            document_imported = DocumentImporter(
-                data_mapping[DOCUMENT_MODEL_NAME]
-            ).process()
-            post_officer_history_imported = PostOfficerHistoryImporter(
-                data_mapping[POST_OFFICE_HISTORY_MODEL_NAME]
-            ).process()
-            person_imported = PersonImporter(data_mapping[PERSON_MODEL_NAME]).process()
-
-            ProcessRematchOfficers(start_time).process()
-
-            if any(
-                [
-                    agency_imported,
-                    officer_imported,
-                    complaint_imported,
-                    event_imported,
-                    person_imported,
-                    post_officer_history_imported,
-                ]
-            ):
-                logger.info("Calculate officer fraction")
-                calculate_officer_fraction()
+        logger.info(f"Skip importing {model_name}, file is unchanged")
+
+    def _import(self, importer_class):
+        model_name = importer_class.data_model
+
+        if model_name not in self.data_mapping:
+            return False
+
+        importer = importer_class(self.data_mapping[model_name])
+        importer.import_session = self.import_session
+
+        return importer.process(file_metadata=self.files_metadata.get(model_name))
+
+    def _run_importers(self):
+        return ImporterScheduler(
+            self.IMPORTERS,
+            self._import,
+            max_workers=settings.DATA_IMPORTER_MAX_WORKERS,
+        ).run()
+
+    def _is_largest_department_changed(self):
+        """Whether the officers count of the largest department changed.
+
+        The officer fractions are relative to it, so that they all change with
+        it. A largest department whose officers did not change still has the
+        previous largest count.
+        """
+        largest_department = (
+            Department.objects.filter(officer_fraction=1)
+            .exclude(
+                id__in=self.import_session.get_changed_ids(DEPARTMENTS_CHANGED_IDS)
+            )
+            .first()
+        )
+
+        if not largest_department:
+            return True
+
+        max_officers_count = (
+            Officer.objects.filter(department_id__isnull=False)
+            .values("department_id")
+            .annotate(officers_count=Count("id"))
+            .order_by("-officers_count")
+            .values_list("officers_count", flat=True)
+            .first()
+        )
+
+        return largest_department.officers.count() != max_officers_count
+
+    def _update_complaint_counts(self, agency_imported):
+        # Deleting departments cascades to their officers and their complaint
+        # relations, which the importers do not record.
+        if agency_imported:
+            logger.info("Counting complaints")
+            count_complaints()
+
+            logger.info("Calculate complaint fraction")
+            calculate_complaint_fraction()
+            return
+
+        officer_ids = self.import_session.get_changed_ids(OFFICERS_CHANGED_IDS)
+        person_ids = self.import_session.get_changed_ids(PEOPLE_CHANGED_IDS)
+        person_ids.update(
+            Officer.objects.filter(
+                id__in=officer_ids, person_id__isnull=False
+            ).values_list("person_id", flat=True)
+        )
+        max_complaints_count = self._get_max_complaints_count()
+
+        logger.info("Counting complaints")
+        count_complaints(person_ids=person_ids)
+
+        logger.info("Calculate complaint fraction")
+        # The fractions are relative to the largest complaints count
+        if self._get_max_complaints_count() != max_complaints_count:
+            calculate_complaint_fraction()
+        else:
+            officer_ids.update(
+                Officer.objects.filter(person_id__in=person_ids).values_list(
+                    "id", flat=True
+                )
+            )
+            calculate_complaint_fraction(officer_ids=officer_ids)
 
-                logger.info("Counting complaints")
-                count_complaints()
+    def _get_max_complaints_count(self):
+        return Person.objects.aggregate(Max("all_complaints_count"))[
+            "all_complaints_count__max"
+        ]
 
-                logger.info("Calculate complaint fraction")
-                calculate_complaint_fraction()
+    def _update_derived_data(self, importer_results):
+        agency_imported = importer_results[AGENCY_MODEL_NAME]
+        officer_imported = importer_results[OFFICER_MODEL_NAME]
+        complaint_imported = importer_results[COMPLAINT_MODEL_NAME]
+        brady_imported = importer_results[BRADY_MODEL_NAME]
+        uof_imported = importer_results[USE_OF_FORCE_MODEL_NAME]
+        citizen_imported = importer_results[CITIZEN_MODEL_NAME]
+        appeal_imported = importer_results[APPEAL_MODEL_NAME]
+        event_imported = importer_results[EVENT_MODEL_NAME]
+        post_officer_history_imported = importer_results[POST_OFFICE_HISTORY_MODEL_NAME]
+        person_imported = importer_results[PERSON_MODEL_NAME]
 
-                logger.info("Migrate officer movements")
+        if agency_imported or officer_imported:
+            logger.info("Calculate officer fraction")
+            # Deleting departments cascades to their officers, which the
+            # importers do not record.
+            if agency_imported or self._is_largest_department_changed():
+                calculate_officer_fraction()
+            else:
+                calculate_officer_fraction(
+                    department_ids=self.import_session.get_changed_ids(
+                        DEPARTMENTS_CHANGED_IDS
+                    )
+                )
+
+        if any(
+            [agency_imported, officer_imported, complaint_imported, person_imported]
+        ):
+            self._update_complaint_counts(agency_imported)
+
+        if any(
+            [
+                agency_imported,
+                officer_imported,
+                complaint_imported,
+                event_imported,
+                person_imported,
+                post_officer_history_imported,
+            ]
+        ):
+            logger.info("Migrate officer movements")
+            # Deleting officers or departments cascades to their post
+            # officer histories, which the importer does not record.
+            if agency_imported or officer_imported:
                 MigrateOfficerMovement().process()
+            else:
+                MigrateOfficerMovement().process(
+                    history_ids=self.import_session.get_changed_ids(
+                        POST_OFFICER_HISTORY_CHANGED_IDS
+                    )
+                )
 
-            if any(
-                [
-                    agency_imported,
-                    officer_imported,
-                    uof_imported,
-                    citizen_imported,
-                    complaint_imported,
-                    event_imported,
-                    appeal_imported,
-                    brady_imported,
-                ]
-            ):
-                logger.info("Counting department data period")
+        if any(
+            [
+                agency_imported,
+                officer_imported,
+                uof_imported,
+                citizen_imported,
+                complaint_imported,
+                event_imported,
+                appeal_imported,
+                brady_imported,
+            ]
+        ):
+            logger.info("Counting department data period")
+            # Deleting officers, use of forces, appeals or bradies cascades
+            # to their events, which the event importer does not record.
+            if any([officer_imported, uof_imported, appeal_imported, brady_imported]):
                 compute_department_data_period()
+            else:
+                compute_department_data_period(
+                    department_ids=self.import_session.get_changed_ids(
+                        EVENT_DEPARTMENTS_CHANGED_IDS
+                    )
+                )
 
-            if any(
-                [
-                    agency_imported,
-                    officer_imported,
-                    uof_imported,
-                    citizen_imported,
-                    complaint_imported,
-                    event_imported,
-                    document_imported,
-                    person_imported,
-                    appeal_imported,
-                    brady_imported,
-                ]
+    def _refresh_published_data(self, importer_results, start_time):
+        ProcessRematchOfficers(start_time).process()
+        flush_news_article_related_caches(start_time)
+
+        if any(
+            importer_results[model_name]
+            for model_name in [
+                AGENCY_MODEL_NAME,
+                OFFICER_MODEL_NAME,
+                USE_OF_FORCE_MODEL_NAME,
+                CITIZEN_MODEL_NAME,
+                COMPLAINT_MODEL_NAME,
+                EVENT_MODEL_NAME,
+                DOCUMENT_MODEL_NAME,
+                PERSON_MODEL_NAME,
+                APPEAL_MODEL_NAME,
+                BRADY_MODEL_NAME,
+            ]
+        ):
+            logger.info("Rebuilding search index")
+            rebuild_search_index()
+
+            logger.info("Flushing caches of changed entities")
+            flush_entity_caches(
+                officer_ids=self.import_session.get_changed_ids(OFFICERS_CHANGED_IDS),
+                department_ids=self.import_session.get_changed_ids(
+                    DEPARTMENTS_CHANGED_IDS
+                ),
+                person_ids=self.import_session.get_changed_ids(PEOPLE_CHANGED_IDS),
+            )
+
+            # After the caches are flushed, so that the responses are not kept
+            # by the clients until the flush settles in every process.
+            logger.info("Bumping data versions")
+            entity_types = [
+                DATA_VERSION_OFFICERS,
+                DATA_VERSION_DEPARTMENTS,
+                DATA_VERSION_NEWS_ARTICLES,
+            ]
+            if (
+                importer_results[AGENCY_MODEL_NAME]
+                or importer_results[DOCUMENT_MODEL_NAME]
             ):
-                logger.info("Rebuilding search index")
-                rebuild_search_index()
+                entity_types.append(DATA_VERSION_DOCUMENTS)
+            bump_data_versions(entity_types)
+
+    def _run_staged(self, start_time):
+        """Import into shadow tables, swapped with the live tables at the end.
+
+        The API keeps serving the previous data until the swap, which publishes
+        all the imported and derived data at once.
+        """
+        shadow_tables = ShadowTables(self.STAGED_MODELS)
+        shadow_tables.create()
+
+        try:
+            with shadow_tables.activate():
+                importer_results = self._run_importers()
+                self._update_derived_data(importer_results)
+
+            logger.info("Swap shadow tables")
+            shadow_tables.swap()
+        except Exception:
+            shadow_tables.drop()
+            # The imported files are not skipped as unchanged by the next import
+            ImportLog.objects.filter(
+                created_at__gte=start_time, status=IMPORT_LOG_STATUS_FINISHED
+            ).update(
+                status=IMPORT_LOG_STATUS_ERROR,
+                error_message="Staged import was not swapped into place",
+            )
+            raise
+
+        return importer_results
+
+    def execute(self, folder_name, staged=None):
+        gs = GoogleCloudService(
+            settings.RAW_DATA_BUCKET_NAME,
+        )
+
+        if staged is None:
+            staged = settings.DATA_IMPORTER_STAGED
+
+        # A killed import may have left the live tables read only
+        drop_shadow_schemas()
+
+        self.import_session = ImportSession()
+        self.files_metadata = gs.get_csv_files_metadata(folder_name)
+        unchanged_models = {
+            model_name
+            for model_name, file_metadata in self.files_metadata.items()
+            if self._is_file_unchanged(model_name, file_metadata)
+        }
+        changed_models = [
+            model_name
+            for model_name in csv_file_name_mapping
+            if model_name not in unchanged_models
+        ]
+
+        self.data_mapping = gs.download_csv_data(folder_name, changed_models)
+
+        try:
+            is_validating_success = SchemaValidation().validate_schemas(
+                self.data_mapping
+            )
+
+            if not is_validating_success:
+                logger.error("Schema validation failed")
+                return
+
+            start_time = timezone.now()
+
+            for model_name in unchanged_models:
+                self._skip_unchanged_file(model_name, self.files_metadata[model_name])
+
+            if staged:
+                importer_results = self._run_staged(start_time)
+            else:
+                importer_results = self._run_importers()
+                self._update_derived_data(importer_results)
 
-                logger.info("Flushing cache table")
-                cache.clear()
+            self._refresh_published_data(importer_results, start_time)
         except Exception as e:
             logger.error("Failed to import data", error=str(e))
         finally:
-            rmtree(f"{settings.CSV_DATA_PATH}/{folder_name}")
+            rmtree(f"{settings.CSV_DATA_PATH}/{folder_name}", ignore_errors=True)
@@ -1,5 +1,8 @@
+import hashlib
 from datetime import datetime
 
+from django.db import connection
+
 import pandas as pd
 
 from appeals.models.appeal import Appeal
@@ -18,6 +21,7 @@ from data.constants import (
     OFFICER_MODEL_NAME,
     PERSON_MODEL_NAME,
     POST_OFFICE_HISTORY_MODEL_NAME,
+    ROW_FINGERPRINT_FIELD,
     USE_OF_FORCE_MODEL_NAME,
 )
 from departments.models.department import Department
@@ -29,12 +33,29 @@ from people.models.person import Person
 from post_officer_history.models.post_officer_history import PostOfficerHistory
 from use_of_forces.models.use_of_force import UseOfForce
 
+DELETED_ROWS_BATCH_SIZE = 10000
+# Number of hex digits of each fingerprint summed up into the table checksum,
+# 15 digits keep every term within the bigint range.
+FINGERPRINT_CHECKSUM_DIGITS = 15
+
+
+def compute_row_fingerprint(values):
+    return hashlib.md5("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def get_fingerprint_checksum(fingerprint):
+    return int(fingerprint[:FINGERPRINT_CHECKSUM_DIGITS], 16)
+
 
 class DataReconciliation:
     def __init__(self, model_name, csv_file_path):
         self.model_name = model_name
         self.model_class = self._get_model_class(model_name)
         self.csv_file_path = csv_file_path
+        self.use_fingerprint = ROW_FINGERPRINT_FIELD in {
+            field.name for field in self.model_class._meta.fields
+        }
+        self.csv_rows_count = None
 
     def _get_model_class(self, model_name):
         if model_name == BRADY_MODEL_NAME:
@@ -93,6 +114,10 @@ class DataReconciliation:
         )
 
     def normalize_data(self, df_db, df_csv):
+        self.normalize_db_data(df_db)
+        self.normalize_csv_data(df_csv)
+
+    def normalize_db_data(self, df_db):
         if self.model_name == AGENCY_MODEL_NAME:
             df_db["location"] = df_db["location"].apply(
                 lambda coord: ", ".join(
@@ -110,27 +135,28 @@ class DataReconciliation:
         if self.model_name == EVENT_MODEL_NAME:
             df_db["month"] = df_db["month"].apply(lambda x: str(float(x)) if x else "")
             df_db["day"] = df_db["day"].apply(lambda x: str(float(x)) if x else "")
-            df_csv["month"] = df_csv["month"].apply(
+            df_db["salary"] = df_db["salary"].apply(
+                lambda x: str(float(x)) if x else ""
+            )
+            df_db["overtime_annual_total"] = df_db["overtime_annual_total"].apply(
                 lambda x: str(float(x)) if x else ""
             )
-            df_csv["day"] = df_csv["day"].apply(lambda x: str(float(x)) if x else "")
 
-            df_db["salary"] = df_db["salary"].apply(
+        if self.model_name == DOCUMENT_MODEL_NAME:
+            df_db["page_count"] = df_db["pages_count"]
+
+    def normalize_csv_data(self, df_csv):
+        if self.model_name == EVENT_MODEL_NAME:
+            df_csv["month"] = df_csv["month"].apply(
                 lambda x: str(float(x)) if x else ""
             )
+            df_csv["day"] = df_csv["day"].apply(lambda x: str(float(x)) if x else "")
             df_csv["salary"] = df_csv["salary"].apply(
                 lambda x: str(float(x)) if x else ""
             )
-
             df_csv["overtime_annual_total"] = df_csv["overtime_annual_total"].apply(
                 lambda x: str(float(x)) if x else ""
             )
-            df_db["overtime_annual_total"] = df_db["overtime_annual_total"].apply(
-                lambda x: str(float(x)) if x else ""
-            )
-
-        if self.model_name == DOCUMENT_MODEL_NAME:
-            df_db["page_count"] = df_db["pages_count"]
 
     def _get_columns(self):
         columns = [
@@ -146,34 +172,40 @@ class DataReconciliation:
         self.columns = columns
         return columns
 
-    def _get_queryset(self):
-        return self.model_class.objects.all().values()
-
-    def _filter_by_idx_columns(self, df, source_df, idx_columns):
-        indices = df.reset_index().merge(source_df, on=idx_columns)["index"].values
-        return df.loc[indices, self.columns]
-
-    def reconcile_data(self):
-        columns = self._get_columns()
+    def _get_db_columns(self, columns):
         # TODO: refactor this
-        db_columns = (
+        return (
             columns
             if self.model_name != DOCUMENT_MODEL_NAME
             else (columns + ["pages_count"])
         )
-        idx_columns = self._get_index_colums()
 
-        df_csv = pd.read_csv(
-            self.csv_file_path, dtype="string", keep_default_na=False
-        ).fillna("")
+    def _get_reconciled_db_columns(self, columns, idx_columns):
+        if self.use_fingerprint:
+            return ["id"] + idx_columns + [ROW_FINGERPRINT_FIELD]
+
+        return self._get_db_columns(columns)
+
+    def _get_queryset(self, db_columns):
+        field_names = {field.name for field in self.model_class._meta.fields}
 
-        queryset = self._get_queryset()
-        df_db = pd.DataFrame(list(queryset), columns=db_columns, dtype="string").fillna(
-            ""
+        return self.model_class.objects.values(
+            *[column for column in db_columns if column in field_names]
         )
 
-        self.normalize_data(df_db, df_csv)
+    def _read_csv(self, csv_file_path, **kwargs):
+        return pd.read_csv(
+            csv_file_path, dtype="string", keep_default_na=False, **kwargs
+        ).fillna("")
+
+    def _build_db_frame(self, records, db_columns):
+        return pd.DataFrame(records, columns=db_columns, dtype="string").fillna("")
+
+    def _filter_by_idx_columns(self, df, source_df, idx_columns):
+        indices = df.reset_index().merge(source_df, on=idx_columns)["index"].values
+        return df.loc[indices, self.columns]
 
+    def _diff_frames(self, df_db, df_csv, columns, idx_columns):
         df_all = pd.merge(df_db, df_csv, how="outer", indicator=True, on=idx_columns)
         df_all = df_all.drop_duplicates(subset=idx_columns, keep="first")
         df_all.iloc[:, :-1] = df_all.iloc[:, :-1].fillna("")
@@ -216,6 +248,173 @@ class DataReconciliation:
             .tolist()
         )
 
+        return added_rows, deleted_rows, updated_rows
+
+    def _compute_fingerprints(self, df, columns):
+        return pd.Series(
+            [
+                compute_row_fingerprint(values)
+                for values in zip(*(df[column] for column in columns))
+            ],
+            index=df.index,
+            dtype="string",
+        )
+
+    def get_row_fingerprint(self, row):
+        """Fingerprint a reconciled CSV row, which holds the reconciled columns."""
+        return compute_row_fingerprint(row)
+
+    def _get_deleted_rows(self, ids):
+        db_columns = self._get_db_columns(self.columns)
+        deleted_rows = []
+
+        for i in range(0, len(ids), DELETED_ROWS_BATCH_SIZE):
+            queryset = self._get_queryset(db_columns).filter(
+                id__in=ids[i : i + DELETED_ROWS_BATCH_SIZE]
+            )
+            df_db = self._build_db_frame(list(queryset), db_columns)
+            self.normalize_db_data(df_db)
+
+            deleted_rows += df_db[self.columns].to_numpy().tolist()
+
+        return deleted_rows
+
+    def _diff_fingerprinted_frames(self, df_db, df_csv, idx_columns):
+        db_fingerprint = f"{ROW_FINGERPRINT_FIELD}_db"
+        csv_fingerprint = f"{ROW_FINGERPRINT_FIELD}_csv"
+
+        df_all = pd.merge(
+            df_db,
+            df_csv[idx_columns + [ROW_FINGERPRINT_FIELD]],
+            how="outer",
+            indicator=True,
+            on=idx_columns,
+            suffixes=("_db", "_csv"),
+        )
+        df_all = df_all.drop_duplicates(subset=idx_columns, keep="first")
+        df_all[[db_fingerprint, csv_fingerprint]] = df_all[
+            [db_fingerprint, csv_fingerprint]
+        ].fillna("")
+
+        added = df_all[df_all["_merge"] == "right_only"]
+        deleted = df_all[df_all["_merge"] == "left_only"]
+        updated = df_all[
+            (df_all["_merge"] == "both")
+            & (df_all[db_fingerprint] != df_all[csv_fingerprint])
+        ]
+
+        added_rows = (
+            self._filter_by_idx_columns(df_csv, added[idx_columns], idx_columns)
+            .to_numpy()
+            .tolist()
+        )
+        updated_rows = (
+            self._filter_by_idx_columns(df_csv, updated[idx_columns], idx_columns)
+            .to_numpy()
+            .tolist()
+        )
+        deleted_rows = self._get_deleted_rows([int(id) for id in deleted["id"]])
+
+        return added_rows, deleted_rows, updated_rows
+
+    def _reconcile_frames(self, df_db, df_csv, columns, idx_columns):
+        if self.use_fingerprint:
+            self.normalize_csv_data(df_csv)
+            df_csv[ROW_FINGERPRINT_FIELD] = self._compute_fingerprints(df_csv, columns)
+
+            return self._diff_fingerprinted_frames(df_db, df_csv, idx_columns)
+
+        self.normalize_data(df_db, df_csv)
+
+        return self._diff_frames(df_db, df_csv, columns, idx_columns)
+
+    def _get_csv_fingerprints_summary(self, columns):
+        df_csv = self._read_csv(self.csv_file_path)
+        self.normalize_csv_data(df_csv)
+
+        fingerprints = self._compute_fingerprints(df_csv, columns)
+
+        return len(fingerprints), sum(
+            get_fingerprint_checksum(fingerprint) for fingerprint in fingerprints
+        )
+
+    def _get_db_fingerprints_summary(self):
+        table_name = connection.ops.quote_name(self.model_class._meta.db_table)
+        fingerprint_column = connection.ops.quote_name(ROW_FINGERPRINT_FIELD)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT
+                    COUNT(*),
+                    COUNT({fingerprint_column}),
+                    COALESCE(
+                        SUM(
+                            (
+                                'x' || SUBSTR(
+                                    {fingerprint_column}, 1, {FINGERPRINT_CHECKSUM_DIGITS}
+                                )
+                            )::bit({FINGERPRINT_CHECKSUM_DIGITS * 4})::bigint
+                        ),
+                        0
+                    )
+                FROM {table_name}
+                """
+            )
+            rows_count, fingerprinted_count, checksum = cursor.fetchone()
+
+        return rows_count, fingerprinted_count, int(checksum)
+
+    def has_unfingerprinted_rows(self):
+        """Check if some rows, like the ones that failed to import, lack a fingerprint.
+        """
+        return (
+            self.use_fingerprint
+            and self.model_class.objects.filter(
+                **{f"{ROW_FINGERPRINT_FIELD}__isnull": True}
+            ).exists()
+        )
+
+    def is_unchanged(self):
+        """Check in one pass if the CSV file matches the model table.
+
+        Every row fingerprint covers all the reconciled columns, so both sides
+        hold the same data when they have the same fingerprints.
+        """
+        if not self.use_fingerprint:
+            return False
+
+        (
+            db_rows_count,
+            db_fingerprinted_count,
+            db_checksum,
+        ) = self._get_db_fingerprints_summary()
+
+        if db_rows_count != db_fingerprinted_count:
+            return False
+
+        csv_rows_count, csv_checksum = self._get_csv_fingerprints_summary(
+            self._get_columns()
+        )
+        self.csv_rows_count = csv_rows_count
+
+        return csv_rows_count == db_rows_count and csv_checksum == db_checksum
+
+    def reconcile_data(self):
+        columns = self._get_columns()
+        idx_columns = self._get_index_colums()
+        db_columns = self._get_reconciled_db_columns(columns, idx_columns)
+
+        df_csv = self._read_csv(self.csv_file_path)
+        self.csv_rows_count = len(df_csv)
+
+        queryset = self._get_queryset(db_columns)
+        df_db = self._build_db_frame(list(queryset), db_columns)
+
+        added_rows, deleted_rows, updated_rows = self._reconcile_frames(
+            df_db, df_csv, columns, idx_columns
+        )
+
         # Reconcile the data
         return {
             "added_rows": added_rows,
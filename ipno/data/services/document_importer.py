@@ -1,28 +1,125 @@
-import operator
-from functools import reduce
+import io
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
 from itertools import chain
 
 from django.conf import settings
-from django.db.models.query_utils import Q
 
 import requests
-from dropbox.exceptions import ApiError
+import structlog
+from dropbox.exceptions import ApiError, InternalServerError, RateLimitError
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
-
-from data.constants import DOCUMENT_MODEL_NAME
+from urllib3.util.retry import Retry
+
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    DEPARTMENTS_CHANGED_IDS,
+    DOCUMENT_MODEL_NAME,
+    DOCUMENT_TRANSFER_ATTEMPTS,
+    DOCUMENT_TRANSFER_RETRY_DELAY,
+    GCS_UPLOAD_CHUNK_SIZE,
+    OCR_TEXT_RETRY_STATUSES,
+    OCR_TEXT_TIMEOUT,
+    OFFICER_MODEL_NAME,
+    OFFICERS_CHANGED_IDS,
+    ROW_FINGERPRINT_FIELD,
+)
 from data.services.base_importer import BaseImporter
-from data.services.data_reconciliation import DataReconciliation
+from data.services.relation_sync import sync_relations
+from data.services.streaming_data_reconciliation import StreamingDataReconciliation
 from documents.models import Document
 from utils.dropbox_utils import DropboxService
+from utils.file_cache import FileCache
 from utils.google_cloud import GoogleCloudService
-from utils.image_generator import generate_from_blob
+from utils.image_generator import generate_from_file
 from utils.parse_utils import parse_date
 
-BATCH_SIZE = 1000
+logger = structlog.get_logger("IPNO")
+
+TRANSIENT_TRANSFER_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    InternalServerError,
+    RateLimitError,
+)
+
+
+class ResponseStream:
+    """Read only file object over the content of a streamed response.
+
+    The content is fetched one chunk at a time as it is read, and copied to
+    `copy_file` on the way when one is given. The last read chunk is kept so
+    that a resumable upload can rewind it to send it again.
+    """
+
+    def __init__(self, response, copy_file=None):
+        self.chunks = response.iter_content(chunk_size=GCS_UPLOAD_CHUNK_SIZE)
+        self.copy_file = copy_file
+        self.buffer = b""
+        self.last_read = b""
+        self.position = 0
+        self.copied_position = 0
+
+    def read(self, size=-1):
+        if size is None:
+            size = -1
+
+        while size < 0 or len(self.buffer) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.buffer += chunk
+
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+
+        # Rewound data is read again, it is only copied once
+        if self.copy_file:
+            self.copy_file.write(data[max(self.copied_position - self.position, 0) :])
+
+        self.last_read = data
+        self.position += len(data)
+        self.copied_position = max(self.copied_position, self.position)
+
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence != io.SEEK_SET:
+            raise OSError("Response stream can not seek from its end")
+
+        rewound_size = self.position - offset
+
+        if rewound_size < 0 or rewound_size > len(self.last_read):
+            raise OSError("Response stream can only rewind its last read chunk")
+
+        if rewound_size:
+            kept_size = len(self.last_read) - rewound_size
+            self.buffer = self.last_read[kept_size:] + self.buffer
+            self.last_read = self.last_read[:kept_size]
+            self.position = offset
+
+        return self.position
+
+    def tell(self):
+        return self.position
 
 
 class DocumentImporter(BaseImporter):
     data_model = DOCUMENT_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
+    COPY_BULK_IMPORT = True
 
     SLUG_ATTRIBUTES = ["agency"]
     INT_ATTRIBUTES = [
@@ -56,11 +153,25 @@ class DocumentImporter(BaseImporter):
 
         self.new_documents = []
         self.update_documents = []
-        self.new_docids = []
+        self.new_docids = set()
         self.delete_documents_ids = []
         self.document_mappings = {}
         self.uploaded_files = {}
-        self.data_reconciliation = DataReconciliation(
+        self.pending_uploads = {}
+        self.pending_ocr_texts = {}
+        self.http_session = self.create_http_session()
+        self.preview_executor = None
+        self.preview_cache = FileCache(
+            settings.DOCUMENT_PREVIEW_CACHE_PATH,
+            ".jpeg",
+            max_size=settings.DOCUMENT_PREVIEW_CACHE_MAX_SIZE,
+        )
+        self.ocr_text_cache = FileCache(
+            settings.DOCUMENT_OCR_TEXT_CACHE_PATH,
+            ".txt",
+            max_size=settings.DOCUMENT_OCR_TEXT_CACHE_MAX_SIZE,
+        )
+        self.data_reconciliation = StreamingDataReconciliation(
             DOCUMENT_MODEL_NAME, csv_file_path
         )
 
@@ -92,37 +203,21 @@ class DocumentImporter(BaseImporter):
         OfficerRelation = Document.officers.through
         department_relations = []
         officer_relations = []
-        modified_department_relations = []
-        modified_officer_relations = []
 
-        saved_data = list(
-            chain(
-                raw_data.get("added_rows", []),
-                raw_data.get("updated_rows", []),
-            )
+        # The saved rows are streamed from disk, only a chunk is parsed at a time
+        saved_data = chain(
+            raw_data.get("added_rows", []),
+            raw_data.get("updated_rows", []),
         )
-        deleted_data = raw_data.get("deleted_rows", [])
 
         officer_mappings = self.get_officer_mappings()
-        agencies = {
-            row[self.column_mappings["agency"]]
-            for row in saved_data
-            if row[self.column_mappings["agency"]]
-        }
-        agencies.update(
-            [
-                row[self.old_column_mappings["agency"]]
-                for row in deleted_data
-                if row[self.old_column_mappings["agency"]]
-            ]
-        )
-
         department_mappings = self.get_department_mappings()
-
         document_mappings = self.get_document_mappings()
 
-        for row in tqdm(saved_data, desc="Update saved documents' relations"):
-            document_data = self.parse_row_data(row, self.column_mappings)
+        for _, document_data in self.iter_rows_data(
+            tqdm(saved_data, desc="Update saved documents' relations"),
+            self.column_mappings,
+        ):
             officer_uid = document_data.get("matched_uid")
             agency = document_data.get("agency")
 
@@ -138,107 +233,214 @@ class DocumentImporter(BaseImporter):
                     if officer_uid:
                         officer_id = officer_mappings.get(officer_uid)
                         if officer_id:
-                            modified_officer_relations.append((document_id, officer_id))
                             officer_relations.append((document_id, officer_id))
 
                     if agency:
                         department_id = department_mappings[agency]
-                        modified_department_relations.append(
-                            (document_id, department_id)
-                        )
                         department_relations.append((document_id, department_id))
 
-        department_relation_objs = [
-            DepartmentRelation(document_id=relation[0], department_id=relation[1])
-            for relation in department_relations
-        ]
-
-        officer_relation_objs = [
-            OfficerRelation(document_id=relation[0], officer_id=relation[1])
-            for relation in officer_relations
-        ]
-
-        if modified_department_relations:
-            deleted_department_relations_query = reduce(
-                operator.or_,
-                (
-                    Q(document_id=relation[0], department_id=relation[1])
-                    for relation in modified_department_relations
-                ),
-            )
-            DepartmentRelation.objects.filter(
-                deleted_department_relations_query
-            ).delete()
-
-        if modified_officer_relations:
-            deleted_officer_relations_query = reduce(
-                operator.or_,
-                (
-                    Q(document_id=relation[0], officer_id=relation[1])
-                    for relation in modified_officer_relations
-                ),
-            )
-            OfficerRelation.objects.filter(deleted_officer_relations_query).delete()
-
-        DepartmentRelation.objects.bulk_create(
-            department_relation_objs, batch_size=self.BATCH_SIZE
+        self.add_changed_ids(
+            DEPARTMENTS_CHANGED_IDS,
+            [department_id for _, department_id in department_relations],
+        )
+        self.add_changed_ids(
+            OFFICERS_CHANGED_IDS, [officer_id for _, officer_id in officer_relations]
         )
 
-        OfficerRelation.objects.bulk_create(
-            officer_relation_objs, batch_size=BATCH_SIZE
+        sync_relations(
+            DepartmentRelation, "document", "department", department_relations
         )
+        sync_relations(OfficerRelation, "document", "officer", officer_relations)
 
-    def generate_preview_image(self, image_blob, upload_url):
+    def generate_preview_image(self, file_path, upload_url, content_hash=None):
         preview_url_location = upload_url.replace(".pdf", "-preview.jpeg").replace(
             ".PDF", "-preview.jpeg"
         )
-        preview_image_blob = generate_from_blob(image_blob)
+        preview_image_blob = self.preview_cache.get(content_hash)
+
+        if preview_image_blob is None:
+            if self.preview_executor:
+                preview_image_blob = self.preview_executor.submit(
+                    generate_from_file, file_path
+                ).result()
+            else:
+                preview_image_blob = generate_from_file(file_path)
+
+            if preview_image_blob:
+                self.preview_cache.set(content_hash, preview_image_blob)
 
         if preview_image_blob:
             return self.upload_file(
                 preview_url_location, preview_image_blob, "image/jpeg"
             )
 
+    def get_download_url(self, upload_location):
+        return f"{settings.GC_DOCUMENT_BUCKET_PATH}{upload_location}".replace(
+            " ", "%20"
+        ).replace("'", "%27")
+
     def upload_file(self, upload_location, file_blob, file_type):
         try:
             self.gs.upload_file_from_string(upload_location, file_blob, file_type)
 
-            download_url = (
-                f"{settings.GC_DOCUMENT_BUCKET_PATH}{upload_location}".replace(
-                    " ", "%20"
-                ).replace("'", "%27")
-            )
-
-            return download_url
+            return self.get_download_url(upload_location)
         except Exception:
             pass
 
-    def get_ocr_text(self, ocr_text_id):
+    def upload_file_from_stream(self, upload_location, file_stream, file_type):
         try:
-            download_url = self.ds.get_temporary_link_from_path(ocr_text_id)
-            text = requests.get(download_url).text
-            return text
+            self.gs.upload_file_from_stream(upload_location, file_stream, file_type)
+
+            return self.get_download_url(upload_location)
+        except TRANSIENT_TRANSFER_ERRORS:
+            raise
         except Exception:
-            return ""
+            pass
+
+    def create_http_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_maxsize=settings.DOCUMENT_OCR_MAX_WORKERS,
+            max_retries=Retry(
+                total=DOCUMENT_TRANSFER_ATTEMPTS,
+                backoff_factor=DOCUMENT_TRANSFER_RETRY_DELAY,
+                status_forcelist=OCR_TEXT_RETRY_STATUSES,
+            ),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+    def fetch_ocr_text(self, ocr_text_id, content_hash=None):
+        cached_text = self.ocr_text_cache.get(content_hash)
+        if cached_text is not None:
+            return cached_text.decode("utf-8")
+
+        download_url = self.ds.get_temporary_link_from_path(ocr_text_id)
+        res = self.http_session.get(download_url, timeout=OCR_TEXT_TIMEOUT)
+        res.raise_for_status()
+        text = res.text
+
+        self.ocr_text_cache.set(content_hash, text.encode("utf-8"))
+
+        return text
+
+    def fetch_ocr_texts(self):
+        """Fetch the pending OCR texts concurrently then set them on their documents.
+
+        Documents whose text could not be fetched keep their previous text and
+        content hash, and get no row fingerprint, so that the fetch is tried again
+        on the next import.
+        """
+        failed_documents = []
+
+        with ThreadPoolExecutor(
+            max_workers=settings.DOCUMENT_OCR_MAX_WORKERS
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self.fetch_ocr_text,
+                    ocr_text_id,
+                    documents[0].get("txt_db_content_hash"),
+                ): ocr_text_id
+                for ocr_text_id, documents in self.pending_ocr_texts.items()
+            }
+
+            for future in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Fetch documents' OCR texts",
+            ):
+                ocr_text_id = futures[future]
+                documents = self.pending_ocr_texts[ocr_text_id]
+
+                try:
+                    ocr_text = future.result()
+                except Exception as e:
+                    logger.warning(
+                        "Error fetching document OCR text",
+                        ocr_text_id=ocr_text_id,
+                        error=str(e),
+                    )
+                    failed_documents.extend(documents)
+                    continue
+
+                for document in documents:
+                    document["text_content"] = ocr_text
+
+        self.pending_ocr_texts = {}
+
+        if failed_documents:
+            self.restore_ocr_texts(failed_documents)
+
+    def restore_ocr_texts(self, documents):
+        old_ocr_texts = {
+            document_id: (text_content, txt_db_content_hash)
+            for document_id, text_content, txt_db_content_hash in (
+                Document.objects.filter(
+                    id__in=[
+                        document["id"] for document in documents if document.get("id")
+                    ]
+                ).values_list("id", "text_content", "txt_db_content_hash")
+            )
+        }
+
+        for document in documents:
+            (
+                document["text_content"],
+                document["txt_db_content_hash"],
+            ) = old_ocr_texts.get(document.get("id"), ("", None))
+            document[ROW_FINGERPRINT_FIELD] = None
 
-    def handle_file_process(self, pdf_db_path):
+    def handle_file_process(self, pdf_db_path, content_hash=None):
         upload_url = pdf_db_path.replace("/PPACT/", "")
 
         download_url = self.ds.get_temporary_link_from_path(
             pdf_db_path.replace("/PPACT/", "/LLEAD/")
         )
-        res = requests.get(download_url)
-        image_blob = res.content
-        content_type = res.headers["content-type"]
+        res = requests.get(
+            download_url,
+            stream=True,
+            timeout=(
+                settings.DOCUMENT_TRANSFER_CONNECT_TIMEOUT,
+                settings.DOCUMENT_TRANSFER_READ_TIMEOUT,
+            ),
+        )
 
-        document_url = self.upload_file(upload_url, image_blob, content_type)
+        try:
+            content_type = res.headers["content-type"]
+            should_generate_preview = content_type == "application/pdf"
+            should_render_preview = (
+                should_generate_preview and content_hash not in self.preview_cache
+            )
+
+            # Only the files whose preview must be rendered are copied to disk
+            # while they are uploaded, the others go straight through.
+            with (
+                tempfile.NamedTemporaryFile(suffix=".pdf")
+                if should_render_preview
+                else nullcontext()
+            ) as preview_file:
+                document_url = self.upload_file_from_stream(
+                    upload_url, ResponseStream(res, preview_file), content_type
+                )
 
-        if not document_url:
-            return {}
+                if not document_url:
+                    return {}
 
-        document_preview_url = None
-        if content_type == "application/pdf":
-            document_preview_url = self.generate_preview_image(image_blob, upload_url)
+                document_preview_url = None
+                if should_generate_preview:
+                    if preview_file:
+                        preview_file.flush()
+
+                    document_preview_url = self.generate_preview_image(
+                        preview_file.name if preview_file else None,
+                        upload_url,
+                        content_hash,
+                    )
+        finally:
+            res.close()
 
         uploaded_url = {
             "document_url": document_url,
@@ -248,8 +450,113 @@ class DocumentImporter(BaseImporter):
 
         return uploaded_url
 
-    def handle_record_data(self, row):
-        document_data = self.parse_row_data(row, self.column_mappings)
+    def transfer_file(self, pdf_db_path, content_hash=None):
+        for attempt in range(1, DOCUMENT_TRANSFER_ATTEMPTS + 1):
+            try:
+                return self.handle_file_process(pdf_db_path, content_hash)
+            except TRANSIENT_TRANSFER_ERRORS as e:
+                if attempt == DOCUMENT_TRANSFER_ATTEMPTS:
+                    raise
+
+                logger.warning(
+                    "Retry transferring document file",
+                    pdf_db_path=pdf_db_path,
+                    attempt=attempt,
+                    error=str(e),
+                )
+                time.sleep(DOCUMENT_TRANSFER_RETRY_DELAY * attempt)
+
+    def set_uploaded_file(self, document, uploaded_file):
+        document["url"] = uploaded_file["document_url"]
+        document["preview_image_url"] = uploaded_file["document_preview_url"]
+        document["document_type"] = uploaded_file["document_type"]
+
+    @contextmanager
+    def open_preview_executor(self):
+        max_workers = settings.DOCUMENT_PREVIEW_MAX_WORKERS
+
+        if not max_workers:
+            yield
+            return
+
+        # Daemonic processes, like the Celery prefork workers, cannot have children.
+        if multiprocessing.current_process().daemon:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        with executor:
+            self.preview_executor = executor
+            try:
+                yield
+            finally:
+                self.preview_executor = None
+
+    def transfer_files(self):
+        """Transfer the pending files from Dropbox to Google Cloud concurrently.
+
+        Each file is transferred once, then its urls are set on every document
+        using it. Documents whose file could not be uploaded are not imported.
+        """
+        failed_documents = []
+
+        with self.open_preview_executor(), ThreadPoolExecutor(
+            max_workers=settings.DOCUMENT_TRANSFER_MAX_WORKERS
+        ) as executor:
+            futures = {
+                executor.submit(
+                    self.transfer_file,
+                    pdf_db_path,
+                    documents[0].get("pdf_db_content_hash"),
+                ): pdf_db_path
+                for pdf_db_path, documents in self.pending_uploads.items()
+            }
+
+            for future in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Transfer documents' files",
+            ):
+                pdf_db_path = futures[future]
+
+                try:
+                    uploaded_file = future.result()
+                except ApiError:
+                    for pending_future in futures:
+                        pending_future.cancel()
+
+                    raise ValueError(
+                        f"Error downloading dropbox file from path: {pdf_db_path}"
+                    )
+
+                documents = self.pending_uploads[pdf_db_path]
+
+                if uploaded_file.get("document_url"):
+                    self.uploaded_files[pdf_db_path] = uploaded_file
+                    for document in documents:
+                        self.set_uploaded_file(document, uploaded_file)
+                else:
+                    failed_documents.extend(documents)
+
+        self.pending_uploads = {}
+
+        if failed_documents:
+            failed_document_ids = {id(document) for document in failed_documents}
+            self.new_documents = [
+                document
+                for document in self.new_documents
+                if id(document) not in failed_document_ids
+            ]
+            self.update_documents = [
+                document
+                for document in self.update_documents
+                if id(document) not in failed_document_ids
+            ]
+
+    def handle_record_data(self, row, document_data):
         document_data["pages_count"] = (
             row[self.column_mappings["page_count"]]
             if row[self.column_mappings["page_count"]]
@@ -280,33 +587,10 @@ class DocumentImporter(BaseImporter):
             should_upload_file = True
 
         if should_upload_file:
-            try:
-                if pdf_db_path in self.uploaded_files:
-                    uploaded_file = self.uploaded_files[pdf_db_path]
-                    document["url"] = uploaded_file["document_url"]
-                    document["preview_image_url"] = uploaded_file[
-                        "document_preview_url"
-                    ]
-                    document["document_type"] = uploaded_file["document_type"]
-                else:
-                    uploaded_url = self.handle_file_process(pdf_db_path)
-
-                    document_url = uploaded_url.get("document_url")
-
-                    if not document_url:
-                        return
-
-                    document["url"] = document_url
-                    document["document_type"] = uploaded_url.get("document_type")
-                    document["preview_image_url"] = uploaded_url.get(
-                        "document_preview_url"
-                    )
-
-                    self.uploaded_files[pdf_db_path] = uploaded_url
-            except ApiError:
-                raise ValueError(
-                    f"Error downloading dropbox file from path: {pdf_db_path}"
-                )
+            if pdf_db_path in self.uploaded_files:
+                self.set_uploaded_file(document, self.uploaded_files[pdf_db_path])
+            else:
+                self.pending_uploads.setdefault(pdf_db_path, []).append(document)
 
         hrg_text = row[self.column_mappings["hrg_text"]]
         if hrg_text:
@@ -316,23 +600,25 @@ class DocumentImporter(BaseImporter):
                 old_document.get("txt_db_content_hash") if old_document else None
             )
             if document_data["txt_db_content_hash"] != old_txt_db_content_hash:
-                ocr_text = self.get_ocr_text(
-                    document_data["txt_db_id"].replace("/PPACT/", "/LLEAD/")
-                )
-                document["text_content"] = ocr_text
+                self.pending_ocr_texts.setdefault(
+                    document_data["txt_db_id"].replace("/PPACT/", "/LLEAD/"), []
+                ).append(document)
 
         if document:
             if old_document:
                 self.update_documents.append(document)
             elif (docid, hrg_no, matched_uid, agency) not in self.new_docids:
-                self.new_docids.append((docid, hrg_no, matched_uid, agency))
+                self.new_docids.add((docid, hrg_no, matched_uid, agency))
                 self.new_documents.append(document)
 
     def import_data(self, data):
         self.document_mappings = self.get_document_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new documents"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new documents"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed documents"):
             document_data = self.parse_row_data(row, self.old_column_mappings)
@@ -348,8 +634,14 @@ class DocumentImporter(BaseImporter):
             if old_document:
                 self.delete_documents_ids.append(old_document.get("id"))
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified documents"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified documents"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
+
+        self.transfer_files()
+        self.fetch_ocr_texts()
 
         import_result = self.bulk_import(
             Document,
@@ -1,17 +1,40 @@
 from itertools import chain
 
+from django.db import connection, transaction
+
+import structlog
 from tqdm import tqdm
 
 from complaints.models import Complaint
-from data.constants import EVENT_MODEL_NAME
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    APPEAL_MODEL_NAME,
+    BRADY_MODEL_NAME,
+    COMPLAINT_MODEL_NAME,
+    EVENT_DEPARTMENTS_CHANGED_IDS,
+    EVENT_MODEL_NAME,
+    OFFICER_MODEL_NAME,
+    USE_OF_FORCE_MODEL_NAME,
+)
 from data.services.base_importer import BaseImporter
-from data.services.data_reconciliation import DataReconciliation
+from data.services.streaming_data_reconciliation import StreamingDataReconciliation
 from officers.models import Event
 
+logger = structlog.get_logger("IPNO")
+
 
 class EventImporter(BaseImporter):
     data_model = EVENT_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+        COMPLAINT_MODEL_NAME,
+        USE_OF_FORCE_MODEL_NAME,
+        APPEAL_MODEL_NAME,
+        BRADY_MODEL_NAME,
+    ]
     WRGL_OFFSET_BATCH_SIZE = 750
+    COPY_BULK_IMPORT = True
 
     INT_ATTRIBUTES = [
         "year",
@@ -33,7 +56,7 @@ class EventImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_events_attrs = []
         self.update_events_attrs = []
-        self.new_event_uids = []
+        self.new_event_uids = set()
         self.delete_events_ids = []
         self.department_mappings = {}
         self.officer_mappings = {}
@@ -41,7 +64,32 @@ class EventImporter(BaseImporter):
         self.uof_mappings = {}
         self.appeal_mappings = {}
         self.brady_mappings = {}
-        self.data_reconciliation = DataReconciliation(EVENT_MODEL_NAME, csv_file_path)
+        self.data_reconciliation = StreamingDataReconciliation(
+            EVENT_MODEL_NAME, csv_file_path
+        )
+
+    def get_changed_department_ids(self):
+        """Get the departments whose events change with this import.
+
+        These are the departments of the events to create or update, and the
+        current departments of the events to update or delete.
+        """
+        changed_events_ids = self.delete_events_ids + [
+            attrs["id"] for attrs in self.update_events_attrs
+        ]
+        department_ids = {
+            attrs.get("department_id")
+            for attrs in chain(self.new_events_attrs, self.update_events_attrs)
+        }
+
+        for i in range(0, len(changed_events_ids), self.BATCH_SIZE):
+            department_ids.update(
+                Event.objects.filter(
+                    id__in=changed_events_ids[i : i + self.BATCH_SIZE]
+                ).values_list("department_id", flat=True)
+            )
+
+        return department_ids
 
     def get_event_mappings(self):
         return {
@@ -49,29 +97,53 @@ class EventImporter(BaseImporter):
         }
 
     def update_relations(self):
-        ComplaintRelation = Event.complaints.through
-        complaint_relations = []
+        """Sync the Event and Complaint relations joined on allegation_uid.
 
-        events = Event.objects.filter(allegation_uid__isnull=False).only(
-            "id", "allegation_uid"
+        Only the relations that are no longer matched are deleted and only the
+        missing ones are inserted, the other rows of the through table are kept.
+        """
+        ComplaintRelation = Event.complaints.through
+        quote_name = connection.ops.quote_name
+        relation_table = quote_name(ComplaintRelation._meta.db_table)
+        event_table = quote_name(Event._meta.db_table)
+        complaint_table = quote_name(Complaint._meta.db_table)
+        event_column = quote_name(ComplaintRelation._meta.get_field("event").column)
+        complaint_column = quote_name(
+            ComplaintRelation._meta.get_field("complaint").column
+        )
+        matched_relations = (
+            "SELECT event.id AS event_id, complaint.id AS complaint_id"
+            f" FROM {event_table} AS event"
+            f" INNER JOIN {complaint_table} AS complaint"
+            " ON complaint.allegation_uid = event.allegation_uid"
         )
 
-        for event in tqdm(events, desc="Update events' relations"):
-            complaint_ids = Complaint.objects.filter(
-                allegation_uid=event.allegation_uid,
-            ).values_list("id", flat=True)
-
-            complaint_relations += [
-                ComplaintRelation(complaint_id=complaint_id, event_id=event.id)
-                for complaint_id in complaint_ids
-            ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {relation_table} AS relation WHERE NOT EXISTS ("
+                f"SELECT 1 FROM ({matched_relations}) AS matched"
+                f" WHERE matched.event_id = relation.{event_column}"
+                f" AND matched.complaint_id = relation.{complaint_column})"
+            )
+            deleted_count = cursor.rowcount
+
+            cursor.execute(
+                f"INSERT INTO {relation_table} ({event_column}, {complaint_column})"
+                " SELECT matched.event_id, matched.complaint_id"
+                f" FROM ({matched_relations}) AS matched"
+                f" WHERE NOT EXISTS (SELECT 1 FROM {relation_table} AS relation"
+                f" WHERE relation.{event_column} = matched.event_id"
+                f" AND relation.{complaint_column} = matched.complaint_id)"
+            )
+            created_count = cursor.rowcount
 
-        ComplaintRelation.objects.all().delete()
-        ComplaintRelation.objects.bulk_create(
-            complaint_relations, batch_size=self.BATCH_SIZE
+        logger.info(
+            "Updated events' complaint relations",
+            created_relations=created_count,
+            deleted_relations=deleted_count,
         )
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, event_data):
         agency = row[self.column_mappings["agency"]]
         event_uid = row[self.column_mappings["event_uid"]]
         officer_uid = row[self.column_mappings["uid"]]
@@ -84,7 +156,6 @@ class EventImporter(BaseImporter):
         appeal_id = self.appeal_mappings.get(appeal_uid)
         brady_id = self.brady_mappings.get(brady_uid)
 
-        event_data = self.parse_row_data(row, self.column_mappings)
         department_id = self.department_mappings[agency]
         event_data["department_id"] = department_id
 
@@ -99,30 +170,10 @@ class EventImporter(BaseImporter):
             event_data["id"] = event_id
             self.update_events_attrs.append(event_data)
         elif event_uid not in self.new_event_uids:
-            self.new_event_uids.append(event_uid)
+            self.new_event_uids.add(event_uid)
             self.new_events_attrs.append(event_data)
 
     def import_data(self, data):
-        saved_data = list(
-            chain(
-                data.get("added_rows", []),
-                data.get("updated_rows", []),
-            )
-        )
-        deleted_data = data.get("deleted_rows", [])
-
-        agencies = {
-            row[self.column_mappings["agency"]]
-            for row in saved_data
-            if row[self.column_mappings["agency"]]
-        }
-        agencies.update(
-            [
-                row[self.old_column_mappings["agency"]]
-                for row in deleted_data
-                if row[self.old_column_mappings["agency"]]
-            ]
-        )
         self.department_mappings = self.get_department_mappings()
 
         self.officer_mappings = self.get_officer_mappings()
@@ -131,8 +182,10 @@ class EventImporter(BaseImporter):
         self.appeal_mappings = self.get_appeal_mappings()
         self.brady_mappings = self.get_brady_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new events"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new events"), self.column_mappings
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed events"):
             event_uid = row[self.old_column_mappings["event_uid"]]
@@ -140,8 +193,16 @@ class EventImporter(BaseImporter):
             if event_id:
                 self.delete_events_ids.append(event_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified events"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified events"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
+
+        if self.import_session:
+            self.import_session.add_changed_ids(
+                EVENT_DEPARTMENTS_CHANGED_IDS, self.get_changed_department_ids()
+            )
 
         import_result = self.bulk_import(
             Event,
@@ -0,0 +1,91 @@
+import threading
+from collections import defaultdict
+
+from appeals.models import Appeal
+from brady.models import Brady
+from complaints.models import Complaint
+from data.constants import (
+    DEPARTMENTS_CHANGED_IDS,
+    OFFICERS_CHANGED_IDS,
+    PEOPLE_CHANGED_IDS,
+)
+from departments.models import Department
+from officers.models import Officer
+from people.models import Person
+from use_of_forces.models import UseOfForce
+
+MAPPINGS_BATCH_SIZE = 10000
+
+MAPPING_KEY_FIELDS = {
+    Department: "agency_slug",
+    Officer: "uid",
+    UseOfForce: "uof_uid",
+    Appeal: "appeal_uid",
+    Complaint: "allegation_uid",
+    Brady: "brady_uid",
+}
+
+CHANGED_ENTITY_NAMES = {
+    Officer: OFFICERS_CHANGED_IDS,
+    Department: DEPARTMENTS_CHANGED_IDS,
+    Person: PEOPLE_CHANGED_IDS,
+}
+
+
+def load_mappings(klass):
+    return dict(klass.objects.values_list(MAPPING_KEY_FIELDS[klass], "id"))
+
+
+class ImportSession:
+    """Mappings from uid to id shared by the importers of one import.
+
+    Each mapping is loaded from the database the first time an importer asks
+    for it, then kept up to date with the rows the importers create or delete.
+    Importers can also record the ids of rows they changed, so that the steps
+    following the import only recompute those.
+    """
+
+    def __init__(self):
+        self.mappings = {}
+        self.changed_ids = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def add_changed_ids(self, name, ids):
+        with self.lock:
+            self.changed_ids[name].update(id for id in ids if id is not None)
+
+    def get_changed_ids(self, name):
+        with self.lock:
+            return set(self.changed_ids[name])
+
+    def get_mappings(self, klass):
+        with self.lock:
+            if klass not in self.mappings:
+                self.mappings[klass] = load_mappings(klass)
+
+            return self.mappings[klass]
+
+    def update_mappings(self, klass, created_keys, deleted_ids):
+        with self.lock:
+            mappings = self.mappings.get(klass)
+
+            if mappings is None:
+                return
+
+            if deleted_ids:
+                deleted_ids = set(deleted_ids)
+                for key in [key for key, id in mappings.items() if id in deleted_ids]:
+                    del mappings[key]
+
+            key_field = MAPPING_KEY_FIELDS[klass]
+            created_keys = list(created_keys)
+            for i in range(0, len(created_keys), MAPPINGS_BATCH_SIZE):
+                mappings.update(
+                    klass.objects.filter(
+                        **{
+                            f"{key_field}__in": created_keys[
+                                i : i + MAPPINGS_BATCH_SIZE
+                            ]
+                        }
+                    ).values_list(key_field, "id")
+                )
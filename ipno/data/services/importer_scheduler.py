@@ -0,0 +1,144 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.utils import timezone
+
+import structlog
+
+from data.models import ImportLog
+from data.services.shadow_tables import close_connections
+
+logger = structlog.get_logger("IPNO")
+
+
+class ImporterScheduler:
+    """Run importers following the dependencies declared on each importer.
+
+    An importer starts once all of its `DEPENDENCIES` are imported, importers
+    not depending on each other run concurrently in worker threads.
+    """
+
+    def __init__(self, importer_classes, run_importer, max_workers=1):
+        self.importer_classes = importer_classes
+        self.run_importer = run_importer
+        self.max_workers = max_workers
+        self.timings = {}
+
+        self._validate_dependencies()
+
+    def _get_dependencies(self, importer_class):
+        model_names = {
+            importer_class.data_model for importer_class in self.importer_classes
+        }
+
+        return [
+            dependency
+            for dependency in importer_class.DEPENDENCIES
+            if dependency in model_names
+        ]
+
+    def _validate_dependencies(self):
+        imported = set()
+        pending = list(self.importer_classes)
+
+        while pending:
+            ready = [
+                importer_class
+                for importer_class in pending
+                if set(self._get_dependencies(importer_class)) <= imported
+            ]
+
+            if not ready:
+                raise ValueError(
+                    "Circular importer dependencies: "
+                    f"{', '.join(klass.data_model for klass in pending)}"
+                )
+
+            for importer_class in ready:
+                imported.add(importer_class.data_model)
+                pending.remove(importer_class)
+
+    def _get_ready_importers(self, pending, results):
+        return [
+            importer_class
+            for importer_class in pending
+            if all(
+                dependency in results
+                for dependency in self._get_dependencies(importer_class)
+            )
+        ]
+
+    def _save_timings(self, data_model, started_at):
+        # Only the import log created by the importer during this run is updated
+        ImportLog.objects.filter(
+            data_model=data_model, created_at__gte=started_at
+        ).update(**self.timings[data_model])
+
+    def _run_node(self, importer_class, queued_at):
+        logged_at = timezone.now()
+        started_at = time.monotonic()
+
+        try:
+            return self.run_importer(importer_class)
+        finally:
+            finished_at = time.monotonic()
+            self.timings[importer_class.data_model] = {
+                "waiting_time": started_at - queued_at,
+                "running_time": finished_at - started_at,
+            }
+            self._save_timings(importer_class.data_model, logged_at)
+
+            logger.info(
+                f"Finished importing {importer_class.data_model}",
+                **self.timings[importer_class.data_model],
+            )
+
+    def _run_in_thread(self, importer_class, queued_at):
+        try:
+            return self._run_node(importer_class, queued_at)
+        finally:
+            # Each worker thread opens its own database connections
+            close_connections()
+
+    def _run_sequentially(self):
+        results = {}
+        pending = list(self.importer_classes)
+
+        while pending:
+            importer_class = self._get_ready_importers(pending, results)[0]
+            pending.remove(importer_class)
+
+            results[importer_class.data_model] = self._run_node(
+                importer_class, time.monotonic()
+            )
+
+        return results
+
+    def _run_concurrently(self):
+        results = {}
+        pending = list(self.importer_classes)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for importer_class in self._get_ready_importers(pending, results):
+                    pending.remove(importer_class)
+                    future = executor.submit(
+                        self._run_in_thread, importer_class, time.monotonic()
+                    )
+                    running[future] = importer_class.data_model
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    # Raising here stops scheduling the remaining importers, the
+                    # running ones are still waited for when leaving the executor.
+                    results[running.pop(future)] = future.result()
+
+        return results
+
+    def run(self):
+        if self.max_workers > 1:
+            return self._run_concurrently()
+
+        return self._run_sequentially()
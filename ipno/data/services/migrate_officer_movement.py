@@ -1,34 +1,86 @@
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Lead
 
 from departments.models import OfficerMovement
 from post_officer_history.models import PostOfficerHistory
 
 
-class MigrateOfficerMovement:  # pragma: no cover
-    def process(self):
-        OfficerMovement.objects.all().delete()
+class MigrateOfficerMovement:
+    BATCH_SIZE = 1000
 
-        duplicate_histories = (
-            PostOfficerHistory.objects.values_list("history_id", flat=True)
-            .annotate(history_count=Count("history_id"))
-            .filter(history_count__gt=1)
+    def get_officer_movements(self, history_ids=None):
+        """Build a movement from each history to the next one of the same history_id.
+
+        The next history is looked up with window functions partitioned by
+        history_id and ordered by hire_date, in a single query.
+        """
+        histories = PostOfficerHistory.objects.all()
+
+        if history_ids is not None:
+            histories = histories.filter(history_id__in=history_ids)
+
+        window = {
+            "partition_by": [F("history_id")],
+            "order_by": [F("hire_date").asc(), F("id").asc()],
+        }
+        histories = histories.annotate(
+            next_id=Window(expression=Lead("id"), **window),
+            next_department_id=Window(expression=Lead("department_id"), **window),
+            next_hire_date=Window(expression=Lead("hire_date"), **window),
+        ).values_list(
+            "history_id",
+            "department_id",
+            "officer_id",
+            "left_reason",
+            "next_id",
+            "next_department_id",
+            "next_hire_date",
         )
 
-        officer_movements = []
+        return [
+            OfficerMovement(
+                start_department_id=department_id,
+                end_department_id=next_department_id,
+                officer_id=officer_id,
+                date=next_hire_date,
+                left_reason=left_reason,
+                history_id=history_id,
+            )
+            for (
+                history_id,
+                department_id,
+                officer_id,
+                left_reason,
+                next_id,
+                next_department_id,
+                next_hire_date,
+            ) in histories.iterator()
+            if next_id is not None and next_hire_date is not None
+        ]
+
+    def process(self, history_ids=None):
+        """Rebuild the officer movements, of the given history_ids only if set.
+
+        Movements built before they recorded their history_id can not be matched
+        to a history, so their presence falls back to a full rebuild.
+        """
+        if (
+            history_ids is not None
+            and OfficerMovement.objects.filter(history_id__isnull=True).exists()
+        ):
+            history_ids = None
 
-        for history_id in duplicate_histories:
-            histories = PostOfficerHistory.objects.filter(
-                history_id=history_id
-            ).order_by("hire_date")
+        officer_movements = self.get_officer_movements(history_ids)
 
-            for index in range(0, len(histories) - 1):
-                officer_movement = OfficerMovement(
-                    start_department=histories[index].department,
-                    end_department=histories[index + 1].department,
-                    officer=histories[index].officer,
-                    date=histories[index + 1].hire_date,
-                    left_reason=histories[index].left_reason,
-                )
-                officer_movements.append(officer_movement)
+        # The previous movements are replaced in one transaction, so that they
+        # are still served while the new ones are being computed.
+        with transaction.atomic():
+            if history_ids is None:
+                OfficerMovement.objects.all().delete()
+            else:
+                OfficerMovement.objects.filter(history_id__in=history_ids).delete()
 
-        OfficerMovement.objects.bulk_create(officer_movements)
+            OfficerMovement.objects.bulk_create(
+                officer_movements, batch_size=self.BATCH_SIZE
+            )
@@ -1,6 +1,6 @@
 from tqdm import tqdm
 
-from data.constants import OFFICER_MODEL_NAME
+from data.constants import AGENCY_MODEL_NAME, OFFICER_MODEL_NAME
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 from officers.models import Officer
@@ -8,6 +8,7 @@ from officers.models import Officer
 
 class OfficerImporter(BaseImporter):
     data_model = OFFICER_MODEL_NAME
+    DEPENDENCIES = [AGENCY_MODEL_NAME]
 
     INT_ATTRIBUTES = [
         "birth_year",
@@ -30,11 +31,10 @@ class OfficerImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_officers_atrs = []
         self.update_officers_attrs = []
-        self.new_officer_uids = []
+        self.new_officer_uids = set()
         self.delete_officers_ids = []
         self.officer_mappings = {}
         self.officer_name_mappings = {}
-        self.existed_officers_uids = []
         self.department_mappings = {}
 
         self.data_reconciliation = DataReconciliation(OFFICER_MODEL_NAME, csv_file_path)
@@ -45,18 +45,17 @@ class OfficerImporter(BaseImporter):
             for officer in Officer.objects.only("uid", "first_name", "last_name")
         }
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, officer_data):
         agency = row[self.column_mappings["agency"]]
-        officer_data = self.parse_row_data(row, self.column_mappings)
 
         department_id = self.department_mappings[agency]
         officer_data["department_id"] = department_id
 
         row_uid = officer_data["uid"]
 
-        if row_uid in self.existed_officers_uids:
-            officer_id = self.officer_mappings.get(row_uid)
+        officer_id = self.officer_mappings.get(row_uid)
 
+        if officer_id:
             officer_data["id"] = officer_id
 
             officer_names = self.officer_name_mappings.get(row_uid)
@@ -72,7 +71,7 @@ class OfficerImporter(BaseImporter):
 
             self.update_officers_attrs.append(officer_data)
         elif row_uid not in self.new_officer_uids:
-            self.new_officer_uids.append(row_uid)
+            self.new_officer_uids.add(row_uid)
             self.new_officers_atrs.append(officer_data)
 
     def import_data(self, data):
@@ -80,12 +79,12 @@ class OfficerImporter(BaseImporter):
 
         self.officer_mappings = self.get_officer_mappings()
         self.officer_name_mappings = self.get_officer_name_mappings()
-        self.existed_officers_uids = list(
-            Officer.objects.all().values_list("uid", flat=True)
-        )
 
-        for row in tqdm(data.get("added_rows"), desc="Create new officers"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new officers"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed officers"):
             row_uid = row[self.old_column_mappings["uid"]]
@@ -93,8 +92,11 @@ class OfficerImporter(BaseImporter):
             if officer_id:
                 self.delete_officers_ids.append(officer_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified officers"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified officers"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             Officer,
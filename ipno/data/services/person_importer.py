@@ -2,7 +2,12 @@ from itertools import chain
 
 from tqdm import tqdm
 
-from data.constants import PERSON_MODEL_NAME
+from data.constants import (
+    OFFICER_MODEL_NAME,
+    OFFICERS_CHANGED_IDS,
+    PEOPLE_CHANGED_IDS,
+    PERSON_MODEL_NAME,
+)
 from data.services import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 from officers.models import Officer
@@ -11,6 +16,7 @@ from people.models import Person
 
 class PersonImporter(BaseImporter):
     data_model = PERSON_MODEL_NAME
+    DEPENDENCIES = [OFFICER_MODEL_NAME]
 
     ATTRIBUTES = ["canonical_officer_uid", "person_id", "canonical_uid", "uids"]
     UPDATE_ATTRIBUTES = [
@@ -62,7 +68,20 @@ class PersonImporter(BaseImporter):
                     }
                     update_officers_attrs.append(officer_data)
 
+        officer_ids = [attrs["id"] for attrs in update_officers_attrs]
+        self.add_changed_ids(OFFICERS_CHANGED_IDS, officer_ids)
+        self.add_changed_ids(
+            PEOPLE_CHANGED_IDS,
+            [attrs["person_id"] for attrs in update_officers_attrs],
+        )
+
         for i in range(0, len(update_officers_attrs), self.BATCH_SIZE):
+            self.add_changed_ids(
+                PEOPLE_CHANGED_IDS,
+                Officer.objects.filter(
+                    id__in=officer_ids[i : i + self.BATCH_SIZE]
+                ).values_list("person_id", flat=True),
+            )
             update_objects = [
                 Officer(**attrs)
                 for attrs in update_officers_attrs[i : i + self.BATCH_SIZE]
@@ -71,9 +90,8 @@ class PersonImporter(BaseImporter):
 
         return len(update_officers_attrs)
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, person_data):
         canonical_uid = row[self.column_mappings["canonical_uid"]]
-        person_data = self.parse_row_data(row, self.column_mappings)
 
         person_id = person_data["person_id"]
         person_data["canonical_officer_id"] = self.officer_mappings.get(canonical_uid)
@@ -91,8 +109,10 @@ class PersonImporter(BaseImporter):
         self.officer_mappings = self.get_officer_mappings()
         self.person_mappings = self.get_person_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new people"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new people"), self.column_mappings
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed people"):
             person_id = row[self.column_mappings["person_id"]]
@@ -100,8 +120,11 @@ class PersonImporter(BaseImporter):
             if person_key:
                 self.delete_people_ids.append(person_key)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified people"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified people"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         import_result = self.bulk_import(
             Person,
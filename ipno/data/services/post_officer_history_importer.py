@@ -1,6 +1,13 @@
+from itertools import chain
+
 from tqdm import tqdm
 
-from data.constants import POST_OFFICE_HISTORY_MODEL_NAME
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    OFFICER_MODEL_NAME,
+    POST_OFFICE_HISTORY_MODEL_NAME,
+    POST_OFFICER_HISTORY_CHANGED_IDS,
+)
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 from post_officer_history.models import PostOfficerHistory
@@ -8,6 +15,10 @@ from post_officer_history.models import PostOfficerHistory
 
 class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
     data_model = POST_OFFICE_HISTORY_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
 
     DATE_ATTRIBUTES = ["hire_date"]
 
@@ -23,7 +34,7 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
     def __init__(self, csv_file_path):
         self.new_post_officer_history_attrs = []
         self.update_post_officer_history_attrs = []
-        self.new_uids = []
+        self.new_uids = set()
         self.delete_post_officer_history_ids = []
         self.officer_mappings = {}
         self.department_mappings = {}
@@ -33,15 +44,13 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
             POST_OFFICE_HISTORY_MODEL_NAME, csv_file_path
         )
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, post_officer_history_data):
         uid = row[self.column_mappings["uid"]]
         officer_id = self.officer_mappings[uid]
 
         agency = row[self.column_mappings["agency"]]
         department_id = self.department_mappings[agency]
 
-        post_officer_history_data = self.parse_row_data(row, self.column_mappings)
-
         post_officer_history_id = self.post_officer_history_mappings.get(uid)
         post_officer_history_data["officer_id"] = officer_id
         post_officer_history_data["department_id"] = department_id
@@ -50,7 +59,7 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
             post_officer_history_data["id"] = post_officer_history_id
             self.update_post_officer_history_attrs.append(post_officer_history_data)
         elif uid not in self.new_uids:
-            self.new_uids.append(uid)
+            self.new_uids.add(uid)
             self.new_post_officer_history_attrs.append(post_officer_history_data)
 
     def import_data(self, data):
@@ -58,8 +67,11 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
         self.officer_mappings = self.get_officer_mappings()
         self.department_mappings = self.get_department_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new post officer history"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new post officer history"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(
             data.get("deleted_rows"), desc="Delete removed post officer history"
@@ -69,10 +81,16 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
             if post_officer_history_id:
                 self.delete_post_officer_history_ids.append(post_officer_history_id)
 
-        for row in tqdm(
-            data.get("updated_rows"), desc="Update modified post officer history"
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified post officer history"),
+            self.column_mappings,
         ):
-            self.handle_record_data(row)
+            self.handle_record_data(row, row_data)
+
+        if self.import_session:
+            self.import_session.add_changed_ids(
+                POST_OFFICER_HISTORY_CHANGED_IDS, self.get_changed_history_ids()
+            )
 
         return self.bulk_import(
             PostOfficerHistory,
@@ -81,6 +99,32 @@ class PostOfficerHistoryImporter(BaseImporter):  # pragma: no cover
             self.delete_post_officer_history_ids,
         )
 
+    def get_changed_history_ids(self):
+        """Get the history_ids whose post officer histories change with this import.
+
+        These are the history_ids of the histories to create or update, and the
+        current history_ids of the histories to update or delete.
+        """
+        changed_ids = self.delete_post_officer_history_ids + [
+            attrs["id"] for attrs in self.update_post_officer_history_attrs
+        ]
+        history_ids = {
+            attrs.get("history_id")
+            for attrs in chain(
+                self.new_post_officer_history_attrs,
+                self.update_post_officer_history_attrs,
+            )
+        }
+
+        for i in range(0, len(changed_ids), self.BATCH_SIZE):
+            history_ids.update(
+                PostOfficerHistory.objects.filter(
+                    id__in=changed_ids[i : i + self.BATCH_SIZE]
+                ).values_list("history_id", flat=True)
+            )
+
+        return history_ids
+
     def get_post_officer_history_mappings(self):
         return {
             post_officer_history.uid: post_officer_history.id
@@ -0,0 +1,50 @@
+from django.db import connection, transaction
+
+
+def sync_relations(through, source_field, target_field, pairs, source_ids=None):
+    """Apply the relation pairs to a many to many through table by difference.
+
+    Pairs missing from the table are inserted. When `source_ids` is given, the
+    relations of those sources that are not in `pairs` are deleted as well.
+    The pairs are sent as two arrays and joined with `unnest`, so the queries
+    keep the same size whatever the number of relations.
+    """
+    quote_name = connection.ops.quote_name
+    table = quote_name(through._meta.db_table)
+    source_column = quote_name(through._meta.get_field(source_field).column)
+    target_column = quote_name(through._meta.get_field(target_field).column)
+
+    pairs = set(pairs)
+    source_values = [source_id for source_id, _ in pairs]
+    target_values = [target_id for _, target_id in pairs]
+    staged_pairs = "unnest(%s::bigint[], %s::bigint[]) AS pair(source_id, target_id)"
+
+    created_count = deleted_count = 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if source_ids:
+            cursor.execute(
+                f"DELETE FROM {table} AS relation"
+                f" WHERE relation.{source_column} = ANY(%s::bigint[])"
+                f" AND NOT EXISTS (SELECT 1 FROM {staged_pairs}"
+                f" WHERE pair.source_id = relation.{source_column}"
+                f" AND pair.target_id = relation.{target_column})",
+                [list(set(source_ids)), source_values, target_values],
+            )
+            deleted_count = cursor.rowcount
+
+        if pairs:
+            cursor.execute(
+                f"INSERT INTO {table} ({source_column}, {target_column})"
+                f" SELECT pair.source_id, pair.target_id FROM {staged_pairs}"
+                f" WHERE NOT EXISTS (SELECT 1 FROM {table} AS relation"
+                f" WHERE relation.{source_column} = pair.source_id"
+                f" AND relation.{target_column} = pair.target_id)",
+                [source_values, target_values],
+            )
+            created_count = cursor.rowcount
+
+    return {
+        "created_relations": created_count,
+        "deleted_relations": deleted_count,
+    }
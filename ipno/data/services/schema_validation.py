@@ -38,8 +38,13 @@ class SchemaValidation:
 
         for model in self.models:
             model_name = model._meta.model_name
+            csv_file_path = data_location_mapping.get(model_name)
+
+            # Unchanged files are not downloaded, they were validated when imported
+            if not csv_file_path:
+                continue
+
             fixed_fields = self.model_schemas[model_name]
-            csv_file_path = data_location_mapping[model_name]
             missing_fixed_fields, unused_fields = self._check_fields(
                 csv_file_path, fixed_fields
             )
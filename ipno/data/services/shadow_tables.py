@@ -0,0 +1,329 @@
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.backends.signals import connection_created
+
+import structlog
+
+from data.constants import IMPORT_PREVIOUS_SCHEMA, IMPORT_SHADOW_SCHEMA
+
+logger = structlog.get_logger("IPNO")
+
+SEARCH_PATH_DISPATCH_UID = "shadow_tables_search_path"
+
+BLOCK_WRITES_FUNCTION = "block_writes"
+
+BLOCK_WRITES_TRIGGER = "shadow_tables_block_writes"
+
+INDEX_TABLE_PATTERN = re.compile(r" ON (ONLY )?\S+ USING ")
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def close_connections():
+    """Close the connections of the current thread with their default search path.
+
+    The pooled connections are reused once closed, they must not keep looking
+    the tables up in the shadow schema.
+    """
+    for db_connection in connections.all():
+        if db_connection.connection is None:
+            continue
+
+        try:
+            with db_connection.cursor() as cursor:
+                cursor.execute("RESET search_path")
+        except DatabaseError as e:
+            logger.warning("Failed to reset search path", error=str(e))
+
+    connections.close_all()
+
+
+def drop_shadow_schemas():
+    """Drop the shadow and previous tables, and make the live tables writable.
+
+    The triggers keeping the live tables read only depend on a function of the
+    shadow schema, so they are dropped with it. An import killed before the end
+    leaves them in place, they are dropped at the start of the next import, or
+    by hand with `DROP SCHEMA import_shadow CASCADE`.
+    """
+    with connection.cursor() as cursor:
+        for schema in [IMPORT_SHADOW_SCHEMA, IMPORT_PREVIOUS_SCHEMA]:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {_quote(schema)} CASCADE")
+
+
+class ShadowTables:
+    """Copies of model tables in a separate schema, swapped into place at once.
+
+    While activated, the database connections opened by the process look the
+    tables up in the shadow schema first, so that importers and derived data
+    computations write to the copies unchanged while the live tables keep
+    serving the API. The live tables are read only in the meantime, as their
+    writes would be lost with the swap. If the process is killed before the
+    swap, they stay read only until the next import or
+    `DROP SCHEMA import_shadow CASCADE`.
+    """
+
+    def __init__(self, models):
+        self.tables = self._get_tables(models)
+        self.live_schema = None
+
+    def _get_referencing_models(self, models):
+        return [
+            model
+            for model in apps.get_models(include_auto_created=True)
+            if model._meta.managed
+            and not model._meta.proxy
+            and model not in models
+            and any(
+                field.related_model in models
+                for field in model._meta.concrete_fields
+                if field.is_relation
+            )
+        ]
+
+    def _get_tables(self, models):
+        """Get the tables of the models and of the models referencing them.
+
+        Django deletes the referencing rows along with the rows they reference,
+        so their tables are copied too for these deletions to only be published
+        by the swap.
+        """
+        models = list(models)
+        referencing_models = self._get_referencing_models(models)
+
+        while referencing_models:
+            models += referencing_models
+            referencing_models = self._get_referencing_models(models)
+
+        return [model._meta.db_table for model in models]
+
+    def _live(self, table):
+        return f"{_quote(self.live_schema)}.{_quote(table)}"
+
+    def _shadow(self, table):
+        return f"{_quote(IMPORT_SHADOW_SCHEMA)}.{_quote(table)}"
+
+    def _live_tables(self):
+        return [self._live(table) for table in self.tables]
+
+    def _get_definitions(self, cursor, table):
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(ix.indexrelid)
+            FROM pg_index AS ix
+            WHERE ix.indrelid = %s::regclass
+                AND NOT EXISTS (
+                    SELECT 1 FROM pg_constraint AS c
+                    WHERE c.conrelid = ix.indrelid AND c.conindid = ix.indexrelid
+                )
+            """,
+            [self._live(table)],
+        )
+        indexes = [
+            INDEX_TABLE_PATTERN.sub(f" ON {self._shadow(table)} USING ", definition)
+            for (definition,) in cursor.fetchall()
+        ]
+
+        # Primary keys and unique constraints first, foreign keys need them on
+        # the tables they reference.
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x', 'f')
+            ORDER BY contype = 'f'
+            """,
+            [self._live(table)],
+        )
+        constraints = [
+            f"ALTER TABLE {self._shadow(table)}"
+            f" ADD CONSTRAINT {_quote(name)} {definition}"
+            for name, definition in cursor.fetchall()
+        ]
+
+        return indexes, constraints
+
+    def create(self):
+        """Copy the live tables with their data, indexes and constraints."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT current_schema()")
+            (self.live_schema,) = cursor.fetchone()
+
+            # The definitions are read before the shadow schema exists, so that
+            # they name the tables they reference without their schema.
+            definitions = [
+                self._get_definitions(cursor, table) for table in self.tables
+            ]
+
+            cursor.execute(
+                f"DROP SCHEMA IF EXISTS {_quote(IMPORT_SHADOW_SCHEMA)} CASCADE"
+            )
+            cursor.execute(f"CREATE SCHEMA {_quote(IMPORT_SHADOW_SCHEMA)}")
+
+            for table in self.tables:
+                cursor.execute(
+                    f"CREATE TABLE {self._shadow(table)} (LIKE {self._live(table)}"
+                    " INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                )
+                cursor.execute(
+                    f"INSERT INTO {self._shadow(table)}"
+                    f" SELECT * FROM {self._live(table)}"
+                )
+
+            # Referenced tables that are copied resolve to their shadow tables
+            cursor.execute(
+                f"SET LOCAL search_path TO {_quote(IMPORT_SHADOW_SCHEMA)},"
+                f" {_quote(self.live_schema)}"
+            )
+
+            for indexes, _ in definitions:
+                for statement in indexes:
+                    cursor.execute(statement)
+
+            for _, constraints in definitions:
+                for statement in constraints:
+                    cursor.execute(statement)
+
+            self._block_writes(cursor)
+
+        logger.info("Created shadow tables", tables=self.tables)
+
+    def _block_writes(self, cursor):
+        """Make the live tables read only until the swap.
+
+        The triggers are dropped along with their function in the shadow schema.
+        """
+        function = f"{_quote(IMPORT_SHADOW_SCHEMA)}.{_quote(BLOCK_WRITES_FUNCTION)}"
+
+        cursor.execute(
+            f"""
+            CREATE FUNCTION {function}() RETURNS trigger AS $$
+            BEGIN
+                RAISE EXCEPTION 'Table % is read only during the import',
+                    TG_TABLE_NAME;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+
+        for table in self._live_tables():
+            cursor.execute(
+                f"CREATE TRIGGER {_quote(BLOCK_WRITES_TRIGGER)}"
+                " BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE"
+                f" ON {table} FOR EACH STATEMENT EXECUTE PROCEDURE {function}()"
+            )
+
+    def _set_search_path(self, sender, connection, **kwargs):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SET search_path TO {_quote(IMPORT_SHADOW_SCHEMA)},"
+                f" {_quote(self.live_schema)}"
+            )
+
+    @contextmanager
+    def activate(self):
+        """Make the database connections opened inside use the shadow tables."""
+        connections.close_all()
+        connection_created.connect(
+            self._set_search_path, dispatch_uid=SEARCH_PATH_DISPATCH_UID
+        )
+
+        try:
+            yield
+        finally:
+            connection_created.disconnect(dispatch_uid=SEARCH_PATH_DISPATCH_UID)
+            close_connections()
+
+    def _get_external_foreign_keys(self, cursor):
+        cursor.execute(
+            """
+            SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE contype = 'f'
+                AND confrelid = ANY(%s::regclass[])
+                AND NOT conrelid = ANY(%s::regclass[])
+            """,
+            [self._live_tables(), self._live_tables()],
+        )
+
+        return cursor.fetchall()
+
+    def _get_owned_sequences(self, cursor):
+        cursor.execute(
+            """
+            SELECT seq.oid::regclass::text, tbl.relname, att.attname
+            FROM pg_class AS seq
+            JOIN pg_depend AS dep
+                ON dep.objid = seq.oid
+                AND dep.classid = 'pg_class'::regclass
+                AND dep.deptype = 'a'
+            JOIN pg_class AS tbl ON tbl.oid = dep.refobjid
+            JOIN pg_attribute AS att
+                ON att.attrelid = dep.refobjid AND att.attnum = dep.refobjsubid
+            WHERE seq.relkind = 'S' AND dep.refobjid = ANY(%s::regclass[])
+            """,
+            [self._live_tables()],
+        )
+
+        return cursor.fetchall()
+
+    def swap(self):
+        """Replace the live tables with the shadow tables in one transaction.
+
+        Foreign keys from other tables are recreated and validated inside the
+        transaction, the live tables are kept when they do not hold.
+        """
+        with connection.cursor() as cursor:
+            for table in self.tables:
+                cursor.execute(f"ANALYZE {self._shadow(table)}")
+
+            cursor.execute(
+                f"DROP SCHEMA IF EXISTS {_quote(IMPORT_PREVIOUS_SCHEMA)} CASCADE"
+            )
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            external_foreign_keys = self._get_external_foreign_keys(cursor)
+            owned_sequences = self._get_owned_sequences(cursor)
+
+            cursor.execute(f"CREATE SCHEMA {_quote(IMPORT_PREVIOUS_SCHEMA)}")
+
+            for table, name, _ in external_foreign_keys:
+                cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {_quote(name)}")
+
+            # The sequences would otherwise move along with the previous tables,
+            # while the shadow tables use them for their ids.
+            for sequence, _, _ in owned_sequences:
+                cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+
+            for table in self.tables:
+                cursor.execute(
+                    f"ALTER TABLE {self._live(table)}"
+                    f" SET SCHEMA {_quote(IMPORT_PREVIOUS_SCHEMA)}"
+                )
+                cursor.execute(
+                    f"ALTER TABLE {self._shadow(table)}"
+                    f" SET SCHEMA {_quote(self.live_schema)}"
+                )
+
+            for sequence, table, column in owned_sequences:
+                cursor.execute(
+                    f"ALTER SEQUENCE {sequence}"
+                    f" OWNED BY {self._live(table)}.{_quote(column)}"
+                )
+
+            for table, name, definition in external_foreign_keys:
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {_quote(name)} {definition}"
+                )
+
+        logger.info("Swapped shadow tables", tables=self.tables)
+
+        self.drop()
+
+    def drop(self):
+        drop_shadow_schemas()
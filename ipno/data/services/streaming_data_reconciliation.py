@@ -0,0 +1,227 @@
+import csv
+import math
+import os
+import tempfile
+from itertools import islice
+
+from django.db import connection
+
+import pandas as pd
+import structlog
+
+from data.constants import (
+    RECONCILIATION_CHUNK_SIZE,
+    RECONCILIATION_MEMORY_BUDGET,
+    RECONCILIATION_MEMORY_OVERHEAD_FACTOR,
+)
+from data.services.data_reconciliation import (
+    DataReconciliation,
+    get_fingerprint_checksum,
+)
+
+logger = structlog.get_logger("IPNO")
+
+ADDED_ROWS = "added_rows"
+DELETED_ROWS = "deleted_rows"
+UPDATED_ROWS = "updated_rows"
+
+
+class RowStream:
+    """Disk backed list of reconciled rows.
+
+    It can be iterated as many times as needed, so importers going through the
+    rows more than once (e.g. to rebuild relations) keep working unchanged.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.count = 0
+
+        open(self.file_path, "w").close()
+
+    def extend(self, rows):
+        if not rows:
+            return
+
+        with open(self.file_path, "a", newline="") as stream_file:
+            csv.writer(stream_file).writerows(rows)
+
+        self.count += len(rows)
+
+    def __iter__(self):
+        with open(self.file_path, newline="") as stream_file:
+            yield from csv.reader(stream_file)
+
+    def __len__(self):
+        return self.count
+
+
+class StreamingDataReconciliation(DataReconciliation):
+    """Reconcile data partition by partition to keep memory usage bounded.
+
+    Both the CSV file and the model table are split into partitions by a hash of
+    the index columns, so that the rows sharing a key always land in the same
+    partition. Each partition is then reconciled on its own.
+    """
+
+    def __init__(
+        self,
+        model_name,
+        csv_file_path,
+        memory_budget=RECONCILIATION_MEMORY_BUDGET,
+        chunk_size=RECONCILIATION_CHUNK_SIZE,
+    ):
+        super().__init__(model_name, csv_file_path)
+        self.memory_budget = memory_budget
+        self.chunk_size = chunk_size
+
+    def _get_table_size(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_table_size(%s::regclass)",
+                [connection.ops.quote_name(self.model_class._meta.db_table)],
+            )
+
+            return cursor.fetchone()[0]
+
+    def _get_partitions_count(self):
+        # The partitions of the table are as large as its rows, which may
+        # outgrow the CSV file when most of them are deleted.
+        estimated_memory = (
+            max(os.path.getsize(self.csv_file_path), self._get_table_size())
+            * RECONCILIATION_MEMORY_OVERHEAD_FACTOR
+        )
+
+        return max(1, math.ceil(estimated_memory / self.memory_budget))
+
+    def _get_partition_path(self, work_dir, source, partition):
+        return os.path.join(work_dir, f"{source}_{partition}.csv")
+
+    def _create_partitions(self, work_dir, source, columns, partitions_count):
+        for partition in range(partitions_count):
+            pd.DataFrame(columns=columns).to_csv(
+                self._get_partition_path(work_dir, source, partition), index=False
+            )
+
+    def _write_partitions(self, df, work_dir, source, idx_columns, partitions_count):
+        partitions = (
+            pd.util.hash_pandas_object(df[idx_columns], index=False).to_numpy()
+            % partitions_count
+        )
+
+        for partition, df_partition in df.groupby(partitions):
+            df_partition.to_csv(
+                self._get_partition_path(work_dir, source, partition),
+                mode="a",
+                header=False,
+                index=False,
+            )
+
+    def _iter_csv_chunks(self):
+        csv_chunks = pd.read_csv(
+            self.csv_file_path,
+            dtype="string",
+            keep_default_na=False,
+            chunksize=self.chunk_size,
+        )
+
+        for df_chunk in csv_chunks:
+            yield df_chunk.fillna("")
+
+    def _partition_csv(self, work_dir, idx_columns, partitions_count):
+        csv_columns = list(self._read_csv(self.csv_file_path, nrows=0).columns)
+        self._create_partitions(work_dir, "csv", csv_columns, partitions_count)
+
+        for df_chunk in self._iter_csv_chunks():
+            self._write_partitions(
+                df_chunk, work_dir, "csv", idx_columns, partitions_count
+            )
+
+    def _get_csv_fingerprints_summary(self, columns):
+        rows_count = 0
+        checksum = 0
+
+        for df_chunk in self._iter_csv_chunks():
+            self.normalize_csv_data(df_chunk)
+            fingerprints = self._compute_fingerprints(df_chunk, columns)
+
+            rows_count += len(fingerprints)
+            checksum += sum(
+                get_fingerprint_checksum(fingerprint) for fingerprint in fingerprints
+            )
+
+        return rows_count, checksum
+
+    def _partition_db(self, work_dir, db_columns, idx_columns, partitions_count):
+        self._create_partitions(work_dir, "db", db_columns, partitions_count)
+
+        records = self._get_queryset(db_columns).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+
+            self._write_partitions(
+                self._build_db_frame(chunk, db_columns),
+                work_dir,
+                "db",
+                idx_columns,
+                partitions_count,
+            )
+
+    def iter_row_diffs(self, work_dir):
+        """Yield `(kind, rows)` tuples, one batch per partition and kind."""
+        columns = self._get_columns()
+        idx_columns = self._get_index_colums()
+        db_columns = self._get_reconciled_db_columns(columns, idx_columns)
+        partitions_count = self._get_partitions_count()
+
+        logger.info(
+            f"Reconciling {self.model_name} data in {partitions_count} partition(s)"
+        )
+
+        self._partition_csv(work_dir, idx_columns, partitions_count)
+        self._partition_db(work_dir, db_columns, idx_columns, partitions_count)
+        self.csv_rows_count = 0
+
+        for partition in range(partitions_count):
+            csv_partition_path = self._get_partition_path(work_dir, "csv", partition)
+            db_partition_path = self._get_partition_path(work_dir, "db", partition)
+
+            df_csv = self._read_csv(csv_partition_path)
+            df_db = self._read_csv(db_partition_path)
+            self.csv_rows_count += len(df_csv)
+
+            added_rows, deleted_rows, updated_rows = self._reconcile_frames(
+                df_db, df_csv, columns, idx_columns
+            )
+
+            os.remove(csv_partition_path)
+            os.remove(db_partition_path)
+
+            yield ADDED_ROWS, added_rows
+            yield DELETED_ROWS, deleted_rows
+            yield UPDATED_ROWS, updated_rows
+
+    def reconcile_data(self):
+        columns = self._get_columns()
+
+        # Keep the spooled files next to the CSV file so that they are cleaned up
+        # together with the downloaded data.
+        work_dir = tempfile.mkdtemp(
+            prefix=f"{self.model_name}_reconciliation_",
+            dir=os.path.dirname(os.path.abspath(self.csv_file_path)),
+        )
+
+        row_streams = {
+            kind: RowStream(os.path.join(work_dir, f"{kind}.csv"))
+            for kind in [ADDED_ROWS, DELETED_ROWS, UPDATED_ROWS]
+        }
+
+        for kind, rows in self.iter_row_diffs(work_dir):
+            row_streams[kind].extend(rows)
+
+        return {
+            **row_streams,
+            "columns_mapping": {column: columns.index(column) for column in columns},
+        }
@@ -1,6 +1,10 @@
 from tqdm import tqdm
 
-from data.constants import USE_OF_FORCE_MODEL_NAME
+from data.constants import (
+    AGENCY_MODEL_NAME,
+    OFFICER_MODEL_NAME,
+    USE_OF_FORCE_MODEL_NAME,
+)
 from data.services.base_importer import BaseImporter
 from data.services.data_reconciliation import DataReconciliation
 from use_of_forces.models import UseOfForce
@@ -8,6 +12,10 @@ from use_of_forces.models import UseOfForce
 
 class UofImporter(BaseImporter):
     data_model = USE_OF_FORCE_MODEL_NAME
+    DEPENDENCIES = [
+        AGENCY_MODEL_NAME,
+        OFFICER_MODEL_NAME,
+    ]
 
     ATTRIBUTES = list(
         {field.name for field in UseOfForce._meta.fields}
@@ -19,7 +27,7 @@ class UofImporter(BaseImporter):
     def __init__(self, csv_file_path):
         self.new_uofs_attrs = []
         self.update_uofs_attrs = []
-        self.new_uof_uids = []
+        self.new_uof_uids = set()
         self.delete_uofs_ids = []
         self.officer_mappings = {}
         self.department_mappings = {}
@@ -29,10 +37,9 @@ class UofImporter(BaseImporter):
             USE_OF_FORCE_MODEL_NAME, csv_file_path
         )
 
-    def handle_record_data(self, row):
+    def handle_record_data(self, row, uof_data):
         agency = row[self.column_mappings["agency"]]
         officer_uid = row[self.column_mappings["uid"]]
-        uof_data = self.parse_row_data(row, self.column_mappings)
 
         uof_uid = uof_data["uof_uid"]
         department_id = self.department_mappings[agency]
@@ -46,7 +53,7 @@ class UofImporter(BaseImporter):
             uof_data["id"] = uof_id
             self.update_uofs_attrs.append(uof_data)
         elif uof_uid not in self.new_uof_uids:
-            self.new_uof_uids.append(uof_uid)
+            self.new_uof_uids.add(uof_uid)
             self.new_uofs_attrs.append(uof_data)
 
     def import_data(self, data):
@@ -54,8 +61,10 @@ class UofImporter(BaseImporter):
         self.department_mappings = self.get_department_mappings()
         self.uof_mappings = self.get_uof_mappings()
 
-        for row in tqdm(data.get("added_rows"), desc="Create new uofs"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("added_rows"), desc="Create new uofs"), self.column_mappings
+        ):
+            self.handle_record_data(row, row_data)
 
         for row in tqdm(data.get("deleted_rows"), desc="Delete removed uofs"):
             uof_uid = row[self.old_column_mappings["uof_uid"]]
@@ -63,8 +72,11 @@ class UofImporter(BaseImporter):
             if uof_id:
                 self.delete_uofs_ids.append(uof_id)
 
-        for row in tqdm(data.get("updated_rows"), desc="Update modified uofs"):
-            self.handle_record_data(row)
+        for row, row_data in self.iter_rows_data(
+            tqdm(data.get("updated_rows"), desc="Update modified uofs"),
+            self.column_mappings,
+        ):
+            self.handle_record_data(row, row_data)
 
         return self.bulk_import(
             UseOfForce,
@@ -1,23 +1,43 @@
+import csv
 from csv import DictWriter
+from datetime import date
 from io import BytesIO, StringIO
 
 from django.test.testcases import TestCase
 
 import pytest
-from mock import Mock
+from mock import Mock, patch
 from pytest import raises
 
+from complaints.factories import ComplaintFactory
+from complaints.models import Complaint
 from data.constants import (
+    DEPARTMENTS_CHANGED_IDS,
     IMPORT_LOG_STATUS_ERROR,
     IMPORT_LOG_STATUS_FINISHED,
     IMPORT_LOG_STATUS_NO_NEW_DATA,
+    OFFICERS_CHANGED_IDS,
 )
 from data.models import ImportLog
-from data.services import BaseImporter
+from data.services import (
+    AgencyImporter,
+    AppealImporter,
+    BaseImporter,
+    BradyImporter,
+    CitizenImporter,
+    ComplaintImporter,
+    DocumentImporter,
+    EventImporter,
+    OfficerImporter,
+    PersonImporter,
+    PostOfficerHistoryImporter,
+    UofImporter,
+)
+from data.services.import_session import ImportSession
 from data.util import MockDataReconciliation
 from departments.factories import DepartmentFactory
 from officers.factories import OfficerFactory
-from officers.models import Officer
+from officers.models import Event, Officer
 from use_of_forces.factories import UseOfForceFactory
 
 TEST_MODEL_NAME = "TestModelName"
@@ -82,6 +102,33 @@ class BaseImporterTestCase(TestCase):
         assert not import_log.error_message
         assert import_log.finished_at
 
+    def test_process_unchanged_data(self):
+        self.tbi.import_data = Mock(return_value=None)
+        self.tbi.data_reconciliation = Mock(
+            is_unchanged=Mock(return_value=True),
+            reconcile_data=Mock(),
+            csv_rows_count=3,
+        )
+
+        assert not self.tbi.process()
+
+        self.tbi.data_reconciliation.reconcile_data.assert_not_called()
+        self.tbi.import_data.assert_not_called()
+
+        import_log = ImportLog.objects.order_by("-created_at").last()
+        assert import_log.status == IMPORT_LOG_STATUS_NO_NEW_DATA
+        assert import_log.file_row_count == 3
+
+    def test_process_with_file_metadata(self):
+        self.tbi.import_data = Mock(return_value=None)
+        self.tbi.data_reconciliation = MockDataReconciliation({})
+
+        self.tbi.process(file_metadata={"file_md5": "md5", "file_crc32c": "crc32c"})
+
+        import_log = ImportLog.objects.order_by("-created_at").last()
+        assert import_log.file_md5 == "md5"
+        assert import_log.file_crc32c == "crc32c"
+
     def test_process_successfully(self):
         import_data_result = {
             "created_rows": 2,
@@ -169,6 +216,147 @@ class BaseImporterTestCase(TestCase):
 
         assert result == expected_result
 
+    def test_parse_rows_data(self):
+        self.tbi.ATTRIBUTES = ["id", "name", "year", "desc", "uid"]
+        self.tbi.NA_ATTRIBUTES = ["desc"]
+        self.tbi.INT_ATTRIBUTES = ["year"]
+        self.tbi.SLUG_ATTRIBUTES = ["agency"]
+        self.tbi.DATE_ATTRIBUTES = ["hire_date"]
+
+        column_mappings = {"id": 0, "name": 1, "year": 2, "desc": 3, "agency": 4}
+        column_mappings["hire_date"] = 5
+
+        rows = [
+            ["1", "test", "2021", "NA", "New Orleans PD", "01/02/2020"],
+            ["2", "", "", "", "", ""],
+            ["3", "test", "2021.0", "desc", "New Orleans PD", "1/2/2020"],
+        ]
+
+        result = self.tbi.parse_rows_data(rows, column_mappings)
+
+        assert result == [
+            {
+                "id": "1",
+                "name": "test",
+                "year": 2021,
+                "desc": None,
+                "agency": "new-orleans-pd",
+                "hire_date": date(2020, 1, 2),
+            },
+            {
+                "id": "2",
+                "name": None,
+                "year": None,
+                "desc": "",
+                "agency": None,
+                "hire_date": None,
+            },
+            {
+                "id": "3",
+                "name": "test",
+                "year": 2021,
+                "desc": "desc",
+                "agency": "new-orleans-pd",
+                "hire_date": date(2020, 1, 2),
+            },
+        ]
+        assert result == [self.tbi.parse_row_data(row, column_mappings) for row in rows]
+        assert self.tbi.parse_rows_data([], column_mappings) == []
+
+    @patch("data.services.document_importer.GoogleCloudService")
+    @patch("data.services.agency_importer.GoogleCloudService")
+    def test_parse_rows_data_matches_parse_row_data(self, *_):
+        test_data_path = "./ipno/data/tests/services/test_data"
+        importers = [
+            (AgencyImporter, "data_agency.csv"),
+            (AppealImporter, "data_appeal.csv"),
+            (BradyImporter, "data_brady.csv"),
+            (CitizenImporter, "data_citizen.csv"),
+            (ComplaintImporter, "data_allegation.csv"),
+            (DocumentImporter, "data_document.csv"),
+            (EventImporter, "data_event.csv"),
+            (OfficerImporter, "data_personnel.csv"),
+            (PersonImporter, "data_person.csv"),
+            (PostOfficerHistoryImporter, "data_post_officer_history.csv"),
+            (UofImporter, "data_use_of_force.csv"),
+        ]
+
+        for importer_class, file_name in importers:
+            csv_file_path = f"{test_data_path}/{file_name}"
+            importer = importer_class(csv_file_path)
+
+            with open(csv_file_path) as csv_file:
+                reader = csv.reader(csv_file)
+                headers = next(reader)
+                rows = list(reader)
+
+            mappings = {column: headers.index(column) for column in headers}
+
+            assert importer.parse_rows_data(rows, mappings) == [
+                importer.parse_row_data(row, mappings) for row in rows
+            ], importer_class.__name__
+
+    def test_iter_rows_data(self):
+        self.tbi.ATTRIBUTES = ["id", "name"]
+        self.tbi.INT_ATTRIBUTES = ["year"]
+        self.tbi.PARSE_CHUNK_SIZE = 2
+        mappings = {"id": 0, "name": 1, "year": 2}
+
+        rows = [["1", "name 1", "2020"], ["2", "", "2021"], ["3", "name 3", ""]]
+
+        with patch.object(
+            self.tbi, "parse_rows_data", wraps=self.tbi.parse_rows_data
+        ) as parse_rows_data:
+            rows_data = self.tbi.iter_rows_data(iter(rows), mappings)
+
+            assert next(rows_data) == (
+                rows[0],
+                {"id": "1", "name": "name 1", "year": 2020},
+            )
+            parse_rows_data.assert_called_once_with(rows[:2], mappings)
+
+            assert list(rows_data) == [
+                (rows[1], {"id": "2", "name": None, "year": 2021}),
+                (rows[2], {"id": "3", "name": "name 3", "year": None}),
+            ]
+            assert parse_rows_data.call_count == 2
+
+    def test_iter_rows_data_with_row_fingerprints(self):
+        self.tbi.ATTRIBUTES = ["id", "name"]
+        self.tbi.data_reconciliation = Mock(
+            use_fingerprint=True,
+            get_row_fingerprint=lambda row: f"fingerprint-{row[0]}",
+        )
+        mappings = {"id": 0, "name": 1}
+
+        rows = [["1", "Name 1"], ["2", ""]]
+
+        assert list(self.tbi.iter_rows_data(rows, mappings)) == [
+            (
+                rows[0],
+                {"id": "1", "name": "Name 1", "row_fingerprint": "fingerprint-1"},
+            ),
+            (rows[1], {"id": "2", "name": None, "row_fingerprint": "fingerprint-2"}),
+        ]
+
+    @patch("data.services.base_importer.logger")
+    def test_iter_rows_data_with_invalid_rows(self, mock_logger):
+        self.tbi.DATE_ATTRIBUTES = ["date"]
+        self.tbi.PARSE_CHUNK_SIZE = 2
+        mappings = {"date": 0}
+
+        rows = [["01/02/2020"], ["03/04/2021"], ["invalid"]]
+        rows_data = self.tbi.iter_rows_data(rows, mappings)
+
+        assert len([next(rows_data), next(rows_data)]) == 2
+
+        with self.assertRaises(ValueError):
+            next(rows_data)
+
+        mock_logger.error.assert_called_once()
+        assert mock_logger.error.call_args.kwargs["first_row"] == 2
+        assert mock_logger.error.call_args.kwargs["last_row"] == 2
+
     def test_bulk_import(self):
         OfficerFactory()
         officer_2 = OfficerFactory()
@@ -200,6 +388,55 @@ class BaseImporterTestCase(TestCase):
 
         assert result == expected_result
 
+    def test_record_changed_entities(self):
+        department_1 = DepartmentFactory()
+        department_2 = DepartmentFactory()
+        officer_1 = OfficerFactory()
+        officer_2 = OfficerFactory()
+        complaint_1 = ComplaintFactory()
+        complaint_1.officers.add(officer_1)
+        complaint_1.departments.add(department_1)
+        complaint_2 = ComplaintFactory()
+        complaint_2.officers.add(officer_2)
+
+        self.tbi.import_session = ImportSession()
+        self.tbi.record_changed_entities(
+            Complaint, [{"allegation_uid": "new"}], [{"id": complaint_1.id}], []
+        )
+        self.tbi.record_changed_entities(
+            Event,
+            [{"officer_id": officer_2.id, "department_id": department_2.id}],
+            [],
+            [],
+        )
+
+        assert self.tbi.import_session.get_changed_ids(OFFICERS_CHANGED_IDS) == {
+            officer_1.id,
+            officer_2.id,
+        }
+        assert self.tbi.import_session.get_changed_ids(DEPARTMENTS_CHANGED_IDS) == {
+            department_1.id,
+            department_2.id,
+        }
+
+    def test_record_changed_entities_of_entity(self):
+        department = DepartmentFactory()
+        officer_1 = OfficerFactory(department=department)
+        officer_2 = OfficerFactory()
+
+        self.tbi.import_session = ImportSession()
+        self.tbi.record_changed_entities(Officer, [], [], [officer_1.id])
+
+        assert self.tbi.import_session.get_changed_ids(OFFICERS_CHANGED_IDS) == {
+            officer_1.id
+        }
+        assert self.tbi.import_session.get_changed_ids(DEPARTMENTS_CHANGED_IDS) == {
+            department.id
+        }
+        assert officer_2.id not in self.tbi.import_session.get_changed_ids(
+            OFFICERS_CHANGED_IDS
+        )
+
     def test_bulk_import_with_cleanup_action(self):
         OfficerFactory()
         officer_2 = OfficerFactory()
@@ -242,3 +479,62 @@ class BaseImporterTestCase(TestCase):
         assert result == expected_result
 
         cleanup_action.assert_called_with(delete_items_values)
+
+    def test_bulk_import_with_row_fingerprints(self):
+        officer = OfficerFactory(uid="def", row_fingerprint="old-fingerprint")
+
+        self.tbi.UPDATE_ATTRIBUTES = ["first_name"]
+        self.tbi.data_reconciliation = Mock(use_fingerprint=True, model_class=Officer)
+
+        result = self.tbi.bulk_import(
+            Officer,
+            [{"uid": "abc", "first_name": "test_1", "row_fingerprint": "fingerprint"}],
+            [{"id": officer.id, "uid": "def", "first_name": "test_2"}],
+            [],
+        )
+
+        assert result == {"created_rows": 1, "updated_rows": 1, "deleted_rows": 0}
+        assert Officer.objects.get(uid="abc").row_fingerprint == "fingerprint"
+
+        officer.refresh_from_db()
+        assert officer.first_name == "test_2"
+        assert officer.row_fingerprint is None
+
+    def test_bulk_import_with_copy(self):
+        OfficerFactory()
+        officer_2 = OfficerFactory()
+        officer_3 = OfficerFactory(last_name="last_name", aliases=[])
+
+        self.tbi.COPY_BULK_IMPORT = True
+        self.tbi.UPDATE_ATTRIBUTES = ["first_name", "aliases"]
+
+        result = self.tbi.bulk_import(
+            Officer,
+            [
+                {
+                    "uid": "abc",
+                    "first_name": 'test "1"',
+                    "aliases": ["alias, 1", 'alias "2"'],
+                    "birth_year": 1980,
+                    "is_name_changed": True,
+                }
+            ],
+            [{"id": officer_3.id, "first_name": "test\n2", "aliases": ["alias"]}],
+            [officer_2.id],
+        )
+
+        assert result == {"created_rows": 1, "updated_rows": 1, "deleted_rows": 1}
+        assert Officer.objects.count() == 3
+
+        new_officer = Officer.objects.get(uid="abc")
+        assert new_officer.first_name == 'test "1"'
+        assert new_officer.aliases == ["alias, 1", 'alias "2"']
+        assert new_officer.birth_year == 1980
+        assert new_officer.is_name_changed
+        assert new_officer.last_name is None
+        assert new_officer.created_at
+
+        officer_3.refresh_from_db()
+        assert officer_3.first_name == "test\n2"
+        assert officer_3.aliases == ["alias"]
+        assert officer_3.last_name == "last_name"
@@ -1,7 +1,5 @@
 from django.test.testcases import TestCase
 
-from mock import Mock
-
 from complaints.factories import ComplaintFactory
 from complaints.models import Complaint
 from data.constants import IMPORT_LOG_STATUS_FINISHED
@@ -167,16 +165,13 @@ class ComplaintImporterTestCase(TestCase):
     def test_handle_record_data_with_duplicate_uid(self):
         complaint_importer = ComplaintImporter("csv_file_path")
 
-        complaint_importer.new_allegation_uids = ["allegation-uid"]
-
-        complaint_importer.parse_row_data = Mock()
-        complaint_importer.parse_row_data.return_value = {
-            "allegation_uid": "allegation-uid",
-        }
+        complaint_importer.new_allegation_uids = {"allegation-uid"}
 
-        complaint_importer.handle_record_data("row")
+        complaint_importer.handle_record_data(
+            "row", {"allegation_uid": "allegation-uid"}
+        )
 
-        assert complaint_importer.new_allegation_uids == ["allegation-uid"]
+        assert complaint_importer.new_allegation_uids == {"allegation-uid"}
 
     def test_delete_not_exist_complaint(self):
         complaint_importer = ComplaintImporter("csv_file_path")
@@ -0,0 +1,27 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from data.services.copy_loader import to_array_literal, to_copy_value
+
+
+class CopyLoaderTestCase(SimpleTestCase):
+    def test_to_copy_value(self):
+        assert to_copy_value(None) == "\\N"
+        assert to_copy_value("") == '""'
+        assert to_copy_value('a "b", c') == '"a ""b"", c"'
+        assert to_copy_value("\\N") == '"\\N"'
+        assert to_copy_value(True) == '"t"'
+        assert to_copy_value(False) == '"f"'
+        assert to_copy_value(12) == '"12"'
+        assert to_copy_value(Decimal("1.50")) == '"1.50"'
+        assert to_copy_value(date(2020, 1, 2)) == '"2020-01-02"'
+        assert to_copy_value(["a", "b"]) == '"{""a"",""b""}"'
+
+    def test_to_array_literal(self):
+        assert to_array_literal([]) == "{}"
+        assert (
+            to_array_literal(["a,b", None, 'c"d', "e\\f"])
+            == '{"a,b",NULL,"c\\"d","e\\\\f"}'
+        )
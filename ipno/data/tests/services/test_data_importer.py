@@ -1,21 +1,42 @@
-from django.test import TestCase
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
 
 from mock import patch
 
+from data.models import DataVersion, ImportLog
 from data.services.data_importer import DataImporter
+from data.services.import_session import ImportSession
+from data.services.shadow_tables import ShadowTables
+from departments.factories import DepartmentFactory
+from departments.models import Department
+from documents.factories import DocumentFactory
 from ipno.data.constants import (
     AGENCY_MODEL_NAME,
     APPEAL_MODEL_NAME,
     BRADY_MODEL_NAME,
     CITIZEN_MODEL_NAME,
     COMPLAINT_MODEL_NAME,
+    DATA_VERSION_DEPARTMENTS,
+    DATA_VERSION_DOCUMENTS,
+    DATA_VERSION_NEWS_ARTICLES,
+    DATA_VERSION_OFFICERS,
+    DEPARTMENTS_CHANGED_IDS,
     DOCUMENT_MODEL_NAME,
     EVENT_MODEL_NAME,
+    IMPORT_LOG_STATUS_ERROR,
+    IMPORT_LOG_STATUS_FINISHED,
+    IMPORT_LOG_STATUS_NO_FILE_CHANGE,
     OFFICER_MODEL_NAME,
+    OFFICERS_CHANGED_IDS,
     PERSON_MODEL_NAME,
     POST_OFFICE_HISTORY_MODEL_NAME,
     USE_OF_FORCE_MODEL_NAME,
 )
+from officers.factories import OfficerFactory
+from people.factories import PersonFactory
+from people.models import Person
 
 
 class DataImporterTestCase(TestCase):
@@ -28,7 +49,7 @@ class DataImporterTestCase(TestCase):
     @patch("data.services.data_importer.GoogleCloudService")
     @patch("data.services.data_importer.PostOfficerHistoryImporter.process")
     @patch("data.services.data_importer.BradyImporter.process")
-    @patch("data.services.data_importer.cache.clear")
+    @patch("data.services.data_importer.flush_entity_caches")
     @patch("data.services.data_importer.compute_department_data_period")
     @patch("data.services.data_importer.MigrateOfficerMovement.process")
     @patch("data.services.data_importer.calculate_complaint_fraction")
@@ -66,13 +87,13 @@ class DataImporterTestCase(TestCase):
         calculate_complaint_fraction_mock,
         migrate_officer_movement_mock,
         compute_department_data_period_mock,
-        cache_clear_mock,
+        flush_entity_caches_mock,
         brady_process_mock,
         post_officer_history_process_mock,
         mock_google_cloud_service,
         rmtree_mock,
     ):
-        mock_google_cloud_service.return_value.download_csv_data_sequentially.return_value = {
+        mock_google_cloud_service.return_value.download_csv_data.return_value = {
             AGENCY_MODEL_NAME: "data_agency.csv",
             APPEAL_MODEL_NAME: "data_appeal-hearing.csv",
             PERSON_MODEL_NAME: "data_person.csv",
@@ -112,9 +133,15 @@ class DataImporterTestCase(TestCase):
         count_complaints_mock.assert_called()
         calculate_officer_fraction_mock.assert_called()
         calculate_complaint_fraction_mock.assert_called()
-        migrate_officer_movement_mock.assert_called()
+        migrate_officer_movement_mock.assert_called_with()
         compute_department_data_period_mock.assert_called()
-        cache_clear_mock.assert_called()
+        flush_entity_caches_mock.assert_called()
+        assert set(DataVersion.objects.values_list("entity_type", flat=True)) == {
+            DATA_VERSION_OFFICERS,
+            DATA_VERSION_DEPARTMENTS,
+            DATA_VERSION_DOCUMENTS,
+            DATA_VERSION_NEWS_ARTICLES,
+        }
 
         rmtree_mock.assert_called()
 
@@ -122,7 +149,7 @@ class DataImporterTestCase(TestCase):
     @patch("data.services.data_importer.GoogleCloudService")
     @patch("data.services.data_importer.PostOfficerHistoryImporter.process")
     @patch("data.services.data_importer.BradyImporter.process")
-    @patch("data.services.data_importer.cache.clear")
+    @patch("data.services.data_importer.flush_entity_caches")
     @patch("data.services.data_importer.compute_department_data_period")
     @patch("data.services.data_importer.MigrateOfficerMovement.process")
     @patch("data.services.data_importer.calculate_complaint_fraction")
@@ -160,13 +187,13 @@ class DataImporterTestCase(TestCase):
         calculate_complaint_fraction_mock,
         migrate_officer_movement_mock,
         compute_department_data_period_mock,
-        cache_clear_mock,
+        flush_entity_caches_mock,
         brady_process_mock,
         post_officer_history_process_mock,
         mock_google_cloud_service,
         rmtree_mock,
     ):
-        mock_google_cloud_service.return_value.download_csv_data_sequentially.return_value = {
+        mock_google_cloud_service.return_value.download_csv_data.return_value = {
             AGENCY_MODEL_NAME: "data_agency.csv",
             APPEAL_MODEL_NAME: "data_appeal-hearing.csv",
             PERSON_MODEL_NAME: "data_person.csv",
@@ -207,7 +234,8 @@ class DataImporterTestCase(TestCase):
         calculate_complaint_fraction_mock.assert_not_called()
         migrate_officer_movement_mock.assert_not_called()
         compute_department_data_period_mock.assert_not_called()
-        cache_clear_mock.assert_not_called()
+        flush_entity_caches_mock.assert_not_called()
+        assert not DataVersion.objects.exists()
 
         rmtree_mock.assert_called()
 
@@ -215,7 +243,7 @@ class DataImporterTestCase(TestCase):
     @patch("data.services.data_importer.GoogleCloudService")
     @patch("data.services.data_importer.PostOfficerHistoryImporter.process")
     @patch("data.services.data_importer.BradyImporter.process")
-    @patch("data.services.data_importer.cache.clear")
+    @patch("data.services.data_importer.flush_entity_caches")
     @patch("data.services.data_importer.compute_department_data_period")
     @patch("data.services.data_importer.MigrateOfficerMovement.process")
     @patch("data.services.data_importer.calculate_complaint_fraction")
@@ -253,13 +281,13 @@ class DataImporterTestCase(TestCase):
         calculate_complaint_fraction_mock,
         migrate_officer_movement_mock,
         compute_department_data_period_mock,
-        cache_clear_mock,
+        flush_entity_caches_mock,
         brady_process_mock,
         post_officer_history_process_mock,
         mock_google_cloud_service,
         rmtree_mock,
     ):
-        mock_google_cloud_service.return_value.download_csv_data_sequentially.return_value = {
+        mock_google_cloud_service.return_value.download_csv_data.return_value = {
             AGENCY_MODEL_NAME: "data_agency.csv",
             APPEAL_MODEL_NAME: "data_appeal-hearing.csv",
             PERSON_MODEL_NAME: "data_person.csv",
@@ -289,8 +317,432 @@ class DataImporterTestCase(TestCase):
         calculate_complaint_fraction_mock.assert_not_called()
         migrate_officer_movement_mock.assert_not_called()
         compute_department_data_period_mock.assert_not_called()
-        cache_clear_mock.assert_not_called()
+        flush_entity_caches_mock.assert_not_called()
         brady_process_mock.assert_not_called()
         post_officer_history_process_mock.assert_not_called()
 
         rmtree_mock.assert_called()
+
+    @patch("data.services.data_importer.ProcessRematchOfficers")
+    @patch("data.services.data_importer.flush_news_article_related_caches")
+    @patch("data.services.data_importer.GoogleCloudService")
+    @patch("data.services.data_importer.AgencyImporter.process")
+    @patch(
+        "data.services.data_importer.SchemaValidation.validate_schemas",
+        return_value=True,
+    )
+    def test_execute_with_all_files_unchanged(
+        self,
+        _,
+        agency_process_mock,
+        mock_google_cloud_service,
+        flush_news_article_related_caches_mock,
+        process_rematch_officers_mock,
+    ):
+        DepartmentFactory.create_batch(10, row_fingerprint="fingerprint")
+        ImportLog.objects.create(
+            data_model=AGENCY_MODEL_NAME,
+            status=IMPORT_LOG_STATUS_FINISHED,
+            file_md5="agency-md5",
+            file_crc32c="agency-crc32c",
+            file_row_count=10,
+        )
+        gs = mock_google_cloud_service.return_value
+        gs.get_csv_files_metadata.return_value = {
+            AGENCY_MODEL_NAME: {
+                "file_md5": "agency-md5",
+                "file_crc32c": "agency-crc32c",
+            },
+        }
+        gs.download_csv_data.return_value = {}
+
+        with tempfile.TemporaryDirectory() as csv_data_path:
+            with override_settings(CSV_DATA_PATH=csv_data_path):
+                self.data_importer.execute("folder_name", staged=False)
+
+            assert not os.path.exists(f"{csv_data_path}/folder_name")
+
+        agency_process_mock.assert_not_called()
+        assert (
+            ImportLog.objects.filter(data_model=AGENCY_MODEL_NAME)
+            .latest("created_at")
+            .status
+            == IMPORT_LOG_STATUS_NO_FILE_CHANGE
+        )
+        assert not DataVersion.objects.exists()
+
+    @patch("data.services.data_importer.GoogleCloudService")
+    @patch(
+        "data.services.data_importer.SchemaValidation.validate_schemas",
+        return_value=False,
+    )
+    def test_execute_drops_leftover_shadow_tables(
+        self,
+        _,
+        mock_google_cloud_service,
+        flush_news_article_related_caches_mock,
+        process_rematch_officers_mock,
+    ):
+        department = DepartmentFactory()
+        ShadowTables([Department]).create()
+
+        gs = mock_google_cloud_service.return_value
+        gs.get_csv_files_metadata.return_value = {}
+        gs.download_csv_data.return_value = {}
+
+        with tempfile.TemporaryDirectory() as csv_data_path:
+            with override_settings(CSV_DATA_PATH=csv_data_path):
+                self.data_importer.execute("folder_name", staged=False)
+
+        Department.objects.filter(id=department.id).update(agency_name="New name")
+        assert Department.objects.get(id=department.id).agency_name == "New name"
+
+    @patch("data.services.data_importer.rmtree")
+    @patch("data.services.data_importer.GoogleCloudService")
+    @patch("data.services.data_importer.OfficerImporter.process")
+    @patch("data.services.data_importer.AgencyImporter.process")
+    @patch(
+        "data.services.data_importer.SchemaValidation.validate_schemas",
+        return_value=True,
+    )
+    def test_execute_skip_unchanged_files(
+        self,
+        validate_schemas_mock,
+        agency_process_mock,
+        officer_process_mock,
+        mock_google_cloud_service,
+        rmtree_mock,
+    ):
+        DepartmentFactory.create_batch(10, row_fingerprint="fingerprint")
+        ImportLog.objects.create(
+            data_model=AGENCY_MODEL_NAME,
+            status=IMPORT_LOG_STATUS_FINISHED,
+            file_md5="agency-md5",
+            file_crc32c="agency-crc32c",
+            file_row_count=10,
+        )
+        ImportLog.objects.create(
+            data_model=OFFICER_MODEL_NAME,
+            status=IMPORT_LOG_STATUS_FINISHED,
+            file_md5="old-officer-md5",
+            file_crc32c="old-officer-crc32c",
+            file_row_count=20,
+        )
+
+        officer_file_metadata = {
+            "file_md5": "officer-md5",
+            "file_crc32c": "officer-crc32c",
+        }
+        gs = mock_google_cloud_service.return_value
+        gs.get_csv_files_metadata.return_value = {
+            AGENCY_MODEL_NAME: {
+                "file_md5": "agency-md5",
+                "file_crc32c": "agency-crc32c",
+            },
+            OFFICER_MODEL_NAME: officer_file_metadata,
+        }
+        gs.download_csv_data.return_value = {
+            OFFICER_MODEL_NAME: "data_personnel.csv",
+        }
+        officer_process_mock.return_value = False
+
+        self.data_importer.execute("folder_name")
+
+        downloaded_models = gs.download_csv_data.call_args[0][1]
+        assert AGENCY_MODEL_NAME not in downloaded_models
+        assert OFFICER_MODEL_NAME in downloaded_models
+        validate_schemas_mock.assert_called_with(
+            {OFFICER_MODEL_NAME: "data_personnel.csv"}
+        )
+
+        agency_process_mock.assert_not_called()
+        officer_process_mock.assert_called_with(file_metadata=officer_file_metadata)
+
+        import_log = ImportLog.objects.filter(data_model=AGENCY_MODEL_NAME).latest(
+            "created_at"
+        )
+        assert import_log.status == IMPORT_LOG_STATUS_NO_FILE_CHANGE
+        assert import_log.file_md5 == "agency-md5"
+        assert import_log.file_crc32c == "agency-crc32c"
+        assert import_log.file_row_count == 10
+
+        rmtree_mock.assert_called()
+
+    def test_is_file_unchanged_with_unfingerprinted_rows(self):
+        ImportLog.objects.create(
+            data_model=DOCUMENT_MODEL_NAME,
+            status=IMPORT_LOG_STATUS_FINISHED,
+            file_md5="document-md5",
+            file_crc32c="document-crc32c",
+            file_row_count=1,
+        )
+        file_metadata = {
+            "file_md5": "document-md5",
+            "file_crc32c": "document-crc32c",
+        }
+        document = DocumentFactory(row_fingerprint=None)
+
+        assert not self.data_importer._is_file_unchanged(
+            DOCUMENT_MODEL_NAME, file_metadata
+        )
+
+        document.row_fingerprint = "fingerprint"
+        document.save()
+
+        assert self.data_importer._is_file_unchanged(DOCUMENT_MODEL_NAME, file_metadata)
+
+    def test_is_file_unchanged_with_deleted_rows(self):
+        ImportLog.objects.create(
+            data_model=DOCUMENT_MODEL_NAME,
+            status=IMPORT_LOG_STATUS_FINISHED,
+            file_md5="document-md5",
+            file_crc32c="document-crc32c",
+            file_row_count=2,
+        )
+        file_metadata = {
+            "file_md5": "document-md5",
+            "file_crc32c": "document-crc32c",
+        }
+        document = DocumentFactory(row_fingerprint="fingerprint-1")
+        DocumentFactory(row_fingerprint="fingerprint-2")
+
+        assert self.data_importer._is_file_unchanged(DOCUMENT_MODEL_NAME, file_metadata)
+
+        document.delete()
+
+        assert not self.data_importer._is_file_unchanged(
+            DOCUMENT_MODEL_NAME, file_metadata
+        )
+
+    @patch("data.services.data_importer.rmtree")
+    @patch("data.services.data_importer.GoogleCloudService")
+    @patch("data.services.data_importer.DataImporter._refresh_published_data")
+    @patch("data.services.data_importer.DataImporter._update_derived_data")
+    @patch("data.services.data_importer.ImporterScheduler")
+    @patch("data.services.data_importer.ShadowTables")
+    @patch(
+        "data.services.data_importer.SchemaValidation.validate_schemas",
+        return_value=True,
+    )
+    def test_execute_staged(
+        self,
+        _,
+        shadow_tables_mock,
+        importer_scheduler_mock,
+        update_derived_data_mock,
+        refresh_published_data_mock,
+        mock_google_cloud_service,
+        rmtree_mock,
+    ):
+        importer_results = {OFFICER_MODEL_NAME: True}
+        importer_scheduler_mock.return_value.run.return_value = importer_results
+
+        self.data_importer.execute("folder_name", staged=True)
+
+        shadow_tables_mock.assert_called_with(DataImporter.STAGED_MODELS)
+        shadow_tables = shadow_tables_mock.return_value
+        shadow_tables.create.assert_called()
+        shadow_tables.activate.assert_called()
+        update_derived_data_mock.assert_called_with(importer_results)
+        shadow_tables.swap.assert_called()
+        shadow_tables.drop.assert_not_called()
+        assert refresh_published_data_mock.call_args[0][0] == importer_results
+
+        rmtree_mock.assert_called()
+
+    @patch("data.services.data_importer.rmtree")
+    @patch("data.services.data_importer.GoogleCloudService")
+    @patch("data.services.data_importer.DataImporter._refresh_published_data")
+    @patch("data.services.data_importer.DataImporter._update_derived_data")
+    @patch("data.services.data_importer.ImporterScheduler")
+    @patch("data.services.data_importer.ShadowTables")
+    @patch(
+        "data.services.data_importer.SchemaValidation.validate_schemas",
+        return_value=True,
+    )
+    def test_execute_staged_with_failure(
+        self,
+        _,
+        shadow_tables_mock,
+        importer_scheduler_mock,
+        update_derived_data_mock,
+        refresh_published_data_mock,
+        mock_google_cloud_service,
+        rmtree_mock,
+    ):
+        def run_importers():
+            return {
+                OFFICER_MODEL_NAME: ImportLog.objects.create(
+                    data_model=OFFICER_MODEL_NAME,
+                    status=IMPORT_LOG_STATUS_FINISHED,
+                )
+            }
+
+        importer_scheduler_mock.return_value.run.side_effect = run_importers
+        shadow_tables = shadow_tables_mock.return_value
+        shadow_tables.swap.side_effect = Exception("Lock timeout")
+
+        self.data_importer.execute("folder_name", staged=True)
+
+        shadow_tables.drop.assert_called()
+        refresh_published_data_mock.assert_not_called()
+
+        import_log = ImportLog.objects.get(data_model=OFFICER_MODEL_NAME)
+        assert import_log.status == IMPORT_LOG_STATUS_ERROR
+        assert import_log.error_message == "Staged import was not swapped into place"
+
+        rmtree_mock.assert_called()
+
+    def get_importer_results(self, *model_names):
+        return {
+            model_name: model_name in model_names
+            for model_name in [
+                AGENCY_MODEL_NAME,
+                OFFICER_MODEL_NAME,
+                COMPLAINT_MODEL_NAME,
+                BRADY_MODEL_NAME,
+                USE_OF_FORCE_MODEL_NAME,
+                CITIZEN_MODEL_NAME,
+                APPEAL_MODEL_NAME,
+                EVENT_MODEL_NAME,
+                POST_OFFICE_HISTORY_MODEL_NAME,
+                PERSON_MODEL_NAME,
+            ]
+        }
+
+    def create_people_officers(self):
+        person_1 = PersonFactory(all_complaints_count=3)
+        person_2 = PersonFactory(all_complaints_count=10)
+        officer_1 = OfficerFactory(person=person_1)
+        officer_2 = OfficerFactory(person=person_1)
+        OfficerFactory(person=person_2)
+
+        self.data_importer.import_session = ImportSession()
+        self.data_importer.import_session.add_changed_ids(
+            OFFICERS_CHANGED_IDS, [officer_1.id]
+        )
+
+        return person_1, officer_1, officer_2
+
+    @patch("data.services.data_importer.compute_department_data_period")
+    @patch("data.services.data_importer.MigrateOfficerMovement.process")
+    @patch("data.services.data_importer.calculate_complaint_fraction")
+    @patch("data.services.data_importer.calculate_officer_fraction")
+    @patch("data.services.data_importer.count_complaints")
+    def test_update_derived_data_scoped_complaint_counts(
+        self,
+        count_complaints_mock,
+        calculate_officer_fraction_mock,
+        calculate_complaint_fraction_mock,
+        _,
+        __,
+    ):
+        person_1, officer_1, officer_2 = self.create_people_officers()
+
+        self.data_importer._update_derived_data(
+            self.get_importer_results(COMPLAINT_MODEL_NAME)
+        )
+
+        calculate_officer_fraction_mock.assert_not_called()
+        count_complaints_mock.assert_called_once_with(person_ids={person_1.id})
+        calculate_complaint_fraction_mock.assert_called_once_with(
+            officer_ids={officer_1.id, officer_2.id}
+        )
+
+    @patch("data.services.data_importer.compute_department_data_period")
+    @patch("data.services.data_importer.MigrateOfficerMovement.process")
+    @patch("data.services.data_importer.calculate_complaint_fraction")
+    @patch("data.services.data_importer.calculate_officer_fraction")
+    @patch("data.services.data_importer.count_complaints")
+    def test_update_derived_data_changed_max_complaints_count(
+        self,
+        count_complaints_mock,
+        calculate_officer_fraction_mock,
+        calculate_complaint_fraction_mock,
+        _,
+        __,
+    ):
+        person_1, officer_1, officer_2 = self.create_people_officers()
+        count_complaints_mock.side_effect = lambda person_ids: Person.objects.filter(
+            id=person_1.id
+        ).update(all_complaints_count=20)
+
+        self.data_importer._update_derived_data(
+            self.get_importer_results(COMPLAINT_MODEL_NAME)
+        )
+
+        count_complaints_mock.assert_called_once_with(person_ids={person_1.id})
+        calculate_complaint_fraction_mock.assert_called_once_with()
+
+    @patch("data.services.data_importer.compute_department_data_period")
+    @patch("data.services.data_importer.MigrateOfficerMovement.process")
+    @patch("data.services.data_importer.calculate_complaint_fraction")
+    @patch("data.services.data_importer.calculate_officer_fraction")
+    @patch("data.services.data_importer.count_complaints")
+    def test_update_derived_data_agency_imported(
+        self,
+        count_complaints_mock,
+        calculate_officer_fraction_mock,
+        calculate_complaint_fraction_mock,
+        _,
+        __,
+    ):
+        self.create_people_officers()
+
+        self.data_importer._update_derived_data(
+            self.get_importer_results(AGENCY_MODEL_NAME)
+        )
+
+        calculate_officer_fraction_mock.assert_called_once_with()
+        count_complaints_mock.assert_called_once_with()
+        calculate_complaint_fraction_mock.assert_called_once_with()
+
+    def create_departments_officers(self):
+        department_1 = DepartmentFactory(officer_fraction=1)
+        department_2 = DepartmentFactory(officer_fraction=0.5)
+        OfficerFactory.create_batch(2, department=department_1)
+        OfficerFactory.create_batch(2, department=department_2)
+
+        self.data_importer.import_session = ImportSession()
+
+        return department_1, department_2
+
+    @patch("data.services.data_importer.compute_department_data_period")
+    @patch("data.services.data_importer.MigrateOfficerMovement.process")
+    @patch("data.services.data_importer.calculate_complaint_fraction")
+    @patch("data.services.data_importer.count_complaints")
+    @patch("data.services.data_importer.calculate_officer_fraction")
+    def test_update_derived_data_scoped_officer_fractions(
+        self, calculate_officer_fraction_mock, *_
+    ):
+        _, department_2 = self.create_departments_officers()
+        self.data_importer.import_session.add_changed_ids(
+            DEPARTMENTS_CHANGED_IDS, [department_2.id]
+        )
+
+        self.data_importer._update_derived_data(
+            self.get_importer_results(OFFICER_MODEL_NAME)
+        )
+
+        calculate_officer_fraction_mock.assert_called_once_with(
+            department_ids={department_2.id}
+        )
+
+    @patch("data.services.data_importer.compute_department_data_period")
+    @patch("data.services.data_importer.MigrateOfficerMovement.process")
+    @patch("data.services.data_importer.calculate_complaint_fraction")
+    @patch("data.services.data_importer.count_complaints")
+    @patch("data.services.data_importer.calculate_officer_fraction")
+    def test_update_derived_data_changed_largest_department(
+        self, calculate_officer_fraction_mock, *_
+    ):
+        department_1, _ = self.create_departments_officers()
+        self.data_importer.import_session.add_changed_ids(
+            DEPARTMENTS_CHANGED_IDS, [department_1.id]
+        )
+
+        self.data_importer._update_derived_data(
+            self.get_importer_results(OFFICER_MODEL_NAME)
+        )
+
+        calculate_officer_fraction_mock.assert_called_once_with()
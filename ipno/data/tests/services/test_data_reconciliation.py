@@ -26,7 +26,10 @@ from data.constants import (
     POST_OFFICE_HISTORY_MODEL_NAME,
     USE_OF_FORCE_MODEL_NAME,
 )
-from data.services.data_reconciliation import DataReconciliation
+from data.services.data_reconciliation import (
+    DataReconciliation,
+    compute_row_fingerprint,
+)
 from departments.factories.department_factory import DepartmentFactory
 from departments.models.department import Department
 from documents.factories.document_factory import DocumentFactory
@@ -143,6 +146,9 @@ class DataReconciliationTestCaseBase(ABC):
         if self.model_name == AGENCY_MODEL_NAME:
             data["location"] = ", ".join(data["location"].split(", ")[::-1])
 
+        if self.data_reconciliation.use_fingerprint:
+            data["row_fingerprint"] = compute_row_fingerprint(self.csv_data[0])
+
         self.Factory.create(**data)
 
         output = self.data_reconciliation.reconcile_data()
@@ -526,6 +532,7 @@ class DocumentDataReconciliationTestCase(TestCase):
         }
 
         data["pages_count"] = self.content[0][self.columns_mapping["page_count"]]
+        data["row_fingerprint"] = compute_row_fingerprint(self.csv_data[0])
 
         self.Factory(**data)
 
@@ -539,3 +546,83 @@ class DocumentDataReconciliationTestCase(TestCase):
                 column: self.fields.index(column) for column in self.fields
             },
         }
+
+
+class FingerprintDataReconciliationTestCase(TestCase):
+    def setUp(self):
+        self.csv_file_path = "./ipno/data/tests/services/test_data/data_allegation.csv"
+        self.data_reconciliation = DataReconciliation(
+            COMPLAINT_MODEL_NAME, self.csv_file_path
+        )
+        self.fields = self.data_reconciliation._get_columns()
+
+        with open(self.csv_file_path) as csvfile:
+            reader = csv.DictReader(csvfile, strict=True)
+            self.content = list(reader)
+
+    def _create_complaints(self):
+        for row in self.content:
+            ComplaintFactory(
+                **{field: row[field] or None for field in self.fields},
+                row_fingerprint=compute_row_fingerprint(
+                    [row[field] for field in self.fields]
+                ),
+            )
+
+    def test_use_fingerprint(self):
+        assert self.data_reconciliation.use_fingerprint
+        assert not DataReconciliation(
+            NEWS_ARTICLE_CLASSIFICATION_MODEL_NAME,
+            "./ipno/data/tests/services/test_data/data_news_article_classification.csv",
+        ).use_fingerprint
+
+    def test_is_unchanged(self):
+        self._create_complaints()
+
+        assert self.data_reconciliation.is_unchanged()
+
+    def test_is_unchanged_with_updated_row(self):
+        self._create_complaints()
+        Complaint.objects.filter(
+            allegation_uid=self.content[0]["allegation_uid"]
+        ).update(row_fingerprint=compute_row_fingerprint(["changed"]))
+
+        assert not self.data_reconciliation.is_unchanged()
+
+    def test_is_unchanged_with_missing_fingerprint(self):
+        self._create_complaints()
+        Complaint.objects.filter(
+            allegation_uid=self.content[0]["allegation_uid"]
+        ).update(row_fingerprint=None)
+
+        assert not self.data_reconciliation.is_unchanged()
+
+    def test_is_unchanged_with_deleted_row(self):
+        self._create_complaints()
+        ComplaintFactory(row_fingerprint=compute_row_fingerprint(["deleted"]))
+
+        assert not self.data_reconciliation.is_unchanged()
+
+    def test_has_unfingerprinted_rows(self):
+        self._create_complaints()
+
+        assert not self.data_reconciliation.has_unfingerprinted_rows()
+
+        Complaint.objects.filter(
+            allegation_uid=self.content[0]["allegation_uid"]
+        ).update(row_fingerprint=None)
+
+        assert self.data_reconciliation.has_unfingerprinted_rows()
+
+    def test_get_row_fingerprint(self):
+        output = self.data_reconciliation.reconcile_data()
+
+        added_row = output["added_rows"][0]
+        allegation_uid = added_row[output["columns_mapping"]["allegation_uid"]]
+        csv_row = next(
+            row for row in self.content if row["allegation_uid"] == allegation_uid
+        )
+
+        assert self.data_reconciliation.get_row_fingerprint(
+            added_row
+        ) == compute_row_fingerprint([csv_row[field] for field in self.fields])
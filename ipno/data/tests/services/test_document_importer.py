@@ -1,4 +1,8 @@
+import io
+from csv import DictWriter
 from inspect import cleandoc
+from io import BytesIO
+from tempfile import TemporaryDirectory, mkdtemp
 from unittest.mock import ANY, call
 
 from django.conf import settings
@@ -6,17 +10,28 @@ from django.test.testcases import TestCase, override_settings
 from django.utils.text import slugify
 
 import pytest
+import requests
 from dropbox.exceptions import ApiError
 from mock import MagicMock, Mock, patch
 
-from data.constants import IMPORT_LOG_STATUS_ERROR, IMPORT_LOG_STATUS_FINISHED
+from data.constants import (
+    DOCUMENT_MODEL_NAME,
+    GCS_UPLOAD_CHUNK_SIZE,
+    IMPORT_LOG_STATUS_ERROR,
+    IMPORT_LOG_STATUS_FINISHED,
+    OCR_TEXT_TIMEOUT,
+)
 from data.models import ImportLog
 from data.services import DocumentImporter
+from data.services.data_reconciliation import compute_row_fingerprint
+from data.services.document_importer import ResponseStream
+from data.services.streaming_data_reconciliation import StreamingDataReconciliation
 from data.util import MockDataReconciliation
 from departments.factories import DepartmentFactory
 from documents.factories import DocumentFactory
 from documents.models import Document
 from officers.factories import OfficerFactory
+from utils.file_cache import FileCache
 
 
 class DocumentImporterTestCase(TestCase):
@@ -320,9 +335,9 @@ class DocumentImporterTestCase(TestCase):
 
     @patch("data.services.document_importer.requests.get")
     @patch(
-        "data.services.document_importer.generate_from_blob", return_value="image_blob"
+        "data.services.document_importer.generate_from_file", return_value="image_blob"
     )
-    def test_process_successfully(self, generate_from_blob_mock, get_mock):
+    def test_process_successfully(self, generate_from_file_mock, get_mock):
         department_1 = DepartmentFactory(agency_name="New Orleans PD")
         department_2 = DepartmentFactory(agency_name="Baton Rouge PD")
 
@@ -398,17 +413,19 @@ class DocumentImporterTestCase(TestCase):
 
         mock_upload_file = MagicMock(side_effect=upload_file_side_effect)
         document_importer.upload_file = mock_upload_file
+        mock_upload_file_from_stream = MagicMock(side_effect=upload_file_side_effect)
+        document_importer.upload_file_from_stream = mock_upload_file_from_stream
 
         mock_get_temporary_link_from_path = Mock(return_value="https://example.com")
         document_importer.ds = Mock(
             get_temporary_link_from_path=mock_get_temporary_link_from_path
         )
 
-        def get_ocr_text_side_effect(ocr_text_id):
+        def fetch_ocr_text_side_effect(ocr_text_id, _content_hash):
             return f"ocr text for {ocr_text_id}"
 
-        mock_get_ocr_text = Mock(side_effect=get_ocr_text_side_effect)
-        document_importer.get_ocr_text = mock_get_ocr_text
+        mock_fetch_ocr_text = Mock(side_effect=fetch_ocr_text_side_effect)
+        document_importer.fetch_ocr_text = mock_fetch_ocr_text
 
         result = document_importer.process()
 
@@ -548,14 +565,15 @@ class DocumentImporterTestCase(TestCase):
                 == document_data[check_columns_mappings["officer_ids"]]
             )
 
-        assert mock_upload_file.call_count == 6
+        assert mock_upload_file_from_stream.call_count == 3
+        assert mock_upload_file.call_count == 3
 
     @patch(
-        "data.services.document_importer.generate_from_blob",
+        "data.services.document_importer.generate_from_file",
         return_value="preview_image_blob",
     )
-    def test_generate_preview_image_success(self, _):
-        image_blob = "image_blob"
+    def test_generate_preview_image_success(self, generate_from_file_mock):
+        file_path = "/tmp/file.pdf"
         upload_url = "path/to/file.pdf"
 
         mock_upload_file_from_string = MagicMock()
@@ -565,9 +583,10 @@ class DocumentImporterTestCase(TestCase):
         )
 
         preview_image_url = document_importer.generate_preview_image(
-            image_blob, upload_url
+            file_path, upload_url
         )
 
+        generate_from_file_mock.assert_called_with(file_path)
         mock_upload_file_from_string.assert_called_with(
             "path/to/file-preview.jpeg", "preview_image_blob", "image/jpeg"
         )
@@ -576,9 +595,9 @@ class DocumentImporterTestCase(TestCase):
             == f"{settings.GC_DOCUMENT_BUCKET_PATH}path/to/file-preview.jpeg"
         )
 
-    @patch("data.services.document_importer.generate_from_blob", return_value=None)
+    @patch("data.services.document_importer.generate_from_file", return_value=None)
     def test_generate_preview_image_fail(self, _):
-        image_blob = "image_blob"
+        file_path = "/tmp/file.pdf"
         upload_url = "path/to/file.pdf"
 
         mock_upload_file_from_string = MagicMock()
@@ -588,48 +607,12 @@ class DocumentImporterTestCase(TestCase):
         )
 
         preview_image_url = document_importer.generate_preview_image(
-            image_blob, upload_url
+            file_path, upload_url
         )
 
         mock_upload_file_from_string.assert_not_called()
         assert preview_image_url is None
 
-    @patch("data.services.document_importer.requests.get")
-    def test_get_ocr_text_success(self, get_mock):
-        get_mock_return = Mock(text="decoded_value")
-        get_mock.return_value = get_mock_return
-
-        mock_get_temporary_link_from_path = Mock(return_value="temp_link")
-        mock_dropbox = Mock(
-            get_temporary_link_from_path=mock_get_temporary_link_from_path
-        )
-
-        document_importer = DocumentImporter("csv_file_path")
-        document_importer.ds = mock_dropbox
-
-        ocr_text_id = "ocr_text_id"
-        ocr_text = document_importer.get_ocr_text(ocr_text_id)
-
-        mock_get_temporary_link_from_path.assert_called_with(ocr_text_id)
-        get_mock.assert_called_with("temp_link")
-        assert ocr_text == "decoded_value"
-
-    @patch("data.services.document_importer.requests.get")
-    def test_get_ocr_text_fail(self, get_mock):
-        mock_get_temporary_link_from_path = Mock()
-        mock_get_temporary_link_from_path.side_effect = Exception()
-        mock_dropbox = Mock(
-            get_temporary_link_from_path=mock_get_temporary_link_from_path
-        )
-
-        document_importer = DocumentImporter("csv_file_path")
-        document_importer.ds = mock_dropbox
-
-        ocr_text_id = "ocr_text_id"
-        ocr_text = document_importer.get_ocr_text(ocr_text_id)
-
-        assert ocr_text == ""
-
     @patch("data.services.document_importer.requests.get")
     def test_handle_pdf_file_process_success(self, get_mock):
         get_mock_return = Mock(headers={"content-type": "application/pdf"})
@@ -650,7 +633,14 @@ class DocumentImporterTestCase(TestCase):
         uploaded_url = document_importer.handle_file_process(pdf_db_path)
 
         mock_get_temporary_link_from_path.assert_called_with(pdf_db_path)
-        get_mock.assert_called_with("temp_link")
+        get_mock.assert_called_with(
+            "temp_link",
+            stream=True,
+            timeout=(
+                settings.DOCUMENT_TRANSFER_CONNECT_TIMEOUT,
+                settings.DOCUMENT_TRANSFER_READ_TIMEOUT,
+            ),
+        )
         assert uploaded_url == {
             "document_url": (
                 "https://storage.googleapis.com/llead-documents-test/pdf_db_path"
@@ -679,7 +669,14 @@ class DocumentImporterTestCase(TestCase):
         uploaded_url = document_importer.handle_file_process(pdf_db_path)
 
         mock_get_temporary_link_from_path.assert_called_with(pdf_db_path)
-        get_mock.assert_called_with("temp_link")
+        get_mock.assert_called_with(
+            "temp_link",
+            stream=True,
+            timeout=(
+                settings.DOCUMENT_TRANSFER_CONNECT_TIMEOUT,
+                settings.DOCUMENT_TRANSFER_READ_TIMEOUT,
+            ),
+        )
         assert uploaded_url == {
             "document_url": (
                 "https://storage.googleapis.com/llead-documents-test/pdf_db_path"
@@ -709,5 +706,365 @@ class DocumentImporterTestCase(TestCase):
         uploaded_url = document_importer.handle_file_process(pdf_db_path)
 
         mock_get_temporary_link_from_path.assert_called_with(pdf_db_path)
-        get_mock.assert_called_with("temp_link")
+        get_mock.assert_called_with(
+            "temp_link",
+            stream=True,
+            timeout=(
+                settings.DOCUMENT_TRANSFER_CONNECT_TIMEOUT,
+                settings.DOCUMENT_TRANSFER_READ_TIMEOUT,
+            ),
+        )
         assert uploaded_url == {}
+
+    @patch("data.services.document_importer.time.sleep")
+    def test_transfer_file_retries_transient_errors(self, sleep_mock):
+        document_importer = DocumentImporter("csv_file_path")
+        uploaded_file = {
+            "document_url": "document_url",
+            "document_preview_url": None,
+            "document_type": "application/msword",
+        }
+        document_importer.handle_file_process = Mock(
+            side_effect=[requests.ConnectionError(), uploaded_file]
+        )
+
+        assert document_importer.transfer_file("/PPACT/file.doc") == uploaded_file
+        assert document_importer.handle_file_process.call_count == 2
+        sleep_mock.assert_called_once()
+
+    @patch("data.services.document_importer.time.sleep")
+    def test_transfer_file_retries_timeouts(self, sleep_mock):
+        document_importer = DocumentImporter("csv_file_path")
+        uploaded_file = {
+            "document_url": "document_url",
+            "document_preview_url": None,
+            "document_type": "application/msword",
+        }
+        document_importer.handle_file_process = Mock(
+            side_effect=[requests.ReadTimeout(), uploaded_file]
+        )
+
+        assert document_importer.transfer_file("/PPACT/file.doc") == uploaded_file
+        assert document_importer.handle_file_process.call_count == 2
+        sleep_mock.assert_called_once()
+
+    @patch("data.services.document_importer.time.sleep")
+    def test_transfer_file_fails_after_attempts(self, _):
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.handle_file_process = Mock(
+            side_effect=requests.ConnectionError()
+        )
+
+        with pytest.raises(requests.ConnectionError):
+            document_importer.transfer_file("/PPACT/file.doc")
+
+        assert document_importer.handle_file_process.call_count == 3
+
+    def test_transfer_files(self):
+        document_importer = DocumentImporter("csv_file_path")
+        document_1 = {"docid": "docid-1"}
+        document_2 = {"docid": "docid-2"}
+        document_3 = {"docid": "docid-3"}
+        document_importer.new_documents = [document_1, document_3]
+        document_importer.update_documents = [document_2]
+        document_importer.pending_uploads = {
+            "/PPACT/file.pdf": [document_1, document_2],
+            "/PPACT/missing.pdf": [document_3],
+        }
+        uploaded_file = {
+            "document_url": "document_url",
+            "document_preview_url": "document_preview_url",
+            "document_type": "application/pdf",
+        }
+
+        def handle_file_process_side_effect(pdf_db_path, _content_hash):
+            return uploaded_file if pdf_db_path == "/PPACT/file.pdf" else {}
+
+        document_importer.handle_file_process = Mock(
+            side_effect=handle_file_process_side_effect
+        )
+
+        document_importer.transfer_files()
+
+        assert document_importer.handle_file_process.call_count == 2
+        assert document_importer.new_documents == [
+            {
+                "docid": "docid-1",
+                "url": "document_url",
+                "preview_image_url": "document_preview_url",
+                "document_type": "application/pdf",
+            }
+        ]
+        assert document_importer.update_documents == [
+            {
+                "docid": "docid-2",
+                "url": "document_url",
+                "preview_image_url": "document_preview_url",
+                "document_type": "application/pdf",
+            }
+        ]
+        assert document_importer.uploaded_files == {"/PPACT/file.pdf": uploaded_file}
+        assert document_importer.pending_uploads == {}
+
+    def test_response_stream(self):
+        response = Mock(iter_content=Mock(return_value=iter([b"abc", b"defg", b"h"])))
+        copy_file = BytesIO()
+
+        stream = ResponseStream(response, copy_file)
+
+        assert stream.tell() == 0
+        assert stream.read(2) == b"ab"
+        assert stream.read(4) == b"cdef"
+        assert stream.tell() == 6
+        assert stream.read() == b"gh"
+        assert stream.read(2) == b""
+        assert stream.tell() == 8
+        assert copy_file.getvalue() == b"abcdefgh"
+
+    def test_response_stream_retries_chunk(self):
+        response = Mock(iter_content=Mock(return_value=iter([b"abc", b"defg", b"h"])))
+        copy_file = BytesIO()
+
+        stream = ResponseStream(response, copy_file)
+
+        assert stream.read(3) == b"abc"
+        assert stream.read(3) == b"def"
+
+        # The chunk failed to upload, the upload resumes from its start
+        assert stream.seek(3) == 3
+        assert stream.read(3) == b"def"
+
+        # Only a part of the chunk was persisted
+        assert stream.seek(-2, io.SEEK_CUR) == 4
+        assert stream.read(3) == b"efg"
+        assert stream.read(3) == b"h"
+        assert stream.tell() == 8
+        assert copy_file.getvalue() == b"abcdefgh"
+
+        with pytest.raises(OSError):
+            stream.seek(0)
+
+        with pytest.raises(OSError):
+            stream.seek(0, io.SEEK_END)
+
+    @patch("data.services.document_importer.requests.get")
+    def test_handle_file_process_streams_file(self, get_mock):
+        get_mock.return_value = Mock(
+            headers={"content-type": "application/pdf"},
+            iter_content=Mock(return_value=iter([b"%PDF", b"-1.4"])),
+        )
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.ds = Mock(
+            get_temporary_link_from_path=Mock(return_value="temp_link")
+        )
+
+        uploaded_contents = []
+
+        def upload_file_from_stream_side_effect(_location, file_stream, _file_type):
+            uploaded_contents.append(file_stream.read(GCS_UPLOAD_CHUNK_SIZE))
+
+        document_importer.gs = Mock(
+            upload_file_from_stream=Mock(
+                side_effect=upload_file_from_stream_side_effect
+            )
+        )
+
+        preview_contents = []
+
+        def generate_preview_image_side_effect(file_path, _upload_url, _content_hash):
+            with open(file_path, "rb") as preview_file:
+                preview_contents.append(preview_file.read())
+            return "preview_image_url"
+
+        document_importer.generate_preview_image = Mock(
+            side_effect=generate_preview_image_side_effect
+        )
+
+        uploaded_url = document_importer.handle_file_process("/PPACT/file.pdf")
+
+        assert uploaded_url["document_preview_url"] == "preview_image_url"
+        assert uploaded_contents == [b"%PDF-1.4"]
+        assert preview_contents == [b"%PDF-1.4"]
+        get_mock.return_value.close.assert_called()
+
+    @patch("data.services.document_importer.generate_from_file")
+    def test_generate_preview_image_with_cache(self, generate_from_file_mock):
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.gs = MagicMock()
+        document_importer.preview_cache = FileCache(mkdtemp(), ".jpeg")
+        generate_from_file_mock.return_value = b"preview_image_blob"
+
+        for _ in range(2):
+            preview_image_url = document_importer.generate_preview_image(
+                "/tmp/file.pdf", "path/to/file.pdf", "content-hash"
+            )
+
+            assert (
+                preview_image_url
+                == f"{settings.GC_DOCUMENT_BUCKET_PATH}path/to/file-preview.jpeg"
+            )
+
+        generate_from_file_mock.assert_called_once_with("/tmp/file.pdf")
+        assert document_importer.gs.upload_file_from_string.call_count == 2
+
+    @patch("data.services.document_importer.requests.get")
+    def test_handle_file_process_with_cached_preview(self, get_mock):
+        get_mock.return_value = Mock(headers={"content-type": "application/pdf"})
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.ds = Mock(
+            get_temporary_link_from_path=Mock(return_value="temp_link")
+        )
+        document_importer.preview_cache = FileCache(mkdtemp(), ".jpeg")
+        document_importer.preview_cache.set("content-hash", b"preview_image_blob")
+        document_importer.generate_preview_image = Mock(
+            return_value="preview_image_url"
+        )
+
+        uploaded_url = document_importer.handle_file_process(
+            "/PPACT/file.pdf", "content-hash"
+        )
+
+        document_importer.generate_preview_image.assert_called_with(
+            None, "file.pdf", "content-hash"
+        )
+        assert uploaded_url["document_preview_url"] == "preview_image_url"
+
+    def test_fetch_ocr_text_success(self):
+        get_mock = Mock(return_value=Mock(text="decoded_value"))
+        mock_get_temporary_link_from_path = Mock(return_value="temp_link")
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.ds = Mock(
+            get_temporary_link_from_path=mock_get_temporary_link_from_path
+        )
+        document_importer.http_session = Mock(get=get_mock)
+        document_importer.ocr_text_cache = FileCache(mkdtemp(), ".txt")
+
+        ocr_text = document_importer.fetch_ocr_text("ocr_text_id", "content-hash")
+
+        mock_get_temporary_link_from_path.assert_called_with("ocr_text_id")
+        get_mock.assert_called_with("temp_link", timeout=OCR_TEXT_TIMEOUT)
+        assert ocr_text == "decoded_value"
+
+    def test_fetch_ocr_text_with_cache(self):
+        get_mock = Mock(return_value=Mock(text="decoded_value"))
+        mock_get_temporary_link_from_path = Mock(return_value="temp_link")
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.ds = Mock(
+            get_temporary_link_from_path=mock_get_temporary_link_from_path
+        )
+        document_importer.http_session = Mock(get=get_mock)
+        document_importer.ocr_text_cache = FileCache(mkdtemp(), ".txt")
+
+        for _ in range(2):
+            ocr_text = document_importer.fetch_ocr_text("ocr_text_id", "content-hash")
+
+            assert ocr_text == "decoded_value"
+
+        mock_get_temporary_link_from_path.assert_called_once_with("ocr_text_id")
+        get_mock.assert_called_once()
+
+    def test_fetch_ocr_text_raises_error(self):
+        response = Mock()
+        response.raise_for_status.side_effect = requests.HTTPError()
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.ds = Mock(
+            get_temporary_link_from_path=Mock(return_value="temp_link")
+        )
+        document_importer.http_session = Mock(get=Mock(return_value=response))
+
+        with pytest.raises(requests.HTTPError):
+            document_importer.fetch_ocr_text("ocr_text_id", "content-hash")
+
+    def test_fetch_ocr_texts(self):
+        old_document = DocumentFactory(
+            text_content="old text", txt_db_content_hash="old-hash"
+        )
+        document_1 = {
+            "docid": "docid-1",
+            "txt_db_content_hash": "hash-1",
+            "row_fingerprint": "fingerprint-1",
+        }
+        document_2 = {
+            "id": old_document.id,
+            "docid": "docid-2",
+            "txt_db_content_hash": "hash-2",
+            "row_fingerprint": "fingerprint-2",
+        }
+        document_3 = {
+            "docid": "docid-3",
+            "txt_db_content_hash": "hash-3",
+            "row_fingerprint": "fingerprint-3",
+        }
+
+        document_importer = DocumentImporter("csv_file_path")
+        document_importer.pending_ocr_texts = {
+            "/LLEAD/text-1.txt": [document_1],
+            "/LLEAD/text-2.txt": [document_2, document_3],
+        }
+
+        def fetch_ocr_text_side_effect(ocr_text_id, _content_hash):
+            if ocr_text_id == "/LLEAD/text-2.txt":
+                raise requests.ConnectionError()
+            return ""
+
+        document_importer.fetch_ocr_text = Mock(side_effect=fetch_ocr_text_side_effect)
+
+        document_importer.fetch_ocr_texts()
+
+        document_importer.fetch_ocr_text.assert_has_calls(
+            [
+                call("/LLEAD/text-1.txt", "hash-1"),
+                call("/LLEAD/text-2.txt", "hash-2"),
+            ],
+            any_order=True,
+        )
+        assert document_1["text_content"] == ""
+        assert document_1["txt_db_content_hash"] == "hash-1"
+        assert document_1["row_fingerprint"] == "fingerprint-1"
+        assert document_2["text_content"] == "old text"
+        assert document_2["txt_db_content_hash"] == "old-hash"
+        assert document_2["row_fingerprint"] is None
+        assert document_3["text_content"] == ""
+        assert document_3["txt_db_content_hash"] is None
+        assert document_3["row_fingerprint"] is None
+        assert document_importer.pending_ocr_texts == {}
+
+    def test_process_with_row_fingerprints(self):
+        DepartmentFactory(agency_name="New Orleans PD")
+
+        columns = StreamingDataReconciliation(DOCUMENT_MODEL_NAME, None)._get_columns()
+        row = {column: "" for column in columns}
+        row.update(
+            {
+                "docid": "00fa809e",
+                "hrg_no": "1",
+                "agency": "New Orleans PD",
+                "pdf_db_path": "/PPACT/export/pdfs/00fa809e.pdf",
+                "hrg_text": "hearing text",
+            }
+        )
+
+        with TemporaryDirectory() as csv_dir:
+            csv_file_path = f"{csv_dir}/data_documents.csv"
+            with open(csv_file_path, "w") as csv_file:
+                writer = DictWriter(csv_file, fieldnames=columns)
+                writer.writeheader()
+                writer.writerow(row)
+
+            document_importer = DocumentImporter(csv_file_path)
+            document_importer.transfer_files = Mock()
+
+            assert document_importer.process()
+
+            document = Document.objects.get()
+            assert document.agency == "new-orleans-pd"
+            assert document.row_fingerprint == compute_row_fingerprint(
+                [row[column] for column in columns]
+            )
+
+            assert DocumentImporter(csv_file_path).data_reconciliation.is_unchanged()
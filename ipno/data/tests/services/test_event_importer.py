@@ -265,11 +265,16 @@ class EventImporterTestCase(TestCase):
 
         event_data = [getattr(event, field) for field in self.header]
 
-        self.event_importer.new_event_uids = ["event-uid"]
+        self.event_importer.new_event_uids = {"event-uid"}
 
-        self.event_importer.handle_record_data(event_data)
+        self.event_importer.handle_record_data(
+            event_data,
+            self.event_importer.parse_row_data(
+                event_data, self.event_importer.column_mappings
+            ),
+        )
 
-        assert self.event_importer.new_event_uids == ["event-uid"]
+        assert self.event_importer.new_event_uids == {"event-uid"}
 
     def test_delete_row_with_non_exist_uid(self):
         department = DepartmentFactory(agency_name="New Orleans PD")
@@ -311,7 +316,7 @@ class EventImporterTestCase(TestCase):
             "award comments",
         ]
 
-        self.event_importer.new_event_uids = ["event-uid"]
+        self.event_importer.new_event_uids = {"event-uid"}
 
         self.event_importer.data_reconciliation = MockDataReconciliation(
             {
@@ -325,6 +330,53 @@ class EventImporterTestCase(TestCase):
         )
         self.event_importer.process()
 
-        assert self.event_importer.new_event_uids == ["event-uid"]
+        assert self.event_importer.new_event_uids == {"event-uid"}
         assert self.event_importer.delete_events_ids == []
         assert Event.objects.all().count() == 1
+
+    def test_update_relations(self):
+        complaint_1 = ComplaintFactory(allegation_uid="allegation-uid1")
+        complaint_2 = ComplaintFactory(allegation_uid="allegation-uid2")
+        complaint_3 = ComplaintFactory(allegation_uid="allegation-uid3")
+        event_1 = EventFactory(allegation_uid="allegation-uid1")
+        event_2 = EventFactory(allegation_uid="allegation-uid2")
+        event_3 = EventFactory(allegation_uid=None)
+
+        ComplaintRelation = Event.complaints.through
+        kept_relation = ComplaintRelation.objects.create(
+            event_id=event_1.id, complaint_id=complaint_1.id
+        )
+        ComplaintRelation.objects.create(
+            event_id=event_3.id, complaint_id=complaint_3.id
+        )
+
+        self.event_importer.update_relations()
+
+        assert set(
+            ComplaintRelation.objects.values_list("event_id", "complaint_id")
+        ) == {
+            (event_1.id, complaint_1.id),
+            (event_2.id, complaint_2.id),
+        }
+        assert ComplaintRelation.objects.filter(id=kept_relation.id).exists()
+
+    def test_get_changed_department_ids(self):
+        department_1 = DepartmentFactory()
+        department_2 = DepartmentFactory()
+        department_3 = DepartmentFactory()
+        department_4 = DepartmentFactory()
+        updated_event = EventFactory(department=department_1)
+        deleted_event = EventFactory(department=department_2)
+
+        self.event_importer.new_events_attrs = [{"department_id": department_3.id}]
+        self.event_importer.update_events_attrs = [
+            {"id": updated_event.id, "department_id": department_4.id}
+        ]
+        self.event_importer.delete_events_ids = [deleted_event.id]
+
+        assert self.event_importer.get_changed_department_ids() == {
+            department_1.id,
+            department_2.id,
+            department_3.id,
+            department_4.id,
+        }
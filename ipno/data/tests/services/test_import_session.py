@@ -0,0 +1,75 @@
+from django.test.testcases import TestCase
+
+from data.services import BaseImporter
+from data.services.import_session import ImportSession
+from departments.factories import DepartmentFactory
+from officers.factories import OfficerFactory
+from officers.models import Officer
+
+
+class ImportSessionTestCase(TestCase):
+    def test_get_mappings(self):
+        officer_1 = OfficerFactory(uid="officer-uid-1")
+        officer_2 = OfficerFactory(uid="officer-uid-2")
+
+        import_session = ImportSession()
+        mappings = import_session.get_mappings(Officer)
+
+        assert mappings == {
+            "officer-uid-1": officer_1.id,
+            "officer-uid-2": officer_2.id,
+        }
+
+        OfficerFactory(uid="officer-uid-3")
+
+        assert import_session.get_mappings(Officer) is mappings
+        assert "officer-uid-3" not in mappings
+
+    def test_update_mappings(self):
+        officer_1 = OfficerFactory(uid="officer-uid-1")
+        officer_2 = OfficerFactory(uid="officer-uid-2")
+
+        import_session = ImportSession()
+        import_session.get_mappings(Officer)
+
+        officer_3 = OfficerFactory(uid="officer-uid-3")
+        import_session.update_mappings(Officer, ["officer-uid-3"], [officer_2.id])
+
+        assert import_session.get_mappings(Officer) == {
+            "officer-uid-1": officer_1.id,
+            "officer-uid-3": officer_3.id,
+        }
+
+    def test_update_mappings_not_loaded(self):
+        import_session = ImportSession()
+        import_session.update_mappings(Officer, ["officer-uid"], [])
+
+        assert import_session.mappings == {}
+
+    def test_changed_ids(self):
+        import_session = ImportSession()
+
+        import_session.add_changed_ids("event_departments", [1, 2, None])
+        import_session.add_changed_ids("event_departments", [2, 3])
+
+        assert import_session.get_changed_ids("event_departments") == {1, 2, 3}
+        assert import_session.get_changed_ids("other") == set()
+
+    def test_bulk_import_updates_session_mappings(self):
+        department = DepartmentFactory(agency_slug="new-orleans-pd")
+        officer = OfficerFactory(uid="officer-uid-1")
+
+        importer = BaseImporter()
+        importer.import_session = ImportSession()
+        assert importer.get_officer_mappings() == {"officer-uid-1": officer.id}
+
+        importer.bulk_import(
+            Officer,
+            [{"uid": "officer-uid-2", "department_id": department.id}],
+            [],
+            [officer.id],
+        )
+
+        assert importer.get_officer_mappings() == {
+            "officer-uid-2": Officer.objects.get(uid="officer-uid-2").id,
+        }
@@ -0,0 +1,140 @@
+import threading
+
+from django.test import TestCase
+
+from pytest import raises
+
+from data.constants import IMPORT_LOG_STATUS_FINISHED
+from data.models import ImportLog
+from data.services.importer_scheduler import ImporterScheduler
+
+
+def create_importer_class(data_model, dependencies=None):
+    return type(
+        f"{data_model.capitalize()}Importer",
+        (),
+        {"data_model": data_model, "DEPENDENCIES": dependencies or []},
+    )
+
+
+class ImporterSchedulerTestCase(TestCase):
+    def setUp(self):
+        self.agency_importer = create_importer_class("agency")
+        self.officer_importer = create_importer_class("officer", ["agency"])
+        self.complaint_importer = create_importer_class(
+            "complaint", ["agency", "officer"]
+        )
+        self.uof_importer = create_importer_class("uof", ["agency", "officer"])
+        self.citizen_importer = create_importer_class(
+            "citizen", ["complaint", "uof", "newsarticle"]
+        )
+        self.importer_classes = [
+            self.citizen_importer,
+            self.complaint_importer,
+            self.uof_importer,
+            self.officer_importer,
+            self.agency_importer,
+        ]
+
+    def test_run_sequentially(self):
+        imported = []
+
+        def run_importer(importer_class):
+            imported.append(importer_class.data_model)
+            return importer_class.data_model != "uof"
+
+        results = ImporterScheduler(self.importer_classes, run_importer).run()
+
+        assert imported == ["agency", "officer", "complaint", "uof", "citizen"]
+        assert results == {
+            "agency": True,
+            "officer": True,
+            "complaint": True,
+            "uof": False,
+            "citizen": True,
+        }
+
+    def test_run_concurrently(self):
+        imported = []
+        lock = threading.Lock()
+        complaint_started = threading.Event()
+        uof_started = threading.Event()
+
+        def run_importer(importer_class):
+            if importer_class.data_model == "complaint":
+                complaint_started.set()
+                assert uof_started.wait(timeout=5)
+            if importer_class.data_model == "uof":
+                uof_started.set()
+                assert complaint_started.wait(timeout=5)
+
+            with lock:
+                imported.append(importer_class.data_model)
+
+            return True
+
+        scheduler = ImporterScheduler(
+            self.importer_classes, run_importer, max_workers=3
+        )
+        results = scheduler.run()
+
+        assert imported[:2] == ["agency", "officer"]
+        assert set(imported[2:4]) == {"complaint", "uof"}
+        assert imported[4] == "citizen"
+        assert all(results.values())
+        assert set(scheduler.timings) == set(results)
+
+    def test_run_stops_scheduling_after_failure(self):
+        imported = []
+
+        def run_importer(importer_class):
+            if importer_class.data_model == "officer":
+                raise Exception("Import failed")
+
+            imported.append(importer_class.data_model)
+            return True
+
+        with raises(Exception, match="Import failed"):
+            ImporterScheduler(self.importer_classes, run_importer, max_workers=3).run()
+
+        assert imported == ["agency"]
+
+    def test_run_saves_timings(self):
+        old_import_log = ImportLog.objects.create(
+            data_model="agency", status=IMPORT_LOG_STATUS_FINISHED
+        )
+
+        def run_importer(importer_class):
+            ImportLog.objects.create(
+                data_model=importer_class.data_model,
+                status=IMPORT_LOG_STATUS_FINISHED,
+            )
+            return True
+
+        scheduler = ImporterScheduler(
+            [self.agency_importer, self.officer_importer], run_importer
+        )
+        scheduler.run()
+
+        for data_model in ["agency", "officer"]:
+            import_log = ImportLog.objects.filter(data_model=data_model).latest(
+                "created_at"
+            )
+
+            assert (
+                import_log.waiting_time == scheduler.timings[data_model]["waiting_time"]
+            )
+            assert (
+                import_log.running_time == scheduler.timings[data_model]["running_time"]
+            )
+            assert import_log.running_time >= 0
+
+        old_import_log.refresh_from_db()
+        assert old_import_log.waiting_time is None
+        assert old_import_log.running_time is None
+
+    def test_circular_dependencies(self):
+        self.agency_importer.DEPENDENCIES = ["citizen"]
+
+        with raises(ValueError, match="Circular importer dependencies"):
+            ImporterScheduler(self.importer_classes, lambda _: True)
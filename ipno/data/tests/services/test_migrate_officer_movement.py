@@ -0,0 +1,123 @@
+from datetime import date
+
+from django.test.testcases import TestCase
+
+from data.services.migrate_officer_movement import MigrateOfficerMovement
+from departments.factories import DepartmentFactory, OfficerMovementFactory
+from departments.models import OfficerMovement
+from officers.factories import OfficerFactory
+from post_officer_history.factories.post_officer_history_factory import (
+    PostOfficerHistoryFactory,
+)
+
+
+class MigrateOfficerMovementTestCase(TestCase):
+    def setUp(self):
+        self.department_1 = DepartmentFactory()
+        self.department_2 = DepartmentFactory()
+        self.department_3 = DepartmentFactory()
+        self.officer_1 = OfficerFactory()
+        self.officer_2 = OfficerFactory()
+
+        PostOfficerHistoryFactory(
+            history_id="history-id-1",
+            officer=self.officer_1,
+            department=self.department_2,
+            hire_date=date(2018, 1, 1),
+            left_reason="Transferred",
+        )
+        PostOfficerHistoryFactory(
+            history_id="history-id-1",
+            officer=self.officer_1,
+            department=self.department_1,
+            hire_date=date(2015, 1, 1),
+            left_reason="Resigned",
+        )
+        PostOfficerHistoryFactory(
+            history_id="history-id-1",
+            officer=self.officer_1,
+            department=self.department_3,
+            hire_date=date(2020, 1, 1),
+            left_reason=None,
+        )
+        PostOfficerHistoryFactory(
+            history_id="history-id-2",
+            officer=self.officer_2,
+            department=self.department_1,
+            hire_date=date(2016, 1, 1),
+        )
+
+    def get_movements(self):
+        return set(
+            OfficerMovement.objects.values_list(
+                "history_id",
+                "officer_id",
+                "start_department_id",
+                "end_department_id",
+                "date",
+                "left_reason",
+            )
+        )
+
+    def test_process(self):
+        OfficerMovementFactory(
+            officer=self.officer_2,
+            start_department=self.department_1,
+            end_department=self.department_2,
+            history_id="history-id-2",
+        )
+
+        MigrateOfficerMovement().process()
+
+        assert self.get_movements() == {
+            (
+                "history-id-1",
+                self.officer_1.id,
+                self.department_1.id,
+                self.department_2.id,
+                date(2018, 1, 1),
+                "Resigned",
+            ),
+            (
+                "history-id-1",
+                self.officer_1.id,
+                self.department_2.id,
+                self.department_3.id,
+                date(2020, 1, 1),
+                "Transferred",
+            ),
+        }
+
+    def test_process_with_history_ids(self):
+        kept_movement = OfficerMovementFactory(
+            officer=self.officer_2,
+            start_department=self.department_1,
+            end_department=self.department_2,
+            history_id="history-id-2",
+        )
+        OfficerMovementFactory(
+            officer=self.officer_1,
+            start_department=self.department_1,
+            end_department=self.department_3,
+            history_id="history-id-1",
+        )
+
+        MigrateOfficerMovement().process(history_ids={"history-id-1"})
+
+        assert OfficerMovement.objects.filter(id=kept_movement.id).exists()
+        assert OfficerMovement.objects.filter(history_id="history-id-1").count() == 2
+        assert OfficerMovement.objects.count() == 3
+
+    def test_process_with_history_ids_falls_back_to_full_rebuild(self):
+        OfficerMovementFactory(
+            officer=self.officer_2,
+            start_department=self.department_1,
+            end_department=self.department_2,
+            history_id=None,
+        )
+
+        MigrateOfficerMovement().process(history_ids={"history-id-2"})
+
+        assert OfficerMovement.objects.filter(history_id__isnull=True).count() == 0
+        assert OfficerMovement.objects.filter(history_id="history-id-1").count() == 2
+        assert OfficerMovement.objects.count() == 2
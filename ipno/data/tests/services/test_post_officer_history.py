@@ -160,3 +160,26 @@ class PostOfficerHistoryImporterTestCase(TestCase):
                         if post_officer_history_data[check_columns_mappings[attr]]
                         else None
                     )
+
+    def test_get_changed_history_ids(self):
+        post_officer_history_1 = PostOfficerHistoryFactory(history_id="history-id-1")
+        post_officer_history_2 = PostOfficerHistoryFactory(history_id="history-id-2")
+        PostOfficerHistoryFactory(history_id="history-id-3")
+
+        post_officer_history_importer = PostOfficerHistoryImporter("csv_file_path")
+        post_officer_history_importer.new_post_officer_history_attrs = [
+            {"uid": "officer-uid4", "history_id": "history-id-4"}
+        ]
+        post_officer_history_importer.update_post_officer_history_attrs = [
+            {"id": post_officer_history_1.id, "history_id": "history-id-5"}
+        ]
+        post_officer_history_importer.delete_post_officer_history_ids = [
+            post_officer_history_2.id
+        ]
+
+        assert post_officer_history_importer.get_changed_history_ids() == {
+            "history-id-1",
+            "history-id-2",
+            "history-id-4",
+            "history-id-5",
+        }
@@ -0,0 +1,80 @@
+from django.test.testcases import TestCase
+
+from complaints.factories import ComplaintFactory
+from complaints.models import Complaint
+from data.services.relation_sync import sync_relations
+from officers.factories import OfficerFactory
+
+
+class SyncRelationsTestCase(TestCase):
+    def setUp(self):
+        self.OfficerRelation = Complaint.officers.through
+        self.complaint_1 = ComplaintFactory()
+        self.complaint_2 = ComplaintFactory()
+        self.officer_1 = OfficerFactory()
+        self.officer_2 = OfficerFactory()
+
+        self.kept_relation = self.OfficerRelation.objects.create(
+            complaint_id=self.complaint_1.id, officer_id=self.officer_1.id
+        )
+        self.OfficerRelation.objects.create(
+            complaint_id=self.complaint_1.id, officer_id=self.officer_2.id
+        )
+        self.OfficerRelation.objects.create(
+            complaint_id=self.complaint_2.id, officer_id=self.officer_2.id
+        )
+
+    def test_sync_relations(self):
+        result = sync_relations(
+            self.OfficerRelation,
+            "complaint",
+            "officer",
+            [
+                (self.complaint_1.id, self.officer_1.id),
+                (self.complaint_2.id, self.officer_1.id),
+                (self.complaint_2.id, self.officer_1.id),
+            ],
+        )
+
+        assert result == {"created_relations": 1, "deleted_relations": 0}
+        assert set(
+            self.OfficerRelation.objects.values_list("complaint_id", "officer_id")
+        ) == {
+            (self.complaint_1.id, self.officer_1.id),
+            (self.complaint_1.id, self.officer_2.id),
+            (self.complaint_2.id, self.officer_1.id),
+            (self.complaint_2.id, self.officer_2.id),
+        }
+        assert self.OfficerRelation.objects.count() == 4
+
+    def test_sync_relations_with_source_ids(self):
+        result = sync_relations(
+            self.OfficerRelation,
+            "complaint",
+            "officer",
+            [(self.complaint_1.id, self.officer_1.id)],
+            source_ids=[self.complaint_1.id],
+        )
+
+        assert result == {"created_relations": 0, "deleted_relations": 1}
+        assert set(
+            self.OfficerRelation.objects.values_list("complaint_id", "officer_id")
+        ) == {
+            (self.complaint_1.id, self.officer_1.id),
+            (self.complaint_2.id, self.officer_2.id),
+        }
+        assert self.OfficerRelation.objects.filter(id=self.kept_relation.id).exists()
+
+    def test_sync_relations_without_pairs(self):
+        result = sync_relations(
+            self.OfficerRelation,
+            "complaint",
+            "officer",
+            [],
+            source_ids=[self.complaint_2.id],
+        )
+
+        assert result == {"created_relations": 0, "deleted_relations": 1}
+        assert not self.OfficerRelation.objects.filter(
+            complaint_id=self.complaint_2.id
+        ).exists()
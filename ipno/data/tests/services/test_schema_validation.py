@@ -149,3 +149,18 @@ class SchemaTasksTestCase(TestCase):
             " table `department`: unused_field\n"
         )
         mock_notify_slack.assert_called_with(expected_message)
+
+    @patch("data.services.schema_validation.notify_slack")
+    @patch("data.services.schema_validation.SchemaValidation._check_fields")
+    def test_validate_schemas_skip_not_downloaded_files(
+        self, mock_check_fields, mock_notify_slack
+    ):
+        mock_check_fields.return_value = set(), set()
+        self.schema_validation.models = [Department, Officer]
+        data_mapping = {AGENCY_MODEL_NAME: "csv_file_path"}
+
+        assert self.schema_validation.validate_schemas(data_mapping)
+
+        mock_check_fields.assert_called_once_with(
+            "csv_file_path", self.schema_validation.model_schemas[AGENCY_MODEL_NAME]
+        )
@@ -0,0 +1,160 @@
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test.testcases import TestCase
+
+from mock import patch
+from pytest import raises
+
+from complaints.factories import ComplaintFactory
+from complaints.models import Complaint
+from data.constants import IMPORT_PREVIOUS_SCHEMA, IMPORT_SHADOW_SCHEMA
+from data.services.shadow_tables import (
+    ShadowTables,
+    close_connections,
+    drop_shadow_schemas,
+)
+from departments.models import Department, WrglFile
+from news_articles.models import ExcludeOfficer, MatchedSentence, NewsArticle
+from officers.factories import OfficerFactory
+from officers.models import Event, Officer
+
+
+class ShadowTablesTestCase(TestCase):
+    def get_schemas(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nspname FROM pg_namespace WHERE nspname = ANY(%s)",
+                [[IMPORT_SHADOW_SCHEMA, IMPORT_PREVIOUS_SCHEMA]],
+            )
+
+            return {name for (name,) in cursor.fetchall()}
+
+    def test_tables(self):
+        shadow_tables = ShadowTables([Department, Officer, Complaint])
+
+        assert shadow_tables.tables[:3] == [
+            Department._meta.db_table,
+            Officer._meta.db_table,
+            Complaint._meta.db_table,
+        ]
+        assert {
+            Complaint.officers.through._meta.db_table,
+            Complaint.departments.through._meta.db_table,
+            Department.starred_news_articles.through._meta.db_table,
+            WrglFile._meta.db_table,
+            Event._meta.db_table,
+            MatchedSentence.officers.through._meta.db_table,
+            MatchedSentence.excluded_officers.through._meta.db_table,
+            ExcludeOfficer.officers.through._meta.db_table,
+        } <= set(shadow_tables.tables)
+        assert NewsArticle._meta.db_table not in shadow_tables.tables
+        assert MatchedSentence._meta.db_table not in shadow_tables.tables
+
+    def test_create_and_swap(self):
+        officer = OfficerFactory(first_name="Old")
+        complaint = ComplaintFactory()
+        complaint.officers.add(officer)
+
+        # Tables with pending deferred foreign key checks can not be altered
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+        shadow_tables = ShadowTables([Department, Officer, Complaint])
+        shadow_tables.create()
+
+        assert self.get_schemas() == {IMPORT_SHADOW_SCHEMA}
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE "{IMPORT_SHADOW_SCHEMA}"."{Officer._meta.db_table}"'
+                " SET first_name = 'New' WHERE id = %s",
+                [officer.id],
+            )
+
+        assert Officer.objects.get(id=officer.id).first_name == "Old"
+
+        shadow_tables.swap()
+
+        assert self.get_schemas() == set()
+        assert Officer.objects.get(id=officer.id).first_name == "New"
+        assert list(complaint.officers.all()) == [officer]
+
+        new_officer = OfficerFactory()
+        assert new_officer.id > officer.id
+
+    def test_create_blocks_live_writes(self):
+        officer = OfficerFactory()
+
+        shadow_tables = ShadowTables([Department, Officer])
+        shadow_tables.create()
+
+        with raises(DatabaseError), transaction.atomic():
+            Officer.objects.filter(id=officer.id).update(first_name="New")
+
+        shadow_tables.drop()
+
+        Officer.objects.filter(id=officer.id).update(first_name="New")
+        assert Officer.objects.get(id=officer.id).first_name == "New"
+
+    def test_swap_with_invalid_foreign_key(self):
+        officer = OfficerFactory()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute(
+                "CREATE TABLE test_officer_reference (officer_id integer"
+                f' REFERENCES "{Officer._meta.db_table}" (id))'
+            )
+            cursor.execute(
+                "INSERT INTO test_officer_reference VALUES (%s)", [officer.id]
+            )
+
+        shadow_tables = ShadowTables([Department, Officer])
+        shadow_tables.create()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM "{IMPORT_SHADOW_SCHEMA}"."{Officer._meta.db_table}"'
+            )
+
+        with raises(IntegrityError):
+            shadow_tables.swap()
+
+        shadow_tables.drop()
+
+        assert Officer.objects.filter(id=officer.id).exists()
+
+    def test_drop(self):
+        shadow_tables = ShadowTables([Department])
+        shadow_tables.create()
+
+        shadow_tables.drop()
+
+        assert self.get_schemas() == set()
+
+    def test_drop_shadow_schemas(self):
+        officer = OfficerFactory()
+
+        ShadowTables([Department, Officer]).create()
+
+        drop_shadow_schemas()
+
+        assert self.get_schemas() == set()
+
+        Officer.objects.filter(id=officer.id).update(first_name="New")
+        assert Officer.objects.get(id=officer.id).first_name == "New"
+
+    @patch("data.services.shadow_tables.connections.close_all")
+    def test_close_connections(self, close_all_mock):
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW search_path")
+            (search_path,) = cursor.fetchone()
+
+            cursor.execute(f'SET search_path TO "{IMPORT_SHADOW_SCHEMA}", public')
+
+        close_connections()
+
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW search_path")
+            assert cursor.fetchone() == (search_path,)
+
+        close_all_mock.assert_called()
@@ -0,0 +1,111 @@
+import os
+from shutil import rmtree
+
+from django.test import TestCase
+
+from mock import patch
+
+from data.constants import EVENT_MODEL_NAME, RECONCILIATION_MEMORY_BUDGET
+from data.services.data_reconciliation import DataReconciliation
+from data.services.streaming_data_reconciliation import (
+    RowStream,
+    StreamingDataReconciliation,
+)
+from officers.factories import EventFactory
+
+
+class StreamingDataReconciliationTestCase(TestCase):
+    def setUp(self):
+        self.csv_file_path = "./ipno/data/tests/services/test_data/data_event.csv"
+        self.data_reconciliation = StreamingDataReconciliation(
+            EVENT_MODEL_NAME, self.csv_file_path, memory_budget=1024, chunk_size=2
+        )
+        self.work_dirs = []
+
+    def tearDown(self):
+        for work_dir in self.work_dirs:
+            rmtree(work_dir, ignore_errors=True)
+
+    def _reconcile(self):
+        output = self.data_reconciliation.reconcile_data()
+        self.work_dirs.append(os.path.dirname(output["added_rows"].file_path))
+
+        return output
+
+    def test_get_partitions_count(self):
+        assert self.data_reconciliation._get_partitions_count() > 1
+
+        data_reconciliation = StreamingDataReconciliation(
+            EVENT_MODEL_NAME, self.csv_file_path
+        )
+        assert data_reconciliation._get_partitions_count() == 1
+
+    def test_get_partitions_count_with_large_table(self):
+        data_reconciliation = StreamingDataReconciliation(
+            EVENT_MODEL_NAME, self.csv_file_path
+        )
+
+        with patch.object(
+            data_reconciliation,
+            "_get_table_size",
+            return_value=RECONCILIATION_MEMORY_BUDGET,
+        ):
+            assert data_reconciliation._get_partitions_count() > 1
+
+    def test_get_table_size(self):
+        EventFactory.create_batch(10)
+
+        assert self.data_reconciliation._get_table_size() > 0
+
+    def test_reconcile_data_same_as_in_memory_reconciliation(self):
+        expected_output = DataReconciliation(
+            EVENT_MODEL_NAME, self.csv_file_path
+        ).reconcile_data()
+        added_event_uid = expected_output["added_rows"][0][
+            expected_output["columns_mapping"]["event_uid"]
+        ]
+        EventFactory(event_uid=added_event_uid)
+        EventFactory(event_uid="deleted-event-uid")
+
+        expected_output = DataReconciliation(
+            EVENT_MODEL_NAME, self.csv_file_path
+        ).reconcile_data()
+        output = self._reconcile()
+
+        assert output["columns_mapping"] == expected_output["columns_mapping"]
+        for kind in ["added_rows", "deleted_rows", "updated_rows"]:
+            assert len(output[kind]) == len(expected_output[kind])
+            assert sorted(output[kind]) == sorted(expected_output[kind])
+
+        assert len(output["updated_rows"]) == 1
+        assert len(output["deleted_rows"]) == 1
+
+    def test_reconcile_data_returns_reiterable_rows(self):
+        EventFactory()
+        output = self._reconcile()
+
+        assert not output["updated_rows"]
+        assert len(output["deleted_rows"]) == 1
+        assert list(output["added_rows"]) == list(output["added_rows"])
+
+
+class RowStreamTestCase(TestCase):
+    def setUp(self):
+        self.file_path = "./ipno/data/tests/services/test_data/row_stream.csv"
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def test_row_stream(self):
+        row_stream = RowStream(self.file_path)
+
+        assert not row_stream
+        assert list(row_stream) == []
+
+        row_stream.extend([["1", "first\nline"], ["2", ""]])
+        row_stream.extend([])
+        row_stream.extend([["3", "third"]])
+
+        assert len(row_stream) == 3
+        assert list(row_stream) == [["1", "first\nline"], ["2", ""], ["3", "third"]]
+        assert list(row_stream) == list(row_stream)
@@ -1,6 +1,13 @@
 class MockDataReconciliation:
+    model_class = None
+    use_fingerprint = False
+    csv_rows_count = None
+
     def __init__(self, return_data):
         self.return_data = return_data
 
+    def is_unchanged(self):
+        return False
+
     def reconcile_data(self):
         return self.return_data
@@ -6,12 +6,14 @@ from django.forms import Media
 from mapbox_location_field.models import AddressAutoHiddenField, LocationField
 from mapbox_location_field.widgets import AddressHiddenAdminInput, MapAdminInput
 
+from data.constants import DATA_VERSION_DEPARTMENTS
 from departments.models import Department, OfficerMovement, WrglFile
 from departments.tasks import rebuild_department_index
 from news_articles.models import MatchedSentence, NewsArticle
+from utils.data_version import DataVersionAdminMixin
 
 
-class DepartmentAdmin(ModelAdmin):
+class DepartmentAdmin(DataVersionAdminMixin, ModelAdmin):
     list_display = ("id", "agency_name", "aliases", "created_at", "updated_at")
     search_fields = (
         "agency_slug",
@@ -22,6 +24,7 @@ class DepartmentAdmin(ModelAdmin):
         "starred_news_articles",
         "starred_documents",
     )
+    data_version_entity_types = (DATA_VERSION_DEPARTMENTS,)
 
     change_form_template = "mapbox_location_field/admin_change.html"
     formfield_overrides = {
@@ -37,6 +40,9 @@ class DepartmentAdmin(ModelAdmin):
         if change:
             transaction.on_commit(lambda: rebuild_department_index(obj.id))
 
+    def get_flush_caches_kwargs(self, objs):
+        return {"department_ids": [obj.id for obj in objs]}
+
     def change_view(self, request, object_id, form_url="", extra_context=None):
         """add media that is placed below form as separate argument in context"""
         extra_context = extra_context or {}
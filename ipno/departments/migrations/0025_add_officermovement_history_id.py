@@ -0,0 +1,19 @@
+# Generated by Django 3.1.13 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("departments", "0024_add_row_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="officermovement",
+            name="history_id",
+            field=models.CharField(
+                blank=True, db_index=True, max_length=255, null=True
+            ),
+        ),
+    ]
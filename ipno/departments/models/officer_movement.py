@@ -19,3 +19,4 @@ class OfficerMovement(TimeStampsModel):
     )
     date = models.DateField()
     left_reason = models.CharField(max_length=255, null=True, blank=True)
+    history_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
@@ -1,10 +1,10 @@
-from django.core.cache import cache
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from departments.models import Department
+from utils.cache_utils import flush_entity_caches
 
 
 @receiver(post_save, sender=Department)
-def department_cache(*args, **kwargs):
-    cache.clear()
+def department_cache(sender, instance, **kwargs):
+    flush_entity_caches(department_ids=[instance.id])
@@ -6,10 +6,12 @@ from departments.factories import DepartmentFactory
 
 
 class DepartmentTestCase(TestCase):
-    @patch("departments.signals.cache.clear")
-    def test_clear_cache_when_Department_model_is_saved(self, mock_clear_cache):
+    @patch("departments.signals.flush_entity_caches")
+    def test_flush_caches_when_Department_model_is_saved(
+        self, mock_flush_entity_caches
+    ):
         department = DepartmentFactory()
         department.name = ""
         department.save()
 
-        mock_clear_cache.assert_called()
+        mock_flush_entity_caches.assert_called_with(department_ids=[department.id])
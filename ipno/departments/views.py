@@ -10,6 +10,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
+from data.constants import DEPARTMENT_DATA_VERSIONS
 from departments.constants import DEPARTMENTS_LIMIT
 from departments.models import Department, OfficerMovement
 from departments.serializers import (
@@ -34,12 +35,18 @@ from search.queries import (
     OfficersSearchQuery,
 )
 from shared.serializers import DepartmentSerializer
-from utils.cache_utils import custom_cache
+from utils.cache_utils import (
+    custom_cache,
+    get_department_cache_tags,
+    get_summary_cache_tags,
+)
+from utils.data_version import versioned_cache_control
 from utils.es_pagination import ESPagination
 
 
 class DepartmentsViewSet(viewsets.ViewSet):
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def retrieve(self, request, pk):
         queryset = Department.objects.all()
         department = get_object_or_404(queryset, agency_slug=pk)
@@ -47,7 +54,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
 
         return Response(serializer.data)
 
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_summary_cache_tags)
     def list(self, request):
         departments = (
             Department.objects.exclude(
@@ -94,7 +102,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         return paginator.get_paginated_response(data)
 
     @action(detail=True, methods=["get"], url_path="documents")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def documents(self, request, pk):
         department = get_object_or_404(Department, agency_slug=pk)
 
@@ -131,7 +140,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         return Response(documents_serializers.data)
 
     @action(detail=True, methods=["get"], url_path="officers")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def officers(self, request, pk):
         department = get_object_or_404(Department, agency_slug=pk)
 
@@ -175,7 +185,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         return Response(officers_serializers.data)
 
     @action(detail=True, methods=["get"], url_path="news_articles")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def news_articles(self, request, pk):
         department = get_object_or_404(Department, agency_slug=pk)
 
@@ -226,7 +237,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         return Response(news_articles_serializers.data)
 
     @action(detail=True, methods=["get"], url_path="datasets")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def datasets(self, request, pk):
         department = get_object_or_404(Department, agency_slug=pk)
         wrgl_serializers = WrglFileSerializer(
@@ -236,7 +248,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         return Response(wrgl_serializers.data)
 
     @action(detail=False, methods=["get"], url_path="migratory")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_summary_cache_tags)
     def migratory(self, request):
         officer_movements = (
             OfficerMovement.objects.select_related(
@@ -264,7 +277,8 @@ class DepartmentsViewSet(viewsets.ViewSet):
         )
 
     @action(detail=True, methods=["get"], url_path="migratory-by-department")
-    @custom_cache
+    @versioned_cache_control(DEPARTMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_department_cache_tags)
     def migratory_by_department(self, request, pk):
         department = get_object_or_404(Department, agency_slug=pk)
 
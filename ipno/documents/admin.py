@@ -1,13 +1,30 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from data.constants import DATA_VERSION_DOCUMENTS
 from documents.models import Document
+from utils.data_version import DataVersionAdminMixin
 
 
-class DocumentAdmin(ModelAdmin):
+class DocumentAdmin(DataVersionAdminMixin, ModelAdmin):
     list_display = ("id", "title", "created_at", "updated_at")
     search_fields = ("title",)
     raw_id_fields = ("officers", "departments")
+    data_version_entity_types = (DATA_VERSION_DOCUMENTS,)
+
+    def get_flush_caches_kwargs(self, objs):
+        return {
+            "officer_ids": [
+                officer_id
+                for obj in objs
+                for officer_id in obj.officers.values_list("id", flat=True)
+            ],
+            "department_ids": [
+                department_id
+                for obj in objs
+                for department_id in obj.departments.values_list("id", flat=True)
+            ],
+        }
 
 
 admin.site.register(Document, DocumentAdmin)
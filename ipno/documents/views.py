@@ -1,14 +1,17 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
 
+from data.constants import DOCUMENT_DATA_VERSIONS
 from documents.constants import DOCUMENTS_LIMIT
 from documents.models import Document
 from shared.serializers import DocumentSerializer
-from utils.cache_utils import custom_cache
+from utils.cache_utils import custom_cache, get_summary_cache_tags
+from utils.data_version import versioned_cache_control
 
 
 class DocumentsViewSet(viewsets.ViewSet):
-    @custom_cache
+    @versioned_cache_control(DOCUMENT_DATA_VERSIONS)
+    @custom_cache(tags=get_summary_cache_tags)
     def list(self, request):
         documents = (
             Document.objects.prefetch_departments()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from data.constants import DATA_VERSION_NEWS_ARTICLES
 from news_articles.models import (
     CrawledPost,
     CrawlerError,
@@ -12,6 +13,8 @@ from news_articles.models import (
     NewsArticleClassification,
     NewsArticleSource,
 )
+from officers.models import Officer
+from utils.data_version import DataVersionAdminMixin
 
 
 class NewsArticleOfficersFilter(admin.SimpleListFilter):
@@ -79,7 +82,7 @@ class MatchedSentenceInlineAdmin(admin.TabularInline):
         return False  # pragma: no cover
 
 
-class NewsArticleAdmin(ModelAdmin):
+class NewsArticleAdmin(DataVersionAdminMixin, ModelAdmin):
     list_filter = (
         NewsArticleOfficersFilter,
         NewsArticleContentFilter,
@@ -87,6 +90,16 @@ class NewsArticleAdmin(ModelAdmin):
     )
     list_display = ("id", "source", "author", "title")
     inlines = [MatchedSentenceInlineAdmin]
+    data_version_entity_types = (DATA_VERSION_NEWS_ARTICLES,)
+
+    def get_flush_caches_kwargs(self, objs):
+        return {
+            "officer_ids": list(
+                Officer.objects.filter(matched_sentences__article__in=objs).values_list(
+                    "id", flat=True
+                )
+            )
+        }
 
 
 class MatchedArticleOfficersFilter(admin.SimpleListFilter):
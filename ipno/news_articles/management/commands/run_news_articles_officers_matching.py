@@ -1,8 +1,10 @@
 from django.core.management import BaseCommand
 from django.utils import timezone
 
+from data.constants import DATA_VERSION_NEWS_ARTICLES
 from news_articles.services import ProcessExcludeArticleOfficer, ProcessMatchingArticle
 from utils.cache_utils import flush_news_article_related_caches
+from utils.data_version import bump_data_versions
 from utils.search_index import rebuild_search_index
 
 
@@ -17,3 +19,4 @@ class Command(BaseCommand):
 
         if has_news_article:
             flush_news_article_related_caches(start_time)
+            bump_data_versions([DATA_VERSION_NEWS_ARTICLES])
@@ -2,6 +2,7 @@ from unittest.mock import patch
 
 from django.test import TestCase
 
+from data.constants import DATA_VERSION_NEWS_ARTICLES
 from news_articles.management.commands.run_news_articles_officers_matching import (
     Command,
 )
@@ -20,12 +21,16 @@ class CommandTestCase(TestCase):
     @patch(
         "news_articles.management.commands.run_news_articles_officers_matching.rebuild_search_index"
     )
+    @patch(
+        "news_articles.management.commands.run_news_articles_officers_matching.bump_data_versions"
+    )
     @patch(
         "news_articles.management.commands.run_news_articles_officers_matching.flush_news_article_related_caches"
     )
     def test_handle(
         self,
         mock_flush_news_article_related_caches,
+        mock_bump_data_versions,
         mock_rebuild_search_index,
         mock_matching_keywords_process,
         mock_process_exclude_article_officer,
@@ -39,6 +44,7 @@ class CommandTestCase(TestCase):
         mock_process_exclude_article_officer.assert_called()
         mock_rebuild_search_index.assert_called()
         mock_flush_news_article_related_caches.assert_called()
+        mock_bump_data_versions.assert_called_with([DATA_VERSION_NEWS_ARTICLES])
 
     @patch(
         "news_articles.management.commands.run_news_articles_officers_matching.ProcessMatchingArticle.process"
@@ -49,12 +55,16 @@ class CommandTestCase(TestCase):
     @patch(
         "news_articles.management.commands.run_news_articles_officers_matching.rebuild_search_index"
     )
+    @patch(
+        "news_articles.management.commands.run_news_articles_officers_matching.bump_data_versions"
+    )
     @patch(
         "news_articles.management.commands.run_news_articles_officers_matching.flush_news_article_related_caches"
     )
     def test_handle_not_rebuild_index_and_flush_cache(
         self,
         mock_flush_news_article_related_caches,
+        mock_bump_data_versions,
         mock_rebuild_search_index,
         mock_matching_keywords_process,
         mock_process_exclude_article_officer,
@@ -68,3 +78,4 @@ class CommandTestCase(TestCase):
         mock_process_exclude_article_officer.assert_called()
         mock_rebuild_search_index.assert_not_called()
         mock_flush_news_article_related_caches.assert_not_called()
+        mock_bump_data_versions.assert_not_called()
@@ -2,8 +2,10 @@ from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 from django.db import transaction
 
+from data.constants import DATA_VERSION_OFFICERS
 from officers.models import Event, Officer
 from officers.tasks import rebuild_officer_index
+from utils.data_version import DataVersionAdminMixin
 
 
 class OfficerNewsArticleFilter(admin.SimpleListFilter):
@@ -37,7 +39,7 @@ class ExcludedMatchedSentenceInlineAdmin(admin.TabularInline):
     raw_id_fields = ("matchedsentence",)
 
 
-class OfficerAdmin(ModelAdmin):
+class OfficerAdmin(DataVersionAdminMixin, ModelAdmin):
     list_display = (
         "uid",
         "last_name",
@@ -52,6 +54,7 @@ class OfficerAdmin(ModelAdmin):
     inlines = (MatchedSentenceInlineAdmin, ExcludedMatchedSentenceInlineAdmin)
 
     raw_id_fields = ("person", "department")
+    data_version_entity_types = (DATA_VERSION_OFFICERS,)
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -63,6 +66,9 @@ class OfficerAdmin(ModelAdmin):
         if change:
             transaction.on_commit(lambda: rebuild_officer_index(obj.id))
 
+    def get_flush_caches_kwargs(self, objs):
+        return {"officer_ids": [obj.id for obj in objs]}
+
     def badges(self, obj):
         return list(
             dict.fromkeys(
@@ -71,7 +77,7 @@ class OfficerAdmin(ModelAdmin):
         )
 
 
-class EventAdmin(ModelAdmin):
+class EventAdmin(DataVersionAdminMixin, ModelAdmin):
     list_display = (
         "id",
         "officer",
@@ -91,6 +97,13 @@ class EventAdmin(ModelAdmin):
         "officer__first_name",
         "event_uid",
     )
+    data_version_entity_types = (DATA_VERSION_OFFICERS,)
+
+    def get_flush_caches_kwargs(self, objs):
+        return {
+            "officer_ids": [obj.officer_id for obj in objs],
+            "department_ids": [obj.department_id for obj in objs],
+        }
 
 
 admin.site.register(Officer, OfficerAdmin)
@@ -11,6 +11,7 @@ import pandas as pd
 from citizens.factory import CitizenFactory
 from complaints.constants import ALLEGATION_DISPOSITION_SUSTAINED
 from complaints.factories import ComplaintFactory
+from data.constants import DATA_VERSION_OFFICERS
 from departments.factories import DepartmentFactory
 from documents.factories import DocumentFactory
 from news_articles.factories import NewsArticleFactory
@@ -39,6 +40,8 @@ from officers.factories import EventFactory, OfficerFactory
 from people.factories import PersonFactory
 from test_utils.auth_api_test_case import AuthAPITestCase
 from use_of_forces.factories import UseOfForceFactory
+from utils.cache_utils import flush_entity_caches
+from utils.data_version import bump_data_versions
 
 
 class OfficersViewSetTestCase(AuthAPITestCase):
@@ -356,6 +359,30 @@ class OfficersViewSetTestCase(AuthAPITestCase):
 
         assert response.data == expected_result
 
+    def test_list_not_modified(self):
+        url = reverse("api:officers-list")
+
+        response = self.client.get(url)
+        etag = response["ETag"]
+        assert response.status_code == status.HTTP_200_OK
+        assert "max-age=60" in response["Cache-Control"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f"W/{etag}")
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+        assert "max-age=60" in response["Cache-Control"]
+
+        officer = OfficerFactory()
+        person = PersonFactory(canonical_officer=officer)
+        person.officers.add(officer)
+        flush_entity_caches(officer_ids=[officer.id])
+        bump_data_versions([DATA_VERSION_OFFICERS])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert len(response.data) == 1
+
     def test_retrieve_not_found(self):
         response = self.client.get(reverse("api:officers-detail", kwargs={"pk": 1}))
         assert response.status_code == status.HTTP_404_NOT_FOUND
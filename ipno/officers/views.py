@@ -9,6 +9,7 @@ from rest_framework.response import Response
 
 from complaints.constants import ALLEGATION_DISPOSITION_SUSTAINED
 from complaints.models import Complaint
+from data.constants import OFFICER_DATA_VERSIONS
 from officers.constants import (
     OFFICER_DEPT,
     OFFICER_HIRE,
@@ -21,14 +22,20 @@ from officers.models import Officer
 from officers.queries import OfficerDatafileQuery, OfficerTimelineQuery
 from officers.serializers import OfficerDetailsSerializer
 from shared.serializers import OfficerSerializer
-from utils.cache_utils import custom_cache
+from utils.cache_utils import (
+    custom_cache,
+    get_officer_cache_tags,
+    get_summary_cache_tags,
+)
+from utils.data_version import versioned_cache_control
 from utils.decorators import test_util_api
 
 
 class OfficersViewSet(viewsets.ViewSet):
     permission_classes = [AllowAny]
 
-    @custom_cache
+    @versioned_cache_control(OFFICER_DATA_VERSIONS)
+    @custom_cache(tags=get_summary_cache_tags)
     def list(self, request):
         officers = (
             Officer.objects.prefetch_events()
@@ -40,7 +47,8 @@ class OfficersViewSet(viewsets.ViewSet):
         serializer = OfficerSerializer(officers, many=True)
         return Response(serializer.data)
 
-    @custom_cache
+    @versioned_cache_control(OFFICER_DATA_VERSIONS)
+    @custom_cache(tags=get_officer_cache_tags)
     def retrieve(self, request, pk):
         get_object_or_404(Officer, id=pk)
 
@@ -63,7 +71,8 @@ class OfficersViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"], url_path="timeline")
-    @custom_cache
+    @versioned_cache_control(OFFICER_DATA_VERSIONS)
+    @custom_cache(tags=get_officer_cache_tags)
     def timeline(self, request, pk):
         officer = get_object_or_404(
             Officer.objects.prefetch_related("person__officers"), id=pk
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from data.constants import DATA_VERSION_OFFICERS
 from officers.models import Officer
 from people.models import Person
+from utils.data_version import DataVersionAdminMixin
 
 
 class OfficerInlineAdmin(admin.TabularInline):
@@ -16,11 +18,15 @@ class OfficerInlineAdmin(admin.TabularInline):
         return False  # pragma: no cover
 
 
-class PersonAdmin(ModelAdmin):
+class PersonAdmin(DataVersionAdminMixin, ModelAdmin):
     inlines = [OfficerInlineAdmin]
     list_display = ("person_id", "canonical_officer", "all_complaints_count")
     search_fields = ("person_id",)
     raw_id_fields = ("canonical_officer",)
+    data_version_entity_types = (DATA_VERSION_OFFICERS,)
+
+    def get_flush_caches_kwargs(self, objs):
+        return {"person_ids": [obj.id for obj in objs]}
 
 
 admin.site.register(Person, PersonAdmin)
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from utils.data_version import RowFingerprintAdminMixin
+
 from .models import PostOfficerHistory
 
 
-class PostOfficerHistoryAdmin(ModelAdmin):
+class PostOfficerHistoryAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = (
         "uid",
         "history_id",
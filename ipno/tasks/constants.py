@@ -20,3 +20,27 @@ APP_TASKS = [
     },
     {"task_name": "Pre-warm APIs", "command": "pre_warm_api", "task_type": DAILY_TASK},
 ]
+
+API_PRE_WARMER_FRONT_PAGE_URL_NAMES = [
+    "api:analytics-summary",
+    "api:front-page-cards-list",
+    "api:front-page-orders-list",
+    "api:departments-list",
+    "api:departments-migratory",
+    "api:officers-list",
+    "api:documents-list",
+    "api:news-articles-list",
+]
+API_PRE_WARMER_DEPARTMENT_URL_NAMES = [
+    "api:departments-detail",
+    "api:departments-officers",
+    "api:departments-documents",
+    "api:departments-news-articles",
+    "api:departments-datasets",
+    "api:departments-migratory-by-department",
+]
+API_PRE_WARMER_OFFICER_URL_NAMES = [
+    "api:officers-detail",
+    "api:officers-timeline",
+]
+API_PRE_WARMER_SEARCH_QUERIES_LIMIT = 50
@@ -1,72 +1,208 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
 from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.test import RequestFactory
+from django.urls import resolve, reverse
 
-import requests
-from tqdm import tqdm
+import structlog
 
 from departments.models import Department
+from historical_data.constants import RECENT_DEPARTMENT_TYPE, RECENT_OFFICER_TYPE
+from historical_data.models import AnonymousItem, AnonymousQuery
+from officers.models import Officer
+from tasks.constants import (
+    API_PRE_WARMER_DEPARTMENT_URL_NAMES,
+    API_PRE_WARMER_FRONT_PAGE_URL_NAMES,
+    API_PRE_WARMER_OFFICER_URL_NAMES,
+    API_PRE_WARMER_SEARCH_QUERIES_LIMIT,
+)
+
+logger = structlog.get_logger("IPNO")
 
 
 class APIPreWarmer:
-    def __init__(self):
-        self.url = settings.SERVER_URL + "/api/"
-
-    def pre_warm_front_page_api(self):
-        summary_api = self.url + "analytics/summary/"
-        front_page_card_api = self.url + "front-page-cards/"
-        front_page_order_api = self.url + "front-page-orders/"
-        department_list_api = self.url + "departments/"
-        migratory_api = self.url + "departments/migratory/"
-        officer_list_api = self.url + "officers/"
-        document_list_api = self.url + "documents/"
-        news_article_list_api = self.url + "news-articles/"
-
-        front_page_apis = [
-            summary_api,
-            front_page_card_api,
-            front_page_order_api,
-            department_list_api,
-            migratory_api,
-            officer_list_api,
-            document_list_api,
-            news_article_list_api,
+    """Warm the cached API responses by calling the API views in process.
+
+    The views are called with requests built for `SERVER_URL` by a pool of
+    `max_workers` threads, instead of through the web workers. The pages
+    visited the most recently are warmed first.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.API_PRE_WARMER_MAX_WORKERS
+
+        server_url = settings.SERVER_URL
+        if "://" not in server_url:
+            server_url = f"http://{server_url}"
+        server_url = urlparse(server_url)
+
+        self.request_factory = RequestFactory(HTTP_HOST=server_url.netloc)
+        self.secure = server_url.scheme == "https"
+        self.stats = defaultdict(
+            lambda: {"count": 0, "errors": 0, "seconds": 0, "max_seconds": 0, "size": 0}
+        )
+        self.stats_lock = threading.Lock()
+
+    def _get_visited_ids(self, item_type):
+        """The ids visited by the anonymous users, the latest visited first."""
+        return list(
+            AnonymousItem.objects.filter(item_type=item_type)
+            .order_by("-last_visited")
+            .values_list("item_id", flat=True)
+        )
+
+    def _prioritize(self, visited_ids, ids):
+        visited_ids = list(dict.fromkeys(visited_ids))
+        visited_ids_set = set(visited_ids)
+
+        return visited_ids + [
+            item_id for item_id in ids if item_id not in visited_ids_set
         ]
 
-        error_messages = []
-        for api in tqdm(front_page_apis, desc="Pre-warming front page APIs"):
-            try:
-                requests.get(api)
-            except Exception as e:
-                error_messages.append(str(e))
+    def get_front_page_urls(self):
+        return [
+            (url_name, reverse(url_name), None)
+            for url_name in API_PRE_WARMER_FRONT_PAGE_URL_NAMES
+        ]
 
-        return error_messages
+    def get_department_urls(self):
+        agency_slugs = list(
+            Department.objects.filter(agency_slug__isnull=False)
+            .order_by("id")
+            .values_list("agency_slug", flat=True)
+        )
+        agency_slugs_set = set(agency_slugs)
+        visited_slugs = [
+            agency_slug
+            for agency_slug in self._get_visited_ids(RECENT_DEPARTMENT_TYPE)
+            if agency_slug in agency_slugs_set
+        ]
+
+        return [
+            (url_name, reverse(url_name, kwargs={"pk": agency_slug}), None)
+            for agency_slug in self._prioritize(visited_slugs, agency_slugs)
+            for url_name in API_PRE_WARMER_DEPARTMENT_URL_NAMES
+        ]
+
+    def get_officer_urls(self):
+        """The pages of the visited officers, then of the most complained about."""
+        limit = settings.API_PRE_WARMER_OFFICERS_LIMIT
+        visited_ids = [
+            int(item_id)
+            for item_id in self._get_visited_ids(RECENT_OFFICER_TYPE)
+            if item_id.isdecimal()
+        ][:limit]
+        existing_ids = set(
+            Officer.objects.filter(id__in=visited_ids).values_list("id", flat=True)
+        )
+        officer_ids = Officer.objects.order_by(
+            F("person__all_complaints_count").desc(nulls_last=True), "id"
+        ).values_list("id", flat=True)[:limit]
+        officer_ids = self._prioritize(
+            [officer_id for officer_id in visited_ids if officer_id in existing_ids],
+            officer_ids,
+        )[:limit]
+
+        return [
+            (url_name, reverse(url_name, kwargs={"pk": officer_id}), None)
+            for officer_id in officer_ids
+            for url_name in API_PRE_WARMER_OFFICER_URL_NAMES
+        ]
 
-    def pre_warm_department_api(self):
-        departments = Department.objects.filter(agency_slug__isnull=False)
+    def get_search_urls(self):
+        """The latest searches, which warm the search engine caches."""
+        queries = AnonymousQuery.objects.order_by("-last_visited").values_list(
+            "query", flat=True
+        )[:API_PRE_WARMER_SEARCH_QUERIES_LIMIT]
 
-        error_messages = []
-        for department in tqdm(departments, desc="Pre-warming department page APIs"):
-            department_detail_api = (
-                self.url + "departments/" + department.agency_slug + "/"
+        return [
+            ("api:search-list", reverse("api:search-list"), {"q": query})
+            for query in queries
+        ]
+
+    def _record(self, url_name, seconds, size, error):
+        with self.stats_lock:
+            stats = self.stats[url_name]
+            stats["count"] += 1
+            stats["errors"] += int(error)
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["size"] += size
+
+    def _pre_warm_url(self, url_name, path, params):
+        request = self.request_factory.get(path, params, secure=self.secure)
+        started_at = time.perf_counter()
+        size = 0
+        error_message = None
+
+        try:
+            match = resolve(path)
+            response = match.func(request, *match.args, **match.kwargs)
+
+            if hasattr(response, "render"):
+                response.render()
+
+            size = len(response.content)
+            if response.status_code >= 400:
+                error_message = (
+                    f"{request.get_full_path()}: status {response.status_code}"
+                )
+        except Exception as e:
+            error_message = f"{request.get_full_path()}: {e}"
+
+        self._record(
+            url_name, time.perf_counter() - started_at, size, bool(error_message)
+        )
+
+        return error_message
+
+    def _pre_warm_url_in_thread(self, url):
+        try:
+            return self._pre_warm_url(*url)
+        finally:
+            # Each worker thread opens its own database connections
+            connections.close_all()
+
+    def log_stats(self):
+        for url_name, stats in self.stats.items():
+            logger.info(
+                "Pre-warmed API",
+                url_name=url_name,
+                count=stats["count"],
+                errors=stats["errors"],
+                average_seconds=round(stats["seconds"] / stats["count"], 3),
+                max_seconds=round(stats["max_seconds"], 3),
+                average_size=stats["size"] // stats["count"],
+                total_size=stats["size"],
             )
-            officer_api = department_detail_api + "officers/"
-            document_api = department_detail_api + "documents/"
-            news_article_api = department_detail_api + "news_articles/"
-            dataset_api = department_detail_api + "datasets/"
-            migratory_api = department_detail_api + "migratory-by-department/"
-
-            department_apis = [
-                department_detail_api,
-                officer_api,
-                document_api,
-                news_article_api,
-                dataset_api,
-                migratory_api,
-            ]
-
-            for api in department_apis:
-                try:
-                    requests.get(api)
-                except Exception as e:
-                    error_messages.append(str(e))
+
+    def pre_warm(self):
+        """Warm the front page, department, officer and search APIs.
+
+        Returns the error messages of the failed requests.
+        """
+        urls = [
+            *self.get_front_page_urls(),
+            *self.get_department_urls(),
+            *self.get_officer_urls(),
+            *self.get_search_urls(),
+        ]
+
+        if self.max_workers > 1:
+            # The workers take the urls in order, the most visited pages first
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._pre_warm_url_in_thread, urls))
+        else:
+            results = [self._pre_warm_url(*url) for url in urls]
+
+        error_messages = [result for result in results if result]
+
+        self.log_stats()
 
         return error_messages
@@ -1,54 +1,160 @@
+from django.core.cache import cache
 from django.test import TestCase, override_settings
+from django.urls import reverse
 
 from mock import patch
 
 from departments.factories import DepartmentFactory
+from historical_data.constants import RECENT_DEPARTMENT_TYPE, RECENT_OFFICER_TYPE
+from historical_data.factories import AnonymousItemFactory, AnonymousQueryFactory
+from officers.factories import OfficerFactory
+from people.factories import PersonFactory
 from tasks.services import APIPreWarmer
 
 
+@override_settings(SERVER_URL="http://web:8000")
 class APIPreWarmerTestCase(TestCase):
-    @patch("tasks.services.api_pre_warmer.requests.get")
-    @override_settings(SERVER_URL="http://web:8000")
-    def test_pre_warm_front_page_api_successfully(self, mock_request_get):
-        mock_request_get.return_value.status_code = 200
-        mock_request_get.return_value.json.return_value = "mock response"
-
-        api_pre_warmer = APIPreWarmer()
-        pre_warming_errors = api_pre_warmer.pre_warm_front_page_api()
-
-        assert len(pre_warming_errors) == 0
-
-    @patch("tasks.services.api_pre_warmer.requests.get")
-    @override_settings(SERVER_URL="http://web:8000")
-    def test_pre_warm_front_page_api_fail(self, mock_request_get):
-        mock_request_get.side_effect = Exception()
-
+    def test_get_department_urls(self):
+        department_1 = DepartmentFactory()
+        department_2 = DepartmentFactory()
+        department_3 = DepartmentFactory()
+        AnonymousItemFactory(
+            item_type=RECENT_DEPARTMENT_TYPE, item_id=department_3.agency_slug
+        )
+        AnonymousItemFactory(
+            item_type=RECENT_DEPARTMENT_TYPE, item_id=department_2.agency_slug
+        )
+        AnonymousItemFactory(item_type=RECENT_DEPARTMENT_TYPE, item_id="deleted")
+
+        urls = APIPreWarmer().get_department_urls()
+
+        assert len(urls) == 18
+        assert [
+            path for url_name, path, _ in urls if url_name == "api:departments-detail"
+        ] == [
+            reverse("api:departments-detail", kwargs={"pk": department.agency_slug})
+            for department in [department_2, department_3, department_1]
+        ]
+
+    @override_settings(API_PRE_WARMER_OFFICERS_LIMIT=2)
+    def test_get_officer_urls(self):
+        officer_1 = OfficerFactory(person=PersonFactory(all_complaints_count=5))
+        OfficerFactory(person=PersonFactory(all_complaints_count=1))
+        officer_3 = OfficerFactory(person=PersonFactory(all_complaints_count=0))
+        AnonymousItemFactory(item_type=RECENT_OFFICER_TYPE, item_id=str(officer_3.id))
+
+        urls = APIPreWarmer().get_officer_urls()
+
+        assert urls == [
+            (
+                "api:officers-detail",
+                reverse("api:officers-detail", kwargs={"pk": officer_3.id}),
+                None,
+            ),
+            (
+                "api:officers-timeline",
+                reverse("api:officers-timeline", kwargs={"pk": officer_3.id}),
+                None,
+            ),
+            (
+                "api:officers-detail",
+                reverse("api:officers-detail", kwargs={"pk": officer_1.id}),
+                None,
+            ),
+            (
+                "api:officers-timeline",
+                reverse("api:officers-timeline", kwargs={"pk": officer_1.id}),
+                None,
+            ),
+        ]
+
+    def test_get_search_urls(self):
+        AnonymousQueryFactory(query="first")
+        AnonymousQueryFactory(query="latest")
+
+        urls = APIPreWarmer().get_search_urls()
+
+        assert urls == [
+            ("api:search-list", reverse("api:search-list"), {"q": "latest"}),
+            ("api:search-list", reverse("api:search-list"), {"q": "first"}),
+        ]
+
+    def test_pre_warm_url(self):
+        path = reverse("api:documents-list")
         api_pre_warmer = APIPreWarmer()
-        pre_warming_errors = api_pre_warmer.pre_warm_front_page_api()
-
-        assert len(pre_warming_errors) > 0
-
-    @patch("tasks.services.api_pre_warmer.requests.get")
-    @override_settings(SERVER_URL="http://web:8000")
-    def test_pre_warm_department_page_api_successfully(self, mock_request_get):
-        DepartmentFactory()
-
-        mock_request_get.return_value.status_code = 200
-        mock_request_get.return_value.json.return_value = "mock response"
-
-        api_pre_warmer = APIPreWarmer()
-        pre_warming_errors = api_pre_warmer.pre_warm_department_api()
-
-        assert len(pre_warming_errors) == 0
 
-    @patch("tasks.services.api_pre_warmer.requests.get")
-    @override_settings(SERVER_URL="http://web:8000")
-    def test_pre_warm_department_api_fail(self, mock_request_get):
-        DepartmentFactory()
+        error_message = api_pre_warmer._pre_warm_url("api:documents-list", path, None)
 
-        mock_request_get.side_effect = Exception()
+        assert error_message is None
+        assert cache.get(path)
+        assert api_pre_warmer.stats["api:documents-list"]["count"] == 1
+        assert api_pre_warmer.stats["api:documents-list"]["errors"] == 0
+        assert api_pre_warmer.stats["api:documents-list"]["size"] == 2
 
+    def test_pre_warm_url_fail(self):
+        path = reverse("api:officers-detail", kwargs={"pk": 1})
         api_pre_warmer = APIPreWarmer()
-        pre_warming_errors = api_pre_warmer.pre_warm_department_api()
 
-        assert len(pre_warming_errors) > 0
+        error_message = api_pre_warmer._pre_warm_url("api:officers-detail", path, None)
+
+        assert error_message == f"{path}: status 404"
+        assert api_pre_warmer.stats["api:officers-detail"]["errors"] == 1
+
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_search_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_officer_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_department_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_front_page_urls")
+    def test_pre_warm(
+        self,
+        get_front_page_urls_mock,
+        get_department_urls_mock,
+        get_officer_urls_mock,
+        get_search_urls_mock,
+    ):
+        get_front_page_urls_mock.return_value = [
+            ("api:documents-list", reverse("api:documents-list"), None)
+        ]
+        get_department_urls_mock.return_value = []
+        get_officer_urls_mock.return_value = [
+            (
+                "api:officers-detail",
+                reverse("api:officers-detail", kwargs={"pk": 1}),
+                None,
+            )
+        ]
+        get_search_urls_mock.return_value = []
+
+        error_messages = APIPreWarmer().pre_warm()
+
+        assert error_messages == [
+            f"{reverse('api:officers-detail', kwargs={'pk': 1})}: status 404"
+        ]
+
+    @patch("tasks.services.api_pre_warmer.connections.close_all")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer._pre_warm_url")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_search_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_officer_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_department_urls")
+    @patch("tasks.services.api_pre_warmer.APIPreWarmer.get_front_page_urls")
+    def test_pre_warm_concurrently(
+        self,
+        get_front_page_urls_mock,
+        get_department_urls_mock,
+        get_officer_urls_mock,
+        get_search_urls_mock,
+        pre_warm_url_mock,
+        close_all_mock,
+    ):
+        get_front_page_urls_mock.return_value = [("front-page", "/front-page/", None)]
+        get_department_urls_mock.return_value = [("department", "/department/", None)]
+        get_officer_urls_mock.return_value = [("officer", "/officer/", None)]
+        get_search_urls_mock.return_value = [("search", "/search/", {"q": "q"})]
+        pre_warm_url_mock.side_effect = lambda url_name, path, params: (
+            "error" if url_name == "officer" else None
+        )
+
+        error_messages = APIPreWarmer(max_workers=2).pre_warm()
+
+        assert error_messages == ["error"]
+        assert pre_warm_url_mock.call_count == 4
+        assert close_all_mock.call_count == 4
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 
+from utils.data_version import RowFingerprintAdminMixin
+
 from .models import UseOfForce
 
 
-class UseOfForceAdmin(ModelAdmin):
+class UseOfForceAdmin(RowFingerprintAdminMixin, ModelAdmin):
     list_display = ("id", "created_at", "updated_at")
     search_fields = ("uof_uid",)
     raw_id_fields = ("department",)
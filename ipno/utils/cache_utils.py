@@ -1,28 +1,456 @@
-from functools import wraps
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, namedtuple
+from functools import partial, wraps
+from urllib.parse import urlencode
 
 from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified
 from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
 
-from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 
 from departments.models import Department
 from news_articles.models import MatchedSentence
 from officers.models import Officer
+from utils.constants import (
+    RESPONSE_CACHE_COMPRESSION_LEVEL,
+    RESPONSE_CACHE_JITTER,
+    RESPONSE_CACHE_LOCK_TIMEOUT,
+    RESPONSE_CACHE_LOCK_WAIT_INTERVAL,
+    RESPONSE_CACHE_LOCK_WAIT_TIMEOUT,
+    RESPONSE_CACHE_SOFT_TIMEOUT,
+    RESPONSE_CACHE_STATS_FLUSH_INTERVAL,
+    RESPONSE_CACHE_TIMEOUT,
+)
 
+CACHE_PATH_INDEX_KEY_PREFIX = "cache_path_index:"
+CACHE_LOCK_KEY_PREFIX = "cache_lock:"
+CACHE_ETAG_KEY_PREFIX = "cache_etag:"
+CACHE_TAG_KEY_PREFIX = "cache_tag:"
+CACHE_STATS_KEY_PREFIX = "cache_stats:"
+CACHE_ETAG_SIZE = 32
+# The soft expiry timestamp and the ETag of a cached response, and the size of
+# its tag versions, before them and its content
+CACHE_ENTRY_HEADER = struct.Struct(f"!d{CACHE_ETAG_SIZE}sI")
+CACHE_DELETE_BATCH_SIZE = 1000
+# The path indexes and the tag versions outlive the entries cached with them
+CACHE_MAX_TIMEOUT = RESPONSE_CACHE_TIMEOUT * (1 + RESPONSE_CACHE_JITTER)
+
+SUMMARY_CACHE_TAG = "summary"
+
+CACHE_STATS_HIT = "hit"
+CACHE_STATS_STALE = "stale"
+CACHE_STATS_MISS = "miss"
+CACHE_STATS_NOT_MODIFIED = "not_modified"
+CACHE_STATS_OUTCOMES = [
+    CACHE_STATS_HIT,
+    CACHE_STATS_STALE,
+    CACHE_STATS_MISS,
+    CACHE_STATS_NOT_MODIFIED,
+]
+
+# The views decorated with custom_cache, by their qualified names
+CACHED_ENDPOINTS = []
+
+CacheEntry = namedtuple(
+    "CacheEntry", ["soft_expires_at", "etag", "tag_versions", "content"]
+)
+
+
+def get_path_index_key(path):
+    return f"{CACHE_PATH_INDEX_KEY_PREFIX}{path}"
+
+
+def add_to_path_index(request_path):
+    """Remember the cached query strings of a path, to delete them with it.
+
+    The index is set after its entries with their longest timeout, so it
+    expires after all of them. The tiered cache adds to the index atomically,
+    the other backends only keep one of the paths added concurrently.
+    """
+    path = request_path.split("?")[0]
+
+    if path != request_path:
+        index_key = get_path_index_key(path)
+
+        if hasattr(cache, "add_to_set"):
+            cache.add_to_set(index_key, [request_path], CACHE_MAX_TIMEOUT)
+        else:
+            request_paths = cache.get(index_key, set())
+            request_paths.add(request_path)
+            cache.set(index_key, request_paths, CACHE_MAX_TIMEOUT)
+
+
+def get_path_indexes(index_keys):
+    if hasattr(cache, "get_sets"):
+        return cache.get_sets(index_keys)
+
+    return cache.get_many(index_keys)
+
+
+class CachedJSONResponse(HttpResponse):
+    """A JSON response of the content rendered when it was cached.
+
+    The content is returned as is, without going through the DRF renderers,
+    and is only parsed back into `data` when accessed.
+    """
+
+    def __init__(self, content, etag, data=None):
+        super().__init__(content, content_type=JSONRenderer.media_type)
+        self["ETag"] = quote_etag(etag)
+        self["Content-Length"] = len(content)
+        self._data = data
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.content)
+
+        return self._data
+
+
+def get_jittered_timeout(timeout):
+    """Spread the expiry of the entries cached together, after an import."""
+    return timeout * random.uniform(
+        1 - RESPONSE_CACHE_JITTER, 1 + RESPONSE_CACHE_JITTER
+    )
+
+
+def get_etag(content):
+    return hashlib.blake2b(content, digest_size=CACHE_ETAG_SIZE // 2).hexdigest()
+
+
+def get_cache_key(request, query_params=()):
+    """The path of the request with its whitelisted query parameters, sorted.
+
+    Other query parameters, like the tracking ones, do not change the response
+    and are left out.
+    """
+    params = sorted(
+        (name, value) for name in query_params for value in request.GET.getlist(name)
+    )
+
+    return f"{request.path}?{urlencode(params)}" if params else request.path
+
+
+def get_officer_cache_tag(officer_id):
+    return f"officer:{officer_id}"
+
+
+def get_person_cache_tag(person_id):
+    return f"person:{person_id}"
+
+
+def get_department_cache_tag(department_id):
+    return f"department:{department_id}"
+
+
+def get_summary_cache_tags(*args, **kwargs):
+    return [SUMMARY_CACHE_TAG]
+
+
+def get_officer_cache_tags(view, request, pk):
+    person_ids = Officer.objects.filter(id=pk).values_list("person_id", flat=True)
+
+    return [get_officer_cache_tag(pk)] + [
+        get_person_cache_tag(person_id) for person_id in person_ids if person_id
+    ]
+
+
+def get_department_cache_tags(view, request, pk):
+    department_ids = Department.objects.filter(agency_slug=pk).values_list(
+        "id", flat=True
+    )
+
+    return [get_department_cache_tag(department_id) for department_id in department_ids]
+
+
+def get_tag_key(tag):
+    return f"{CACHE_TAG_KEY_PREFIX}{tag}"
+
+
+def get_tag_versions(tags):
+    versions = cache.get_many([get_tag_key(tag) for tag in tags])
+
+    return {tag: versions.get(get_tag_key(tag)) for tag in tags}
+
+
+def is_current(tag_versions):
+    """Whether none of the tags were invalidated since the versions were read."""
+    return not tag_versions or get_tag_versions(tag_versions) == tag_versions
+
+
+def invalidate_cache_tags(tags):
+    """Invalidate the cached responses tagged with any of the tags.
+
+    Only the versions of the tags are replaced, the responses are not looked up.
+    """
+    version = uuid.uuid4().hex
+    tags = list(dict.fromkeys(tags))
+
+    for i in range(0, len(tags), CACHE_DELETE_BATCH_SIZE):
+        cache.set_many(
+            {
+                get_tag_key(tag): version
+                for tag in tags[i : i + CACHE_DELETE_BATCH_SIZE]
+            },
+            CACHE_MAX_TIMEOUT,
+        )
+
+
+def pack_cache_entry(content, etag, soft_expires_at, tag_versions=None):
+    tag_versions = json.dumps(tag_versions or {}).encode()
+
+    return (
+        CACHE_ENTRY_HEADER.pack(soft_expires_at, etag.encode(), len(tag_versions))
+        + tag_versions
+        + zlib.compress(content, RESPONSE_CACHE_COMPRESSION_LEVEL)
+    )
+
+
+def unpack_cache_entry(entry):
+    soft_expires_at, etag, tag_versions_size = CACHE_ENTRY_HEADER.unpack_from(entry)
+    content_start = CACHE_ENTRY_HEADER.size + tag_versions_size
+
+    return CacheEntry(
+        soft_expires_at,
+        etag.decode(),
+        json.loads(entry[CACHE_ENTRY_HEADER.size : content_start]),
+        zlib.decompress(entry[content_start:]),
+    )
+
+
+def get_cache_entry(cache_key):
+    """The cached response, unless its tags were invalidated since."""
+    entry = cache.get(cache_key)
+
+    if not isinstance(entry, bytes):
+        return None
+
+    try:
+        entry = unpack_cache_entry(entry)
+    except (struct.error, ValueError, zlib.error):
+        # Cached in a previous format
+        return None
+
+    return entry if is_current(entry.tag_versions) else None
+
+
+def get_lock_key(cache_key):
+    return f"{CACHE_LOCK_KEY_PREFIX}{cache_key}"
+
+
+def get_etag_key(cache_key):
+    return f"{CACHE_ETAG_KEY_PREFIX}{cache_key}"
+
+
+def get_not_modified_etag(request, cache_key):
+    """The ETag of the fresh cached response, if the client already has it.
+
+    Only the ETag is read from the cache, kept apart from the response.
+    """
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+
+    if not if_none_match:
+        return None
+
+    cached_etag = cache.get(get_etag_key(cache_key))
+
+    if (
+        not cached_etag
+        or cached_etag[1] <= time.time()
+        or not is_current(cached_etag[2])
+    ):
+        return None
+
+    # The gzip middleware weakens the ETags of the responses it compresses
+    etags = [
+        etag[2:] if etag.startswith("W/") else etag
+        for etag in parse_etags(if_none_match)
+    ]
+    etag = quote_etag(cached_etag[0])
+
+    return etag if etag in etags else None
+
+
+def wait_for_cache_entry(cache_key):
+    deadline = time.monotonic() + RESPONSE_CACHE_LOCK_WAIT_TIMEOUT
+
+    while time.monotonic() < deadline:
+        time.sleep(RESPONSE_CACHE_LOCK_WAIT_INTERVAL)
+        entry = get_cache_entry(cache_key)
+
+        if entry:
+            return entry
+
+    return None
+
+
+def get_stats_key(endpoint, outcome):
+    return f"{CACHE_STATS_KEY_PREFIX}{endpoint}:{outcome}"
+
+
+def incr_cache_stat(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+class CacheStats:
+    """Counts of the cache outcomes of each endpoint.
+
+    The counts are kept in process, and added to the counts shared by all the
+    processes every `RESPONSE_CACHE_STATS_FLUSH_INTERVAL` seconds.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def record(self, endpoint, outcome):
+        with self.lock:
+            self.counts[(endpoint, outcome)] += 1
+            flush = (
+                time.monotonic() - self.flushed_at
+                >= RESPONSE_CACHE_STATS_FLUSH_INTERVAL
+            )
+
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+
+        for (endpoint, outcome), count in counts.items():
+            incr_cache_stat(get_stats_key(endpoint, outcome), count)
+
+
+cache_stats = CacheStats()
+
+
+def get_cache_stats():
+    """The shared counts of the cache outcomes and the hit rate, by endpoint."""
+    counts = cache.get_many(
+        [
+            get_stats_key(endpoint, outcome)
+            for endpoint in CACHED_ENDPOINTS
+            for outcome in CACHE_STATS_OUTCOMES
+        ]
+    )
+    stats = {}
+
+    for endpoint in CACHED_ENDPOINTS:
+        endpoint_stats = {
+            outcome: counts.get(get_stats_key(endpoint, outcome), 0)
+            for outcome in CACHE_STATS_OUTCOMES
+        }
+        requests_count = sum(endpoint_stats.values())
+        endpoint_stats["hit_rate"] = (
+            (requests_count - endpoint_stats[CACHE_STATS_MISS]) / requests_count
+            if requests_count
+            else None
+        )
+        stats[endpoint] = endpoint_stats
+
+    return stats
+
+
+def custom_cache(func=None, query_params=(), tags=None):
+    """Cache the view responses as compressed JSON bytes.
+
+    The responses are cached by path and `query_params` only, and tagged with
+    the tags returned by `tags`, called with the view arguments, so that they
+    can be invalidated by tag.
+
+    A response is computed by one request at a time: while it is missing, the
+    other requests wait for it, and once its soft timeout passed, the other
+    requests are served the stale response until it is recomputed. Requests
+    with the ETag of the fresh response are answered with a 304.
+    """
+    if func is None:
+        return partial(custom_cache, query_params=query_params, tags=tags)
+
+    endpoint = func.__qualname__
+    if endpoint not in CACHED_ENDPOINTS:
+        CACHED_ENDPOINTS.append(endpoint)
 
-def custom_cache(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         request = args[1]
-        request_path = request.get_full_path()
-        response_data = cache.get(request_path)
+        cache_key = get_cache_key(request, query_params)
+
+        not_modified_etag = get_not_modified_etag(request, cache_key)
+
+        if not_modified_etag:
+            cache_stats.record(endpoint, CACHE_STATS_NOT_MODIFIED)
+            response = HttpResponseNotModified()
+            response["ETag"] = not_modified_etag
+            return response
+
+        lock_key = get_lock_key(cache_key)
+        entry = get_cache_entry(cache_key)
+
+        if entry:
+            if entry.soft_expires_at > time.time():
+                cache_stats.record(endpoint, CACHE_STATS_HIT)
+                return CachedJSONResponse(entry.content, entry.etag)
 
-        if not response_data:
-            response = func(*args, **kwargs)
-            response_data = response.data
-            cache.set(request_path, response_data)
+            if not cache.add(lock_key, True, RESPONSE_CACHE_LOCK_TIMEOUT):
+                cache_stats.record(endpoint, CACHE_STATS_STALE)
+                return CachedJSONResponse(entry.content, entry.etag)
+        elif not cache.add(lock_key, True, RESPONSE_CACHE_LOCK_TIMEOUT):
+            entry = wait_for_cache_entry(cache_key)
 
-        return Response(response_data)
+            if entry:
+                cache_stats.record(endpoint, CACHE_STATS_HIT)
+                return CachedJSONResponse(entry.content, entry.etag)
+
+            # The request holding the lock is too slow, or failed
+            lock_key = None
+
+        cache_stats.record(endpoint, CACHE_STATS_MISS)
+
+        try:
+            # Read before computing the response, so that it is outdated by
+            # the invalidations made meanwhile.
+            tag_versions = get_tag_versions(tags(*args, **kwargs) if tags else [])
+            response_data = func(*args, **kwargs).data
+            content = JSONRenderer().render(response_data)
+            etag = get_etag(content)
+            soft_expires_at = time.time() + get_jittered_timeout(
+                RESPONSE_CACHE_SOFT_TIMEOUT
+            )
+            timeout = get_jittered_timeout(RESPONSE_CACHE_TIMEOUT)
+
+            cache.set_many(
+                {
+                    cache_key: pack_cache_entry(
+                        content, etag, soft_expires_at, tag_versions
+                    ),
+                    get_etag_key(cache_key): (etag, soft_expires_at, tag_versions),
+                },
+                timeout,
+            )
+            add_to_path_index(cache_key)
+        finally:
+            if lock_key:
+                cache.delete(lock_key)
+
+        return CachedJSONResponse(content, etag, data=response_data)
 
     return wrapper
 
@@ -35,19 +463,74 @@ def flush_news_article_related_caches(start_time=None):
     officers = Officer.objects.filter(matched_sentences__in=matched_sentences)
     departments = Department.objects.filter(officers__in=officers).distinct()
 
-    delete_cache("api:analytics-summary")
+    invalidate_cache_tags(
+        [SUMMARY_CACHE_TAG]
+        + [
+            get_officer_cache_tag(officer_id)
+            for officer_id in officers.values_list("id", flat=True)
+        ]
+        + [
+            get_department_cache_tag(department_id)
+            for department_id in departments.values_list("id", flat=True)
+        ]
+    )
 
-    for officer in officers:
-        delete_cache("api:officers-timeline", url_kwargs={"pk": officer.id})
 
-    for department in departments:
-        delete_cache(
-            "api:departments-detail", url_kwargs={"pk": department.agency_slug}
-        )
-        delete_cache(
-            "api:departments-news-articles", url_kwargs={"pk": department.agency_slug}
-        )
+def delete_caches(patterns_kwargs):
+    """Delete the cached responses of the given url names and kwargs.
+
+    The responses cached for the query strings of each url, and the ETags of
+    the responses, are deleted too.
+    """
+    paths = [
+        reverse(pattern, kwargs=url_kwargs) for pattern, url_kwargs in patterns_kwargs
+    ]
+    index_keys = [get_path_index_key(path) for path in paths]
+    keys = set(paths)
+
+    for request_paths in get_path_indexes(index_keys).values():
+        keys.update(request_paths)
+
+    etag_keys = [get_etag_key(key) for key in keys]
+    cache.delete_many(list(keys) + etag_keys + index_keys)
 
 
 def delete_cache(pattern, url_kwargs=None):
-    cache.delete(reverse(pattern, kwargs=url_kwargs))
+    delete_caches([(pattern, url_kwargs)])
+
+
+def flush_entity_caches(officer_ids=(), department_ids=(), person_ids=()):
+    """Invalidate the cached responses depending on the given entities.
+
+    An officer's pages show the data of all the officers of their person, and
+    the pages of their department list them. A department's data period shows
+    on the timelines of the officers with events in it. The lists and the
+    summaries are invalidated along with any entity.
+    """
+    persons_officers = Officer.objects.filter(
+        Q(id__in=officer_ids) | Q(person_id__in=person_ids)
+    ).values_list("person_id", flat=True)
+    officers = Officer.objects.filter(
+        Q(id__in=officer_ids)
+        | Q(person_id__in=persons_officers)
+        | Q(department_id__in=department_ids)
+        | Q(events__department_id__in=department_ids)
+    ).values_list("id", flat=True)
+    officers_ids = set(officers)
+    departments_ids = set(
+        Department.objects.filter(
+            Q(id__in=department_ids) | Q(officers__in=officers)
+        ).values_list("id", flat=True)
+    )
+
+    invalidate_cache_tags(
+        [SUMMARY_CACHE_TAG]
+        + [get_officer_cache_tag(officer_id) for officer_id in officers_ids]
+        + [get_person_cache_tag(person_id) for person_id in person_ids]
+        + [get_department_cache_tag(department_id) for department_id in departments_ids]
+    )
+
+    return {
+        "officers_count": len(officers_ids),
+        "departments_count": len(departments_ids),
+    }
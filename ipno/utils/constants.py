@@ -1,3 +1,5 @@
+from math import ceil
+
 from reportlab.lib.units import inch, mm
 
 PAGE_SIZE = (140 * mm, 216 * mm)
@@ -20,6 +22,26 @@ FILE_TYPES = {
 
 OFFICER_MATCH_THRESHOLD = 0.96
 
+RESPONSE_CACHE_COMPRESSION_LEVEL = 6
+# Cached responses are recomputed after the soft timeout, and served in the
+# meantime until the timeout.
+RESPONSE_CACHE_SOFT_TIMEOUT = 300
+RESPONSE_CACHE_TIMEOUT = 3600
+RESPONSE_CACHE_JITTER = 0.1
+RESPONSE_CACHE_LOCK_TIMEOUT = 60
+RESPONSE_CACHE_LOCK_WAIT_TIMEOUT = 10
+RESPONSE_CACHE_LOCK_WAIT_INTERVAL = 0.1
+RESPONSE_CACHE_STATS_FLUSH_INTERVAL = 10
+# Clients revalidate the versioned responses after this many seconds
+VERSIONED_RESPONSE_MAX_AGE = 60
+# The data versions are read from the cache, and refreshed from the database
+# at least this often.
+DATA_VERSION_CACHE_TIMEOUT = 300
+
+PREVIEW_IMAGE_SIZE = (850, 1100)
+# Documents are mostly letter size, 8.5 x 11 inches.
+PREVIEW_RESOLUTION = ceil(max(PREVIEW_IMAGE_SIZE[0] / 8.5, PREVIEW_IMAGE_SIZE[1] / 11))
+
 LA_LOC_TOP_LEFT = -94.0693795, 33.0033475
 LA_LOC_BOTTOM_RIGHT = -88.707158, 28.892697
 MAP_DOT_RADIUS = 8
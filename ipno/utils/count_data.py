@@ -1,51 +1,106 @@
-from django.db.models import Count
-
-from tqdm import tqdm
+from django.db import connection
 
+from complaints.models import Complaint
 from departments.models import Department
 from officers.models import Officer
 from people.models import Person
 
 
-def count_complaints():
-    for person in tqdm(Person.objects.all(), desc="Update person complaints count"):
-        complaints_list = set()
+def _table(klass):
+    return connection.ops.quote_name(klass._meta.db_table)
 
-        for officer in person.officers.all():
-            complaints_list.update(set(officer.complaints.all()))
 
-        person.all_complaints_count = len(complaints_list)
-        person.save()
+def _execute_update(sql, ids):
+    """Run an UPDATE statement optionally limited to the given ids.
 
+    Returns the number of updated rows, which only counts the rows whose value
+    changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql.format(scope="= ANY(%s)" if ids is not None else "IS NOT NULL"),
+            [list(ids)] if ids is not None else [],
+        )
 
-def calculate_officer_fraction():
-    all_departments = Department.objects.all()
-    max_officer_count = (
-        Department.objects.annotate(officer_count=Count("officers"))
-        .order_by("-officer_count")
-        .first()
-        .officer_count
-    )
+        return cursor.rowcount
 
-    for department in tqdm(all_departments, desc="Update officer fraction"):
-        fraction = department.officers.count() / max_officer_count
 
-        department.officer_fraction = fraction
-        department.save()
+def count_complaints(person_ids=None):
+    complaint_officers_table = _table(Complaint.officers.through)
 
+    return _execute_update(
+        f"""
+        UPDATE {_table(Person)} AS person
+        SET all_complaints_count = counts.complaints_count, updated_at = now()
+        FROM (
+            SELECT p.id AS person_id,
+                COUNT(DISTINCT relation.complaint_id) AS complaints_count
+            FROM {_table(Person)} AS p
+            LEFT JOIN {_table(Officer)} AS officer ON officer.person_id = p.id
+            LEFT JOIN {complaint_officers_table} AS relation
+                ON relation.officer_id = officer.id
+            WHERE p.id {{scope}}
+            GROUP BY p.id
+        ) AS counts
+        WHERE person.id = counts.person_id
+            AND person.all_complaints_count IS DISTINCT FROM counts.complaints_count
+        """,
+        person_ids,
+    )
 
-def calculate_complaint_fraction():
-    all_officers = Officer.objects.all()
-    max_complaint_count = (
-        Person.objects.order_by("-all_complaints_count").first().all_complaints_count
+
+def calculate_officer_fraction(department_ids=None):
+    # The fraction is relative to the largest department, which is looked up
+    # across all departments even when only some of them are updated.
+    return _execute_update(
+        f"""
+        UPDATE {_table(Department)} AS department
+        SET officer_fraction = fractions.officer_fraction, updated_at = now()
+        FROM (
+            SELECT d.id AS department_id,
+                COUNT(officer.id)::float / NULLIF(max_count.value, 0)
+                    AS officer_fraction
+            FROM {_table(Department)} AS d
+            LEFT JOIN {_table(Officer)} AS officer ON officer.department_id = d.id
+            CROSS JOIN (
+                SELECT MAX(officers_count) AS value
+                FROM (
+                    SELECT COUNT(*) AS officers_count
+                    FROM {_table(Officer)}
+                    WHERE department_id IS NOT NULL
+                    GROUP BY department_id
+                ) AS counts
+            ) AS max_count
+            WHERE d.id {{scope}}
+            GROUP BY d.id, max_count.value
+        ) AS fractions
+        WHERE department.id = fractions.department_id
+            AND department.officer_fraction IS DISTINCT FROM fractions.officer_fraction
+        """,
+        department_ids,
     )
 
-    for officer in tqdm(all_officers, desc="Update complaint fraction"):
-        fraction = (
-            officer.person.all_complaints_count / max_complaint_count
-            if officer.person
-            else 0
-        )
 
-        officer.complaint_fraction = fraction
-        officer.save()
+def calculate_complaint_fraction(officer_ids=None):
+    return _execute_update(
+        f"""
+        UPDATE {_table(Officer)} AS officer
+        SET complaint_fraction = fractions.complaint_fraction, updated_at = now()
+        FROM (
+            SELECT o.id AS officer_id,
+                COALESCE(
+                    person.all_complaints_count::float / NULLIF(max_count.value, 0),
+                    0
+                ) AS complaint_fraction
+            FROM {_table(Officer)} AS o
+            LEFT JOIN {_table(Person)} AS person ON person.id = o.person_id
+            CROSS JOIN (
+                SELECT MAX(all_complaints_count) AS value FROM {_table(Person)}
+            ) AS max_count
+            WHERE o.id {{scope}}
+        ) AS fractions
+        WHERE officer.id = fractions.officer_id
+            AND officer.complaint_fraction IS DISTINCT FROM fractions.complaint_fraction
+        """,
+        officer_ids,
+    )
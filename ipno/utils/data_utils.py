@@ -1,9 +1,11 @@
-from tqdm import tqdm
+from django.contrib.postgres.aggregates import ArrayAgg
 
 from departments.models import Department
 from officers.constants import COMPLAINT_ALL_EVENTS, UOF_ALL_EVENTS
 from officers.models import Event
 
+DATA_PERIOD_BATCH_SIZE = 1000
+
 
 def format_data_period(years):
     results = []
@@ -30,15 +32,41 @@ def sort_items(items, attrs):
     return sorted(items, key=lambda item: get_sort_key(item, attrs))
 
 
-def compute_department_data_period():
-    all_department = Department.objects.all()
-    for department in tqdm(all_department, desc="Update department data period"):
-        event_years = Event.objects.filter(
-            department=department,
-            kind__in=COMPLAINT_ALL_EVENTS + UOF_ALL_EVENTS,
-        ).values_list("year", flat=True)
+def compute_department_data_period(department_ids=None):
+    """Update the departments' data periods, the sorted years of their events.
+
+    The years of all departments are aggregated by a single query, and only the
+    departments whose data period changed are saved. When `department_ids` is
+    given, only those departments are recomputed.
+    """
+    events = Event.objects.filter(
+        kind__in=COMPLAINT_ALL_EVENTS + UOF_ALL_EVENTS,
+        department__isnull=False,
+        year__isnull=False,
+    )
+    departments = Department.objects.only("id", "data_period")
+
+    if department_ids is not None:
+        events = events.filter(department_id__in=department_ids)
+        departments = departments.filter(id__in=department_ids)
+
+    data_periods = dict(
+        events.order_by()
+        .values("department_id")
+        .annotate(years=ArrayAgg("year", distinct=True, ordering="year"))
+        .values_list("department_id", "years")
+    )
+
+    updated_departments = []
+    for department in departments:
+        data_period = data_periods.get(department.id, [])
+
+        if department.data_period != data_period:
+            department.data_period = data_period
+            updated_departments.append(department)
 
-        sorted_event_years = sorted(list(set(event_years)))
-        department.data_period = sorted_event_years
+    Department.objects.bulk_update(
+        updated_departments, ["data_period"], batch_size=DATA_PERIOD_BATCH_SIZE
+    )
 
-    Department.objects.bulk_update(all_department, ["data_period"])
+    return len(updated_departments)
@@ -0,0 +1,238 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+import structlog
+
+from data.constants import ROW_FINGERPRINT_FIELD
+from data.models import DataVersion
+from utils.cache_utils import flush_entity_caches
+from utils.constants import DATA_VERSION_CACHE_TIMEOUT, VERSIONED_RESPONSE_MAX_AGE
+
+logger = structlog.get_logger("IPNO")
+
+DATA_VERSION_KEY_PREFIX = "data_version:"
+
+
+def get_data_version_key(entity_type):
+    return f"{DATA_VERSION_KEY_PREFIX}{entity_type}"
+
+
+def cache_data_versions(entity_types):
+    """Copy the versions of the entity types from the database to the cache.
+
+    The entity types never bumped are cached as version 0.
+    """
+    data_versions = {
+        entity_type: (version, updated_at)
+        for entity_type, version, updated_at in DataVersion.objects.filter(
+            entity_type__in=entity_types
+        ).values_list("entity_type", "version", "updated_at")
+    }
+    data_versions = {
+        entity_type: data_versions.get(entity_type, (0, None))
+        for entity_type in entity_types
+    }
+
+    cache.set_many(
+        {
+            get_data_version_key(entity_type): data_version
+            for entity_type, data_version in data_versions.items()
+        },
+        DATA_VERSION_CACHE_TIMEOUT,
+    )
+
+    return data_versions
+
+
+def bump_data_versions(entity_types):
+    """Mark the data of the entity types as changed, once it is published."""
+    now = timezone.now()
+
+    for entity_type in entity_types:
+        data_version, created = DataVersion.objects.get_or_create(
+            entity_type=entity_type, defaults={"version": 1}
+        )
+
+        if not created:
+            DataVersion.objects.filter(id=data_version.id).update(
+                version=F("version") + 1, updated_at=now
+            )
+
+    cache_data_versions(entity_types)
+
+    logger.info("Bumped data versions", entity_types=list(entity_types))
+
+
+def get_data_versions(entity_types):
+    """The versions of the entity types, read from the cache.
+
+    The database is only queried for the versions missing from the cache.
+    """
+    cached_versions = cache.get_many(
+        [get_data_version_key(entity_type) for entity_type in entity_types]
+    )
+    data_versions = {
+        entity_type: cached_versions[get_data_version_key(entity_type)]
+        for entity_type in entity_types
+        if get_data_version_key(entity_type) in cached_versions
+    }
+    missing_entity_types = [
+        entity_type for entity_type in entity_types if entity_type not in data_versions
+    ]
+
+    if missing_entity_types:
+        data_versions.update(cache_data_versions(missing_entity_types))
+
+    return data_versions
+
+
+def get_settle_time():
+    """Seconds the processes may serve their local copies of flushed responses."""
+    return settings.CACHES["default"].get("OPTIONS", {}).get("LOCAL_TIMEOUT", 0)
+
+
+def is_settling(entity_types):
+    """Whether the data of the entity types changed within the settle time.
+
+    The processes may still serve their local copies of the previous responses
+    meanwhile.
+    """
+    updated_ats = [
+        updated_at
+        for _, updated_at in get_data_versions(entity_types).values()
+        if updated_at
+    ]
+
+    return (
+        bool(updated_ats)
+        and (timezone.now() - max(updated_ats)).total_seconds() < get_settle_time()
+    )
+
+
+def get_last_modified(entity_types):
+    """When the data of the entity types was last published.
+
+    It is unknown while one of the entity types was never bumped.
+    """
+    updated_ats = [
+        updated_at for _, updated_at in get_data_versions(entity_types).values()
+    ]
+
+    if updated_ats and all(updated_ats):
+        return max(updated_ats)
+
+
+def versioned_cache_control(entity_types):
+    """Let the clients keep the view responses, unless the data is settling.
+
+    The responses are sent with the time the data of the entity types was last
+    published as Last-Modified, and the requests made with a later
+    If-Modified-Since are answered with a 304 without running the view. The
+    requests revalidating an ETag, set by `custom_cache`, are left to the view.
+    While the versions of the entity types are settling, the responses may
+    still be the previous ones, and are revalidated every time.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            request = args[1]
+
+            if is_settling(entity_types):
+                response = func(*args, **kwargs)
+
+                if response.status_code in [200, 304]:
+                    patch_cache_control(response, no_cache=True)
+
+                return response
+
+            last_modified = get_last_modified(entity_types)
+            if_modified_since = parse_http_date_safe(
+                request.META.get("HTTP_IF_MODIFIED_SINCE", "")
+            )
+
+            if (
+                last_modified
+                and if_modified_since
+                and "HTTP_IF_NONE_MATCH" not in request.META
+                and if_modified_since >= int(last_modified.timestamp())
+            ):
+                response = HttpResponseNotModified()
+            else:
+                response = func(*args, **kwargs)
+
+            if response.status_code not in [200, 304]:
+                return response
+
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+
+            patch_cache_control(
+                response, public=True, max_age=VERSIONED_RESPONSE_MAX_AGE
+            )
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class RowFingerprintAdminMixin:
+    """Clear the row fingerprint of the records changed in the admin.
+
+    The data reconciliation would otherwise see the changed records as still
+    matching their CSV rows, and the next import would keep the changes.
+    """
+
+    def save_model(self, request, obj, form, change):
+        if change and hasattr(obj, ROW_FINGERPRINT_FIELD):
+            setattr(obj, ROW_FINGERPRINT_FIELD, None)
+
+        super().save_model(request, obj, form, change)
+
+
+class DataVersionAdminMixin(RowFingerprintAdminMixin):
+    """Publish the changes made in the admin to the API responses.
+
+    The cached responses of the changed entities are flushed, then the data
+    versions of `data_version_entity_types` are bumped, after the changes are
+    committed.
+    """
+
+    data_version_entity_types = ()
+
+    def get_flush_caches_kwargs(self, objs):
+        return {}
+
+    def publish_changes(self, objs):
+        flush_caches_kwargs = self.get_flush_caches_kwargs(objs)
+
+        def publish():
+            flush_entity_caches(**flush_caches_kwargs)
+            bump_data_versions(self.data_version_entity_types)
+
+        transaction.on_commit(publish)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+
+        self.publish_changes([form.instance])
+
+    def delete_model(self, request, obj):
+        self.publish_changes([obj])
+
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self.publish_changes(list(queryset))
+
+        super().delete_queryset(request, queryset)
@@ -0,0 +1,96 @@
+import os
+import tempfile
+
+
+class FileCache:
+    """Disk cache of content derived from a file, keyed by the file content hash.
+
+    The cache is disabled when no directory is given. When it grows over
+    `max_size` bytes, the least recently used files are evicted.
+    """
+
+    def __init__(self, cache_dir, suffix, max_size=None):
+        self.cache_dir = cache_dir
+        self.suffix = suffix
+        self.max_size = max_size
+        self.size = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.size = sum(os.path.getsize(path) for path in self._list_paths())
+
+    def _get_path(self, content_hash):
+        if self.cache_dir and content_hash:
+            return os.path.join(self.cache_dir, f"{content_hash}{self.suffix}")
+
+    def _list_paths(self):
+        with os.scandir(self.cache_dir) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if entry.is_file() and entry.name.endswith(self.suffix)
+            ]
+
+    def __contains__(self, content_hash):
+        path = self._get_path(content_hash)
+
+        return bool(path) and os.path.exists(path)
+
+    def get(self, content_hash):
+        path = self._get_path(content_hash)
+
+        if not path:
+            return None
+
+        # The file may be evicted meanwhile by another process
+        try:
+            with open(path, "rb") as cached_file:
+                content = cached_file.read()
+
+            # The modification time orders the files by last use for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        return content
+
+    def evict(self):
+        """Remove the least recently used files until the cache fits its size."""
+        files = []
+
+        for path in self._list_paths():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        self.size = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if self.size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+
+    def set(self, content_hash, content):
+        path = self._get_path(content_hash)
+
+        if not path:
+            return
+
+        # Write to a temporary file first so that a concurrent read never sees a
+        # partially written file.
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+        self.size += len(content)
+
+        if self.max_size is not None and self.size > self.max_size:
+            self.evict()
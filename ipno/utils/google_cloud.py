@@ -1,4 +1,5 @@
 import os
+import time
 from shutil import rmtree
 
 from django.conf import settings
@@ -12,8 +13,11 @@ from ipno.data.constants import (
     BRADY_MODEL_NAME,
     CITIZEN_MODEL_NAME,
     COMPLAINT_MODEL_NAME,
+    CSV_DOWNLOAD_ATTEMPTS,
+    CSV_DOWNLOAD_MAX_WORKERS,
     DOCUMENT_MODEL_NAME,
     EVENT_MODEL_NAME,
+    GCS_UPLOAD_CHUNK_SIZE,
     OFFICER_MODEL_NAME,
     PERSON_MODEL_NAME,
     POST_OFFICE_HISTORY_MODEL_NAME,
@@ -46,6 +50,12 @@ class GoogleCloudService:
         blob = self.bucket.blob(destination_location)
         blob.upload_from_string(file_blob, content_type=content_type)
 
+    def upload_file_from_stream(self, destination_location, file_stream, content_type):
+        # A chunk size makes the client use a resumable upload, reading and
+        # sending the stream one chunk at a time.
+        blob = self.bucket.blob(destination_location, chunk_size=GCS_UPLOAD_CHUNK_SIZE)
+        blob.upload_from_file(file_stream, content_type=content_type)
+
     def delete_file_from_url(self, file_url):
         blob = self.bucket.blob(file_url)
         blob.delete()
@@ -65,10 +75,26 @@ class GoogleCloudService:
         blob = self.bucket.blob(file_url)
         blob.download_to_filename("./schema.sql")
 
-    def download_csv_data_sequentially(self, folder_name):
+    def get_csv_files_metadata(self, folder_name):
+        files_metadata = {}
+
+        for model_name, file_name in csv_file_name_mapping.items():
+            blob = self.bucket.get_blob(f"{folder_name}/{file_name}")
+
+            if blob:
+                files_metadata[model_name] = {
+                    "file_md5": blob.md5_hash,
+                    "file_crc32c": blob.crc32c,
+                }
+
+        return files_metadata
+
+    def download_csv_data_sequentially(self, folder_name, model_names=None):
+        model_names = (
+            list(csv_file_name_mapping) if model_names is None else model_names
+        )
         blob_names = [
-            f"{folder_name}/{csv_file_name_mapping[model]}"
-            for model in csv_file_name_mapping
+            f"{folder_name}/{csv_file_name_mapping[model]}" for model in model_names
         ]
 
         if not os.path.exists(f"{settings.CSV_DATA_PATH}/{folder_name}"):
@@ -91,37 +117,82 @@ class GoogleCloudService:
 
         downloaded_data = {
             model_name: f"{settings.CSV_DATA_PATH}/{folder_name}/{csv_file_name_mapping[model_name]}"
-            for model_name in csv_file_name_mapping
+            for model_name in model_names
         }
 
         return downloaded_data
 
-    def download_csv_data(self, folder_name):
-        blob_names = [
-            f"{folder_name}/{csv_file_name_mapping[model]}"
-            for model in csv_file_name_mapping
-        ]
+    def _log_download_throughput(self, blob_name, started_at):
+        file_path = f"{settings.CSV_DATA_PATH}/{blob_name}"
+        file_size = os.path.getsize(file_path)
+        # Files are downloaded concurrently, the time until each file is completely
+        # written gives its effective throughput.
+        duration = max(os.path.getmtime(file_path) - started_at, 0.001)
+
+        logger.info(
+            f"Successfully downloaded {blob_name}",
+            size=file_size,
+            duration=round(duration, 3),
+            throughput=f"{file_size / duration / (1024 * 1024):.2f} MB/s",
+        )
 
-        results = transfer_manager.download_many_to_path(
-            self.bucket, blob_names, destination_directory=settings.CSV_DATA_PATH
+    def download_csv_data(
+        self, folder_name, model_names=None, max_workers=CSV_DOWNLOAD_MAX_WORKERS
+    ):
+        model_names = (
+            list(csv_file_name_mapping) if model_names is None else model_names
         )
+        pending_blob_names = [
+            f"{folder_name}/{csv_file_name_mapping[model]}" for model in model_names
+        ]
 
-        for name, result in zip(blob_names, results):
-            if isinstance(result, Exception):
-                logger.error(
-                    "Failed to download {} due to exception: {}".format(name, result)
-                )
-                rmtree(f"{settings.CSV_DATA_PATH}/{folder_name}")
-                raise Exception(
-                    "Failed to download data from Google Cloud Storage, file name {}"
-                    .format(name)
+        # The folder is removed after the import, even when no file is changed
+        os.makedirs(f"{settings.CSV_DATA_PATH}/{folder_name}", exist_ok=True)
+
+        for attempt in range(1, CSV_DOWNLOAD_ATTEMPTS + 1):
+            started_at = time.time()
+
+            # The crc32c checksum of each file is verified against the blob one
+            # once downloaded, a mismatch is reported as a failed download.
+            results = transfer_manager.download_many_to_path(
+                self.bucket,
+                pending_blob_names,
+                destination_directory=settings.CSV_DATA_PATH,
+                download_kwargs={"checksum": "crc32c"},
+                worker_type=transfer_manager.THREAD,
+                max_workers=max_workers,
+            )
+
+            failed_blob_names = []
+            for name, result in zip(pending_blob_names, results):
+                if isinstance(result, Exception):
+                    logger.warning(
+                        f"Failed to download {name} on attempt {attempt} due to"
+                        f" exception: {result}"
+                    )
+                    failed_blob_names.append(name)
+                else:
+                    self._log_download_throughput(name, started_at)
+
+            pending_blob_names = failed_blob_names
+            if not pending_blob_names:
+                break
+
+        if pending_blob_names:
+            logger.error(
+                "Failed to download {} after {} attempts".format(
+                    ", ".join(pending_blob_names), CSV_DOWNLOAD_ATTEMPTS
                 )
-            else:
-                logger.info("Successfully downloaded {}".format(name))
+            )
+            rmtree(f"{settings.CSV_DATA_PATH}/{folder_name}", ignore_errors=True)
+            raise Exception(
+                "Failed to download data from Google Cloud Storage, file name {}"
+                .format(pending_blob_names[0])
+            )
 
         downloaded_data = {
             model_name: f"{settings.CSV_DATA_PATH}/{folder_name}/{csv_file_name_mapping[model_name]}"
-            for model_name in csv_file_name_mapping
+            for model_name in model_names
         }
 
         return downloaded_data
@@ -12,6 +12,8 @@ from utils.constants import (
     LA_LOC_TOP_LEFT,
     MAP_DOT_RADIUS,
     MAP_DOT_SHARPNESS,
+    PREVIEW_IMAGE_SIZE,
+    PREVIEW_RESOLUTION,
 )
 
 
@@ -26,6 +28,19 @@ def generate_from_blob(blob):
         pass
 
 
+def generate_from_file(file_path):
+    # Only the first page is read, and it is rasterized at the resolution that
+    # gives the preview size instead of a higher one then downsampled.
+    try:
+        with Image(
+            filename=f"{file_path}[0]", resolution=PREVIEW_RESOLUTION
+        ) as first_page:
+            first_page.sample(*PREVIEW_IMAGE_SIZE)
+            return first_page.make_blob("jpeg")
+    except Exception:
+        pass
+
+
 def generate_dot_img(base_img_info, dot_location):
     img_width, img_height = base_img_info
     x, y = dot_location
@@ -10,7 +10,11 @@ class TimeStampsModel(models.Model):
 
 
 class APITemplateModel(models.Model):
-    BASE_FIELDS = {"id", "created_at", "updated_at"}
+    BASE_FIELDS = {"id", "created_at", "updated_at", "row_fingerprint"}
+
+    # Hash of the normalized CSV row this record was imported from, it is used
+    # by the data reconciliation to detect changed rows.
+    row_fingerprint = models.CharField(max_length=32, null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -1,7 +1,10 @@
+import json
+import time
 from datetime import datetime
-from unittest.mock import MagicMock, Mock
+from unittest.mock import MagicMock, Mock, patch
 
 from django.core.cache import cache
+from django.test import RequestFactory
 from django.test.testcases import TestCase
 from django.urls import reverse
 
@@ -11,12 +14,36 @@ from freezegun import freeze_time
 from departments.factories import DepartmentFactory
 from news_articles.factories import NewsArticleFactory, NewsArticleSourceFactory
 from news_articles.factories.matched_sentence_factory import MatchedSentenceFactory
-from officers.factories import OfficerFactory
+from officers.factories import EventFactory, OfficerFactory
 from people.factories import PersonFactory
 from utils.cache_utils import (
+    CACHE_MAX_TIMEOUT,
+    CACHE_STATS_HIT,
+    CACHE_STATS_MISS,
+    SUMMARY_CACHE_TAG,
+    CacheStats,
+    add_to_path_index,
     custom_cache,
     delete_cache,
+    flush_entity_caches,
     flush_news_article_related_caches,
+    get_cache_entry,
+    get_cache_key,
+    get_cache_stats,
+    get_department_cache_tag,
+    get_department_cache_tags,
+    get_etag,
+    get_etag_key,
+    get_lock_key,
+    get_officer_cache_tag,
+    get_officer_cache_tags,
+    get_path_index_key,
+    get_person_cache_tag,
+    get_stats_key,
+    get_tag_versions,
+    invalidate_cache_tags,
+    pack_cache_entry,
+    unpack_cache_entry,
 )
 
 
@@ -54,11 +81,9 @@ class CacheUtilsTestCase(TestCase):
         def func_call(*args, **kwargs):
             return response
 
-        mock_func_call = Mock(wraps=func_call)
-
-        request = MagicMock()
-        request.get_full_path.return_value = url
+        mock_func_call = Mock(wraps=func_call, __qualname__="ViewSet.list")
 
+        request = RequestFactory().get(url)
         view = MagicMock()
 
         cached_func = custom_cache(mock_func_call)
@@ -66,23 +91,223 @@ class CacheUtilsTestCase(TestCase):
 
         mock_func_call.assert_called_once()
         assert result.data == response.data
-        assert cache.get(url) == response.data
+        assert json.loads(unpack_cache_entry(cache.get(url)).content) == response.data
+        assert not cache.get(get_lock_key(url))
 
-        cached_func(view, request)
+        cached_result = cached_func(view, request)
         mock_func_call.assert_called_once()
+        assert cached_result.data == response.data
+        assert cached_result.content == b'"test"'
+        assert cached_result["Content-Type"] == "application/json"
+        assert cached_result["Content-Length"] == "6"
+        assert cached_result["ETag"] == '"%s"' % get_etag(b'"test"')
+        assert result["ETag"] == cached_result["ETag"]
+
+    def get_cached_func(self, url, data, **kwargs):
+        response = MagicMock()
+        response.data = data
+        self.request = RequestFactory().get(url)
+        self.func = Mock(return_value=response, __qualname__="ViewSet.list")
+
+        return custom_cache(self.func, **kwargs)
+
+    def test_custom_cache_stale(self):
+        url = reverse("api:departments-migratory")
+        cache.set(url, pack_cache_entry(b'"old"', get_etag(b'"old"'), 0))
+        cached_func = self.get_cached_func(url, "new")
+
+        result = cached_func(MagicMock(), self.request)
+
+        self.func.assert_called_once()
+        assert result.data == "new"
+        assert json.loads(unpack_cache_entry(cache.get(url)).content) == "new"
+        assert unpack_cache_entry(cache.get(url)).soft_expires_at > time.time()
+        assert not cache.get(get_lock_key(url))
+
+    def test_custom_cache_stale_while_recomputing(self):
+        url = reverse("api:departments-migratory")
+        cache.set(url, pack_cache_entry(b'"old"', get_etag(b'"old"'), 0))
+        cache.add(get_lock_key(url), True)
+        cached_func = self.get_cached_func(url, "new")
+
+        result = cached_func(MagicMock(), self.request)
+
+        self.func.assert_not_called()
+        assert result.data == "old"
+
+    @patch("utils.cache_utils.time.sleep")
+    def test_custom_cache_wait_for_computing_request(self, sleep_mock):
+        url = reverse("api:departments-migratory")
+        cache.add(get_lock_key(url), True)
+        cached_func = self.get_cached_func(url, "new")
+
+        def compute_in_other_request(_):
+            cache.set(url, pack_cache_entry(b'"other"', get_etag(b'"other"'), 0))
+
+        sleep_mock.side_effect = compute_in_other_request
+
+        result = cached_func(MagicMock(), self.request)
+
+        self.func.assert_not_called()
+        assert result.data == "other"
+
+    @patch("utils.cache_utils.RESPONSE_CACHE_LOCK_WAIT_TIMEOUT", 0)
+    def test_custom_cache_wait_timeout(self):
+        url = reverse("api:departments-migratory")
+        cache.add(get_lock_key(url), True)
+        cached_func = self.get_cached_func(url, "new")
+
+        result = cached_func(MagicMock(), self.request)
+
+        self.func.assert_called_once()
+        assert result.data == "new"
+        assert cache.get(get_lock_key(url))
+
+    def test_custom_cache_not_modified(self):
+        url = reverse("api:departments-migratory")
+        cached_func = self.get_cached_func(url, "new")
+        etag = cached_func(MagicMock(), self.request)["ETag"]
+
+        self.request.META = {"HTTP_IF_NONE_MATCH": f"W/{etag}"}
+        with patch("utils.cache_utils.unpack_cache_entry") as unpack_mock:
+            result = cached_func(MagicMock(), self.request)
+
+        unpack_mock.assert_not_called()
+        self.func.assert_called_once()
+        assert result.status_code == 304
+        assert result["ETag"] == etag
+
+    def test_custom_cache_modified(self):
+        url = reverse("api:departments-migratory")
+        cached_func = self.get_cached_func(url, "new")
+        cached_func(MagicMock(), self.request)
+
+        self.request.META = {"HTTP_IF_NONE_MATCH": '"other-etag"'}
+        result = cached_func(MagicMock(), self.request)
+
+        assert result.status_code == 200
+        assert result.data == "new"
+
+    def test_custom_cache_not_modified_stale(self):
+        url = reverse("api:departments-migratory")
+        etag = get_etag(b'"old"')
+        cache.set(url, pack_cache_entry(b'"old"', etag, 0))
+        cache.set(get_etag_key(url), (etag, 0, {}))
+        cached_func = self.get_cached_func(url, "new")
+
+        self.request.META = {"HTTP_IF_NONE_MATCH": f'"{etag}"'}
+        result = cached_func(MagicMock(), self.request)
+
+        self.func.assert_called_once()
+        assert result.status_code == 200
+        assert result.data == "new"
+
+    def test_get_cache_key(self):
+        request = RequestFactory().get(
+            "/api/departments/slug/documents/",
+            {"q": "report", "utm_source": "email", "limit": "20"},
+        )
+
+        assert get_cache_key(request) == "/api/departments/slug/documents/"
+        assert (
+            get_cache_key(request, query_params=["q", "limit", "offset"])
+            == "/api/departments/slug/documents/?limit=20&q=report"
+        )
+
+    def test_custom_cache_ignores_other_query_params(self):
+        url = reverse("api:departments-migratory")
+        cached_func = self.get_cached_func(url, "new")
+        cached_func(MagicMock(), self.request)
+
+        result = cached_func(MagicMock(), RequestFactory().get(url, {"utm": "a"}))
+
+        self.func.assert_called_once()
+        assert result.data == "new"
+        assert not cache.get(f"{url}?utm=a")
+
+    def test_custom_cache_invalidated_by_tag(self):
+        url = reverse("api:departments-migratory")
+        cached_func = self.get_cached_func(
+            url, "new", tags=lambda view, request: ["tag-1", "tag-2"]
+        )
+        cached_func(MagicMock(), self.request)
+        etag = cache.get(get_etag_key(url))[0]
+
+        invalidate_cache_tags(["tag-3"])
+        cached_func(MagicMock(), self.request)
+        self.func.assert_called_once()
+
+        invalidate_cache_tags(["tag-2"])
+        assert get_cache_entry(url) is None
+        self.request.META["HTTP_IF_NONE_MATCH"] = f'"{etag}"'
+        result = cached_func(MagicMock(), self.request)
+
+        assert self.func.call_count == 2
+        assert result.status_code == 200
+        assert get_cache_entry(url).tag_versions == get_tag_versions(["tag-1", "tag-2"])
+
+    def test_get_cache_entry_previous_format(self):
+        cache.set("/api/officers/", b"previous format")
+
+        assert get_cache_entry("/api/officers/") is None
+
+    def test_invalidate_cache_tags(self):
+        invalidate_cache_tags(["tag-1"])
+        versions = get_tag_versions(["tag-1", "tag-2"])
+
+        invalidate_cache_tags(["tag-1", "tag-2"])
+
+        new_versions = get_tag_versions(["tag-1", "tag-2"])
+        assert versions["tag-1"] != new_versions["tag-1"]
+        assert versions["tag-2"] is None
+        assert new_versions["tag-2"] is not None
+
+    def test_get_officer_cache_tags(self):
+        person = PersonFactory()
+        officer = OfficerFactory(person=person)
+
+        assert get_officer_cache_tags(MagicMock(), MagicMock(), officer.id) == [
+            get_officer_cache_tag(officer.id),
+            get_person_cache_tag(person.id),
+        ]
+
+    def test_get_department_cache_tags(self):
+        department = DepartmentFactory()
+
+        assert get_department_cache_tags(
+            MagicMock(), MagicMock(), department.agency_slug
+        ) == [get_department_cache_tag(department.id)]
+
+    def test_cache_stats(self):
+        url = reverse("api:departments-migratory")
+        cached_func = self.get_cached_func(url, "new")
+
+        with patch("utils.cache_utils.cache_stats", CacheStats()) as cache_stats:
+            cached_func(MagicMock(), self.request)
+            cached_func(MagicMock(), self.request)
+            cached_func(MagicMock(), self.request)
+            cache_stats.flush()
+
+        assert cache.get(get_stats_key("ViewSet.list", CACHE_STATS_MISS)) == 1
+        assert cache.get(get_stats_key("ViewSet.list", CACHE_STATS_HIT)) == 2
+        assert get_cache_stats()["ViewSet.list"] == {
+            "hit": 2,
+            "stale": 0,
+            "miss": 1,
+            "not_modified": 0,
+            "hit_rate": 2 / 3,
+        }
 
     def test_flush_news_article_related_caches_no_start_time(self):
         department = DepartmentFactory(agency_name="New Orleans PD")
-        DepartmentFactory()
-        DepartmentFactory()
+        other_department = DepartmentFactory()
 
         officer = OfficerFactory(department=department)
         person = PersonFactory(canonical_officer=officer)
         person.officers.add(officer)
         person.save()
 
-        OfficerFactory()
-        OfficerFactory()
+        other_officer = OfficerFactory(department=other_department)
 
         source = NewsArticleSourceFactory(source_display_name="Source")
         news_article = NewsArticleFactory(
@@ -91,44 +316,28 @@ class CacheUtilsTestCase(TestCase):
         matched_sentence = MatchedSentenceFactory(article=news_article)
         matched_sentence.officers.add(officer)
 
-        cache.set(reverse("api:news-articles-list"), "News article list")
-        cache.set(reverse("api:analytics-summary"), "Summary")
-        cache.set(
-            reverse("api:officers-timeline", kwargs={"pk": officer.id}), "Timeline"
-        )
-        cache.set(
-            reverse("api:departments-detail", kwargs={"pk": department.agency_slug}),
-            "Department detail",
-        )
-        cache.set(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department.agency_slug}
-            ),
-            "Department article",
-        )
-        cache.set(reverse("api:officers-list"), "Officer list")
+        tags = [
+            get_officer_cache_tag(officer.id),
+            get_officer_cache_tag(other_officer.id),
+            get_department_cache_tag(department.id),
+            get_department_cache_tag(other_department.id),
+            SUMMARY_CACHE_TAG,
+        ]
+        invalidate_cache_tags(tags)
+        versions = get_tag_versions(tags)
 
         flush_news_article_related_caches()
 
-        assert not cache.get(reverse("api:analytics-summary"))
-        assert not cache.get(
-            reverse("api:officers-timeline", kwargs={"pk": officer.id})
-        )
-        assert not cache.get(
-            reverse("api:departments-detail", kwargs={"pk": department.agency_slug})
-        )
-        assert not cache.get(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department.agency_slug}
-            )
-        )
-        assert cache.get(reverse("api:officers-list"))
+        new_versions = get_tag_versions(tags)
+        assert [tag for tag in tags if versions[tag] != new_versions[tag]] == [
+            get_officer_cache_tag(officer.id),
+            get_department_cache_tag(department.id),
+            SUMMARY_CACHE_TAG,
+        ]
 
     def test_flush_news_article_related_caches_with_start_time(self):
         department_1 = DepartmentFactory(agency_name="Department 1")
         department_2 = DepartmentFactory(agency_name="Department 2")
-        DepartmentFactory()
-        DepartmentFactory()
 
         officer_1 = OfficerFactory(department=department_1)
         officer_2 = OfficerFactory(department=department_2)
@@ -137,9 +346,6 @@ class CacheUtilsTestCase(TestCase):
         person.officers.add(officer_2)
         person.save()
 
-        OfficerFactory()
-        OfficerFactory()
-
         source = NewsArticleSourceFactory(source_display_name="Source")
         news_article = NewsArticleFactory(
             content="Text content", author="Writer Staff", source=source
@@ -153,61 +359,103 @@ class CacheUtilsTestCase(TestCase):
             matched_sentence_2 = MatchedSentenceFactory(article=news_article)
             matched_sentence_2.officers.add(officer_2)
 
-        cache.set(reverse("api:analytics-summary"), "Summary")
-        cache.set(
-            reverse("api:officers-timeline", kwargs={"pk": officer_1.id}),
-            "Timeline of officer 1",
-        )
-        cache.set(
-            reverse("api:officers-timeline", kwargs={"pk": officer_2.id}),
-            "Timeline of officer 2",
-        )
-        cache.set(
-            reverse("api:departments-detail", kwargs={"pk": department_1.agency_slug}),
-            "Department 1 detail",
-        )
-        cache.set(
-            reverse("api:departments-detail", kwargs={"pk": department_2.agency_slug}),
-            "Department 2 detail",
-        )
-        cache.set(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department_1.agency_slug}
-            ),
-            "Department 1 article",
-        )
-        cache.set(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department_2.agency_slug}
-            ),
-            "Department 1 article",
-        )
-        cache.set(reverse("api:officers-list"), "Officer list")
+        tags = [
+            get_officer_cache_tag(officer_1.id),
+            get_officer_cache_tag(officer_2.id),
+            get_department_cache_tag(department_1.id),
+            get_department_cache_tag(department_2.id),
+            SUMMARY_CACHE_TAG,
+        ]
 
         flush_news_article_related_caches(
             datetime(2021, 9, 3, 9, 0, 0, tzinfo=pytz.utc)
         )
 
-        assert not cache.get(reverse("api:news-articles-list"))
-        assert not cache.get(reverse("api:analytics-summary"))
-        assert not cache.get(
-            reverse("api:officers-timeline", kwargs={"pk": officer_2.id})
-        )
-        assert not cache.get(
-            reverse("api:departments-detail", kwargs={"pk": department_2.agency_slug})
-        )
-        assert not cache.get(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department_2.agency_slug}
-            )
+        versions = get_tag_versions(tags)
+        assert [tag for tag in tags if versions[tag]] == [
+            get_officer_cache_tag(officer_2.id),
+            get_department_cache_tag(department_2.id),
+            SUMMARY_CACHE_TAG,
+        ]
+
+    def test_delete_cache_with_query_strings(self):
+        pattern = "api:departments-documents"
+        url = reverse(pattern, kwargs={"pk": "slug"})
+
+        response = MagicMock()
+        response.data = "Documents"
+        view = MagicMock()
+        cached_func = custom_cache(
+            Mock(return_value=response, __qualname__="ViewSet.documents"),
+            query_params=["q", "limit", "offset"],
         )
-        assert cache.get(reverse("api:officers-timeline", kwargs={"pk": officer_1.id}))
-        assert cache.get(
-            reverse("api:departments-detail", kwargs={"pk": department_1.agency_slug})
+
+        for request_path in [url, f"{url}?limit=20&offset=20", f"{url}?q=report"]:
+            cached_func(view, RequestFactory().get(request_path))
+            assert cache.get(request_path)
+
+        delete_cache(pattern, url_kwargs={"pk": "slug"})
+
+        assert not cache.get(url)
+        assert not cache.get(f"{url}?limit=20&offset=20")
+        assert not cache.get(f"{url}?q=report")
+        assert not cache.get(get_etag_key(url))
+        assert not cache.get(get_etag_key(f"{url}?q=report"))
+        assert not cache.get(get_path_index_key(url))
+
+    @patch("utils.cache_utils.cache")
+    def test_delete_cache_with_tiered_cache_path_index(self, cache_mock):
+        pattern = "api:departments-documents"
+        url = reverse(pattern, kwargs={"pk": "slug"})
+        request_path = f"{url}?q=report"
+        cache_mock.get_sets.return_value = {get_path_index_key(url): {request_path}}
+
+        add_to_path_index(request_path)
+        delete_cache(pattern, url_kwargs={"pk": "slug"})
+
+        cache_mock.add_to_set.assert_called_with(
+            get_path_index_key(url), [request_path], CACHE_MAX_TIMEOUT
         )
-        assert cache.get(
-            reverse(
-                "api:departments-news-articles", kwargs={"pk": department_1.agency_slug}
-            )
+        cache_mock.get.assert_not_called()
+        cache_mock.set.assert_not_called()
+        cache_mock.get_sets.assert_called_with([get_path_index_key(url)])
+
+        deleted_keys = cache_mock.delete_many.call_args[0][0]
+        assert request_path in deleted_keys
+        assert get_etag_key(request_path) in deleted_keys
+
+    def test_flush_entity_caches(self):
+        department_1 = DepartmentFactory()
+        department_2 = DepartmentFactory()
+        department_3 = DepartmentFactory()
+        person = PersonFactory()
+        officer_1 = OfficerFactory(department=department_1, person=person)
+        officer_2 = OfficerFactory(department=department_2, person=person)
+        officer_3 = OfficerFactory(department=department_2)
+        officer_4 = OfficerFactory(department=department_3)
+        EventFactory(officer=officer_3, department=department_1)
+
+        tags = [
+            SUMMARY_CACHE_TAG,
+            get_officer_cache_tag(officer_1.id),
+            get_officer_cache_tag(officer_2.id),
+            get_officer_cache_tag(officer_3.id),
+            get_officer_cache_tag(officer_4.id),
+            get_person_cache_tag(person.id),
+            get_department_cache_tag(department_1.id),
+            get_department_cache_tag(department_2.id),
+            get_department_cache_tag(department_3.id),
+        ]
+
+        result = flush_entity_caches(
+            officer_ids={officer_1.id},
+            department_ids={department_1.id},
+            person_ids={person.id},
         )
-        assert cache.get(reverse("api:officers-list"))
+
+        versions = get_tag_versions(tags)
+        assert result == {"officers_count": 3, "departments_count": 2}
+        assert [tag for tag in tags if not versions[tag]] == [
+            get_officer_cache_tag(officer_4.id),
+            get_department_cache_tag(department_3.id),
+        ]
@@ -43,6 +43,27 @@ class CountComplaintsTestCase(TestCase):
         assert people.first().all_complaints_count == 0
         assert people.last().all_complaints_count == 2
 
+        assert count_complaints() == 0
+
+    def test_update_count_complaints_of_given_people(self):
+        person_1 = PersonFactory(all_complaints_count=5)
+        person_2 = PersonFactory(all_complaints_count=5)
+
+        officer_1 = OfficerFactory(person=person_1)
+        officer_2 = OfficerFactory(person=person_2)
+
+        complaint = ComplaintFactory()
+        complaint.officers.add(officer_1)
+        complaint.officers.add(officer_2)
+
+        assert count_complaints(person_ids=[person_1.id]) == 1
+
+        person_1.refresh_from_db()
+        person_2.refresh_from_db()
+
+        assert person_1.all_complaints_count == 1
+        assert person_2.all_complaints_count == 5
+
 
 class CalculateOfficerFractionTestCase(TestCase):
     def test_calculate_officer_fraction(self):
@@ -88,6 +109,26 @@ class CalculateOfficerFractionTestCase(TestCase):
         assert department_2.officer_fraction == 1.0
         assert department_3.officer_fraction == 0.5
 
+    def test_calculate_officer_fraction_of_given_departments(self):
+        department_1 = DepartmentFactory(officer_fraction=0.1)
+        department_2 = DepartmentFactory(officer_fraction=0.1)
+
+        for officer in OfficerFactory.create_batch(2):
+            officer.department = department_1
+            officer.save()
+
+        for officer in OfficerFactory.create_batch(4):
+            officer.department = department_2
+            officer.save()
+
+        assert calculate_officer_fraction(department_ids=[department_1.id]) == 1
+
+        department_1.refresh_from_db()
+        department_2.refresh_from_db()
+
+        assert department_1.officer_fraction == 0.5
+        assert department_2.officer_fraction == 0.1
+
 
 class CalculateComplaintFractionTestCase(TestCase):
     def test_calculate_complaint_fraction(self):
@@ -114,3 +155,13 @@ class CalculateComplaintFractionTestCase(TestCase):
         assert officer_1.complaint_fraction == 0.25
         assert officer_2.complaint_fraction == 0.5
         assert officer_3.complaint_fraction == 1.0
+
+    def test_calculate_complaint_fraction_without_person(self):
+        officer = OfficerFactory(person=None, complaint_fraction=0.5)
+        PersonFactory(all_complaints_count=10)
+
+        calculate_complaint_fraction(officer_ids=[officer.id])
+
+        officer.refresh_from_db()
+
+        assert officer.complaint_fraction == 0
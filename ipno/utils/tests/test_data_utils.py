@@ -187,3 +187,27 @@ class DataTestCase(TestCase):
             2019,
             2020,
         ]
+
+    def test_compute_department_data_period_of_given_departments(self):
+        department_1 = DepartmentFactory(data_period=[])
+        department_2 = DepartmentFactory(data_period=[2000])
+        department_3 = DepartmentFactory(data_period=[2005])
+
+        EventFactory(kind=UOF_RECEIVE, department=department_1, year=2019)
+        EventFactory(kind=COMPLAINT_RECEIVE, department=department_1, year=2018)
+        EventFactory(kind=UOF_RECEIVE, department=department_1, year=2019)
+        EventFactory(kind=UOF_RECEIVE, department=department_1, year=None)
+        EventFactory(kind=UOF_RECEIVE, department=department_3, year=2010)
+
+        updated_count = compute_department_data_period(
+            department_ids=[department_1.id, department_2.id]
+        )
+
+        department_1.refresh_from_db()
+        department_2.refresh_from_db()
+        department_3.refresh_from_db()
+
+        assert updated_count == 2
+        assert department_1.data_period == [2018, 2019]
+        assert department_2.data_period == []
+        assert department_3.data_period == [2005]
@@ -0,0 +1,206 @@
+from unittest.mock import MagicMock, Mock, patch
+
+from django.contrib.admin import ModelAdmin
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.testcases import TestCase
+from django.utils.http import http_date
+
+from data.constants import DATA_VERSION_DOCUMENTS, DATA_VERSION_OFFICERS
+from data.models import DataVersion
+from officers.factories import OfficerFactory
+from officers.models import Officer
+from utils.data_version import (
+    DataVersionAdminMixin,
+    RowFingerprintAdminMixin,
+    bump_data_versions,
+    get_data_versions,
+    is_settling,
+    versioned_cache_control,
+)
+
+
+class DataVersionTestCase(TestCase):
+    def setUp(self):
+        self.request_factory = RequestFactory()
+
+    def test_bump_data_versions(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        bump_data_versions([DATA_VERSION_OFFICERS, DATA_VERSION_DOCUMENTS])
+
+        assert DataVersion.objects.get(entity_type=DATA_VERSION_OFFICERS).version == 2
+        assert DataVersion.objects.get(entity_type=DATA_VERSION_DOCUMENTS).version == 1
+
+    def test_get_data_versions(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        updated_at = DataVersion.objects.get(
+            entity_type=DATA_VERSION_OFFICERS
+        ).updated_at
+        data_versions = {
+            DATA_VERSION_OFFICERS: (1, updated_at),
+            DATA_VERSION_DOCUMENTS: (0, None),
+        }
+
+        assert (
+            get_data_versions([DATA_VERSION_OFFICERS, DATA_VERSION_DOCUMENTS])
+            == data_versions
+        )
+
+        # Served from the cache, until the versions are bumped
+        DataVersion.objects.update(version=5)
+        assert (
+            get_data_versions([DATA_VERSION_OFFICERS, DATA_VERSION_DOCUMENTS])
+            == data_versions
+        )
+
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        assert get_data_versions([DATA_VERSION_OFFICERS])[DATA_VERSION_OFFICERS][0] == 6
+
+    def test_is_settling(self):
+        assert not is_settling([DATA_VERSION_OFFICERS])
+
+        bump_data_versions([DATA_VERSION_OFFICERS])
+
+        with patch("utils.data_version.get_settle_time", return_value=60):
+            assert is_settling([DATA_VERSION_OFFICERS])
+            assert not is_settling([DATA_VERSION_DOCUMENTS])
+
+        with patch("utils.data_version.get_settle_time", return_value=0):
+            assert not is_settling([DATA_VERSION_OFFICERS])
+
+    def get_view(self, status=200):
+        self.func = Mock(return_value=HttpResponse(b"[]", status=status))
+
+        return versioned_cache_control([DATA_VERSION_OFFICERS])(self.func)
+
+    def test_versioned_cache_control(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        view = self.get_view()
+
+        response = view(MagicMock(), self.request_factory.get("/officers/"))
+
+        self.func.assert_called_once()
+        assert response.status_code == 200
+        assert "public" in response["Cache-Control"]
+        assert "max-age=60" in response["Cache-Control"]
+
+    def test_versioned_cache_control_last_modified(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        updated_at = DataVersion.objects.get(
+            entity_type=DATA_VERSION_OFFICERS
+        ).updated_at
+        view = self.get_view()
+
+        response = view(MagicMock(), self.request_factory.get("/officers/"))
+
+        assert response["Last-Modified"] == http_date(updated_at.timestamp())
+
+    def test_versioned_cache_control_if_modified_since(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        updated_at = DataVersion.objects.get(
+            entity_type=DATA_VERSION_OFFICERS
+        ).updated_at
+        view = self.get_view()
+
+        response = view(
+            MagicMock(),
+            self.request_factory.get(
+                "/officers/",
+                HTTP_IF_MODIFIED_SINCE=http_date(updated_at.timestamp()),
+            ),
+        )
+
+        self.func.assert_not_called()
+        assert response.status_code == 304
+        assert response["Last-Modified"] == http_date(updated_at.timestamp())
+        assert "max-age=60" in response["Cache-Control"]
+
+    def test_versioned_cache_control_modified_since(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        updated_at = DataVersion.objects.get(
+            entity_type=DATA_VERSION_OFFICERS
+        ).updated_at
+        view = self.get_view()
+
+        response = view(
+            MagicMock(),
+            self.request_factory.get(
+                "/officers/",
+                HTTP_IF_MODIFIED_SINCE=http_date(updated_at.timestamp() - 60),
+            ),
+        )
+
+        self.func.assert_called_once()
+        assert response.status_code == 200
+
+    def test_versioned_cache_control_if_none_match(self):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        updated_at = DataVersion.objects.get(
+            entity_type=DATA_VERSION_OFFICERS
+        ).updated_at
+        view = self.get_view()
+
+        view(
+            MagicMock(),
+            self.request_factory.get(
+                "/officers/",
+                HTTP_IF_MODIFIED_SINCE=http_date(updated_at.timestamp()),
+                HTTP_IF_NONE_MATCH='"etag"',
+            ),
+        )
+
+        self.func.assert_called_once()
+
+    def test_versioned_cache_control_not_modified(self):
+        view = self.get_view(status=304)
+
+        response = view(MagicMock(), self.request_factory.get("/officers/"))
+
+        assert response.status_code == 304
+        assert "max-age=60" in response["Cache-Control"]
+
+    def test_versioned_cache_control_error(self):
+        view = self.get_view(status=404)
+
+        response = view(MagicMock(), self.request_factory.get("/officers/"))
+
+        assert not response.has_header("Cache-Control")
+
+    @patch("utils.data_version.get_settle_time", return_value=60)
+    def test_versioned_cache_control_settling(self, _):
+        bump_data_versions([DATA_VERSION_OFFICERS])
+        view = self.get_view()
+
+        response = view(MagicMock(), self.request_factory.get("/officers/"))
+
+        self.func.assert_called_once()
+        assert response["Cache-Control"] == "no-cache"
+
+    @patch("utils.data_version.flush_entity_caches")
+    @patch("utils.data_version.transaction.on_commit", side_effect=lambda func: func())
+    def test_admin_mixin_publish_changes(self, _, flush_entity_caches_mock):
+        class OfficerAdmin(DataVersionAdminMixin, ModelAdmin):
+            data_version_entity_types = (DATA_VERSION_OFFICERS,)
+
+            def get_flush_caches_kwargs(self, objs):
+                return {"officer_ids": [obj.id for obj in objs]}
+
+        officer_admin = OfficerAdmin(Officer, MagicMock())
+        officer_admin.publish_changes([Mock(id=1), Mock(id=2)])
+
+        flush_entity_caches_mock.assert_called_with(officer_ids=[1, 2])
+        assert DataVersion.objects.get(entity_type=DATA_VERSION_OFFICERS).version == 1
+
+    def test_admin_mixin_clears_row_fingerprint(self):
+        class OfficerAdmin(RowFingerprintAdminMixin, ModelAdmin):
+            pass
+
+        officer = OfficerFactory(row_fingerprint="fingerprint")
+        officer.first_name = "New"
+
+        officer_admin = OfficerAdmin(Officer, MagicMock())
+        officer_admin.save_model(MagicMock(), officer, MagicMock(), True)
+
+        officer.refresh_from_db()
+        assert officer.first_name == "New"
+        assert officer.row_fingerprint is None
@@ -0,0 +1,70 @@
+import os
+from tempfile import mkdtemp
+
+from django.test.testcases import TestCase
+
+from utils.file_cache import FileCache
+
+
+class FileCacheTestCase(TestCase):
+    def test_set_and_get(self):
+        cache_dir = mkdtemp()
+        file_cache = FileCache(cache_dir, ".jpeg")
+
+        assert "content-hash" not in file_cache
+        assert file_cache.get("content-hash") is None
+
+        file_cache.set("content-hash", b"preview_image_blob")
+
+        assert "content-hash" in file_cache
+        assert file_cache.get("content-hash") == b"preview_image_blob"
+        assert os.listdir(cache_dir) == ["content-hash.jpeg"]
+
+    def test_without_content_hash(self):
+        cache_dir = mkdtemp()
+        file_cache = FileCache(cache_dir, ".jpeg")
+
+        file_cache.set(None, b"preview_image_blob")
+
+        assert None not in file_cache
+        assert file_cache.get(None) is None
+        assert os.listdir(cache_dir) == []
+
+    def test_disabled(self):
+        file_cache = FileCache(None, ".jpeg")
+
+        file_cache.set("content-hash", b"preview_image_blob")
+
+        assert "content-hash" not in file_cache
+        assert file_cache.get("content-hash") is None
+
+    def test_evict_least_recently_used(self):
+        cache_dir = mkdtemp()
+        file_cache = FileCache(cache_dir, ".txt", max_size=10)
+
+        file_cache.set("hash-1", b"1234")
+        os.utime(os.path.join(cache_dir, "hash-1.txt"), (1, 1))
+        file_cache.set("hash-2", b"1234")
+        os.utime(os.path.join(cache_dir, "hash-2.txt"), (2, 2))
+
+        assert file_cache.get("hash-1") == b"1234"
+
+        file_cache.set("hash-3", b"1234")
+
+        assert "hash-1" in file_cache
+        assert "hash-2" not in file_cache
+        assert "hash-3" in file_cache
+        assert file_cache.size == 8
+
+    def test_size_of_existing_files(self):
+        cache_dir = mkdtemp()
+        FileCache(cache_dir, ".txt").set("hash-1", b"1234")
+
+        file_cache = FileCache(cache_dir, ".txt", max_size=6)
+
+        assert file_cache.size == 4
+
+        file_cache.set("hash-2", b"1234")
+
+        assert "hash-1" not in file_cache
+        assert "hash-2" in file_cache
@@ -3,6 +3,7 @@ from django.test.testcases import TestCase
 
 from mock import Mock, call, patch
 
+from data.constants import GCS_UPLOAD_CHUNK_SIZE
 from utils.google_cloud import GoogleCloudService, csv_file_name_mapping
 
 
@@ -29,6 +30,27 @@ class GoogleCloudTestCase(TestCase):
         mock_blob.assert_called_with(destination_url)
         mock_upload_from_string.assert_called_with(file_blob, content_type=content_type)
 
+    @patch("utils.google_cloud.Client")
+    def test_upload_file_from_stream(self, mock_client):
+        mock_upload_from_file = Mock()
+        mock_blob = Mock(return_value=Mock(upload_from_file=mock_upload_from_file))
+        mock_bucket = Mock(return_value=Mock(blob=mock_blob))
+        mock_client.return_value = Mock(bucket=mock_bucket)
+
+        google_cloud_service = GoogleCloudService(settings.DOCUMENTS_BUCKET_NAME)
+
+        file_stream = Mock()
+        google_cloud_service.upload_file_from_stream(
+            "destination_url", file_stream, "application/pdf"
+        )
+
+        mock_blob.assert_called_with(
+            "destination_url", chunk_size=GCS_UPLOAD_CHUNK_SIZE
+        )
+        mock_upload_from_file.assert_called_with(
+            file_stream, content_type="application/pdf"
+        )
+
     @patch("utils.google_cloud.Client")
     def test_delete_file_from_url(self, mock_client):
         mock_delete = Mock()
@@ -95,12 +117,15 @@ class GoogleCloudTestCase(TestCase):
         )
         mock_delete_blob.assert_called_with(source_blob_name)
 
+    @patch("utils.google_cloud.os")
     @patch("utils.google_cloud.transfer_manager")
     @patch("utils.google_cloud.Client")
-    def test_download_csv_data(self, mock_client, mock_transfer_manager):
+    def test_download_csv_data(self, mock_client, mock_transfer_manager, mock_os):
         mock_transfer_manager.download_many_to_path = Mock(
             return_value=[None] * len(csv_file_name_mapping)
         )
+        mock_os.path.getsize.return_value = 1024 * 1024
+        mock_os.path.getmtime.return_value = 0
 
         mock_bucket = Mock(return_value="mock_bucket")
         mock_storage_client = Mock(bucket=mock_bucket)
@@ -110,17 +135,26 @@ class GoogleCloudTestCase(TestCase):
 
         folder_name = "folder_name"
 
-        result = google_cloud_service.download_csv_data(folder_name)
+        result = google_cloud_service.download_csv_data(folder_name, max_workers=4)
 
         mock_client.assert_called()
         mock_bucket.assert_called_with("bucket_name")
-        mock_transfer_manager.download_many_to_path.assert_called_with(
+        mock_transfer_manager.download_many_to_path.assert_called_once_with(
             "mock_bucket",
             [
                 f"{folder_name}/{csv_file_name_mapping[model]}"
                 for model in csv_file_name_mapping
             ],
             destination_directory=settings.CSV_DATA_PATH,
+            download_kwargs={"checksum": "crc32c"},
+            worker_type=mock_transfer_manager.THREAD,
+            max_workers=4,
+        )
+        mock_os.makedirs.assert_called_with(
+            f"{settings.CSV_DATA_PATH}/{folder_name}", exist_ok=True
+        )
+        mock_os.path.getsize.assert_any_call(
+            f"{settings.CSV_DATA_PATH}/{folder_name}/personnel.csv"
         )
 
         assert result == {
@@ -128,16 +162,49 @@ class GoogleCloudTestCase(TestCase):
             for model_name in csv_file_name_mapping
         }
 
+    @patch("utils.google_cloud.os")
+    @patch("utils.google_cloud.transfer_manager")
+    @patch("utils.google_cloud.Client")
+    def test_download_csv_data_retry_failed_files(
+        self, mock_client, mock_transfer_manager, mock_os
+    ):
+        mock_transfer_manager.download_many_to_path = Mock(
+            side_effect=[
+                [None] * (len(csv_file_name_mapping) - 1)
+                + [Exception("Failed to download")],
+                [None],
+            ]
+        )
+        mock_os.path.getsize.return_value = 1024
+        mock_os.path.getmtime.return_value = 0
+        mock_client.return_value = Mock(bucket=Mock(return_value="mock_bucket"))
+
+        google_cloud_service = GoogleCloudService("bucket_name")
+        result = google_cloud_service.download_csv_data("folder_name")
+
+        assert mock_transfer_manager.download_many_to_path.call_count == 2
+        assert mock_transfer_manager.download_many_to_path.call_args[0][1] == [
+            "folder_name/person.csv"
+        ]
+        assert len(result) == len(csv_file_name_mapping)
+
+    @patch("utils.google_cloud.os")
     @patch("utils.google_cloud.rmtree")
     @patch("utils.google_cloud.transfer_manager")
     @patch("utils.google_cloud.Client")
     def test_download_csv_data_raise_error_and_delete_files(
-        self, mock_client, mock_transfer_manager, mock_rmtree
+        self, mock_client, mock_transfer_manager, mock_rmtree, mock_os
     ):
         mock_transfer_manager.download_many_to_path = Mock(
-            return_value=[None] * (len(csv_file_name_mapping) - 1)
-            + [Exception("Failed to download")]
+            side_effect=[
+                [None] * (len(csv_file_name_mapping) - 1)
+                + [Exception("Failed to download")],
+                [Exception("Failed to download")],
+                [Exception("Failed to download")],
+            ]
         )
+        mock_os.path.getsize.return_value = 1024
+        mock_os.path.getmtime.return_value = 0
 
         mock_bucket = Mock(return_value="mock_bucket")
         mock_storage_client = Mock(bucket=mock_bucket)
@@ -158,16 +225,19 @@ class GoogleCloudTestCase(TestCase):
 
         mock_client.assert_called()
         mock_bucket.assert_called_with("bucket_name")
+        assert mock_transfer_manager.download_many_to_path.call_count == 3
         mock_transfer_manager.download_many_to_path.assert_called_with(
             "mock_bucket",
-            [
-                f"{folder_name}/{csv_file_name_mapping[model]}"
-                for model in csv_file_name_mapping
-            ],
+            [f"{folder_name}/person.csv"],
             destination_directory=settings.CSV_DATA_PATH,
+            download_kwargs={"checksum": "crc32c"},
+            worker_type=mock_transfer_manager.THREAD,
+            max_workers=8,
         )
 
-        mock_rmtree.assert_called_with(f"{settings.CSV_DATA_PATH}/{folder_name}")
+        mock_rmtree.assert_called_with(
+            f"{settings.CSV_DATA_PATH}/{folder_name}", ignore_errors=True
+        )
 
     @patch("utils.google_cloud.os")
     @patch("utils.google_cloud.rmtree")
@@ -244,3 +314,50 @@ class GoogleCloudTestCase(TestCase):
         mock_os.makedirs.assert_called_with(f"{settings.CSV_DATA_PATH}/test_folder")
         mock_blob.assert_called_once()
         mock_rmtree.assert_called_with(f"{settings.CSV_DATA_PATH}/test_folder")
+
+    @patch("utils.google_cloud.Client")
+    def test_get_csv_files_metadata(self, mock_client):
+        def get_blob(name):
+            if name == "test_folder/person.csv":
+                return None
+            return Mock(md5_hash=f"{name}-md5", crc32c=f"{name}-crc32c")
+
+        mock_bucket = Mock(return_value=Mock(get_blob=get_blob))
+        mock_client.return_value = Mock(bucket=mock_bucket)
+
+        google_cloud_service = GoogleCloudService("bucket_name")
+        result = google_cloud_service.get_csv_files_metadata("test_folder")
+
+        assert len(result) == len(csv_file_name_mapping) - 1
+        assert result["officer"] == {
+            "file_md5": "test_folder/personnel.csv-md5",
+            "file_crc32c": "test_folder/personnel.csv-crc32c",
+        }
+
+    @patch("utils.google_cloud.os")
+    @patch("utils.google_cloud.rmtree")
+    @patch("utils.google_cloud.Client")
+    def test_download_csv_data_sequentially_with_model_names(
+        self, mock_client, mock_rmtree, mock_os
+    ):
+        mock_os.path.exists.return_value = True
+
+        mock_download_to_filename = Mock()
+        mock_blob = Mock(
+            return_value=Mock(download_to_filename=mock_download_to_filename)
+        )
+        mock_bucket = Mock(return_value=Mock(blob=mock_blob))
+        mock_client.return_value = Mock(bucket=mock_bucket)
+
+        google_cloud_service = GoogleCloudService("bucket_name")
+        result = google_cloud_service.download_csv_data_sequentially(
+            "test_folder", ["officer"]
+        )
+
+        mock_blob.assert_called_once_with("test_folder/personnel.csv")
+        mock_download_to_filename.assert_called_once_with(
+            f"{settings.CSV_DATA_PATH}/test_folder/personnel.csv"
+        )
+        assert result == {
+            "officer": f"{settings.CSV_DATA_PATH}/test_folder/personnel.csv"
+        }
@@ -16,6 +16,7 @@ from utils.constants import (
 from utils.image_generator import (
     generate_dot_img,
     generate_from_blob,
+    generate_from_file,
     generate_map_thumbnail,
 )
 
@@ -63,6 +64,31 @@ class ImageGeneratorTestCase(TestCase):
 
         assert image_generated is None
 
+    @patch("utils.image_generator.Image")
+    def test_generate_from_file(self, mock_image):
+        mock_sample = Mock()
+        mock_make_blob = Mock(return_value="returned_blob")
+        mock_image.return_value = Mock(
+            __enter__=Mock(
+                return_value=Mock(sample=mock_sample, make_blob=mock_make_blob)
+            ),
+            __exit__=Mock(),
+        )
+
+        image_generated = generate_from_file("/tmp/file.pdf")
+
+        mock_image.assert_called_with(filename="/tmp/file.pdf[0]", resolution=100)
+        mock_sample.assert_called_with(850, 1100)
+        mock_make_blob.assert_called_with("jpeg")
+
+        assert image_generated == "returned_blob"
+
+    @patch("utils.image_generator.Image")
+    def test_generate_from_file_fail(self, mock_image):
+        mock_image.side_effect = Exception("any error")
+
+        assert generate_from_file("/tmp/file.pdf") is None
+
     @patch("PIL.Image.new")
     @patch("PIL.ImageDraw.Draw")
     def test_generate_dot_img(self, mock_draw, mock_new_image):
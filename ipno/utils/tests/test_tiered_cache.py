@@ -0,0 +1,212 @@
+from django.test.testcases import TestCase
+
+from freezegun import freeze_time
+from mock import Mock, patch
+
+from utils.tiered_cache import (
+    LocalLRUCache,
+    TieredCache,
+    create_redis_client,
+    dumps,
+    loads,
+)
+
+
+class LocalLRUCacheTestCase(TestCase):
+    def test_evict_least_recently_used(self):
+        local_cache = LocalLRUCache(max_bytes=30, timeout=10)
+
+        local_cache.set("key-1", b"value-1")
+        local_cache.set("key-2", b"value-2")
+        assert local_cache.get("key-1") == b"value-1"
+
+        local_cache.set("key-3", b"value-3")
+
+        assert local_cache.get("key-1") == b"value-1"
+        assert local_cache.get("key-2") is None
+        assert local_cache.get("key-3") == b"value-3"
+        assert local_cache.size == 24
+
+    def test_skip_larger_than_max_bytes(self):
+        local_cache = LocalLRUCache(max_bytes=10, timeout=10)
+
+        local_cache.set("key-1", b"value-1")
+
+        assert local_cache.get("key-1") is None
+        assert local_cache.size == 0
+
+    def test_expire(self):
+        local_cache = LocalLRUCache(max_bytes=100, timeout=10)
+
+        with freeze_time("2022-01-01 00:00:00", tick=False) as frozen_time:
+            local_cache.set("key-1", b"value-1")
+            local_cache.set("key-2", b"value-2", timeout=2)
+
+            frozen_time.tick(5)
+            assert local_cache.get("key-1") == b"value-1"
+            assert local_cache.get("key-2") is None
+
+            frozen_time.tick(10)
+            assert local_cache.get("key-1") is None
+            assert local_cache.size == 0
+
+    def test_delete_and_clear(self):
+        local_cache = LocalLRUCache(max_bytes=100, timeout=10)
+        local_cache.set("key-1", b"value-1")
+        local_cache.set("key-2", b"value-2")
+
+        local_cache.delete("key-1")
+        assert local_cache.get("key-1") is None
+        assert local_cache.size == 12
+
+        local_cache.clear()
+        assert local_cache.get("key-2") is None
+        assert local_cache.size == 0
+
+
+class CreateRedisClientTestCase(TestCase):
+    def test_create_redis_client(self):
+        client = create_redis_client("redis://redis:6379/1", {})
+
+        assert client.connection_pool.connection_kwargs["host"] == "redis"
+        assert client.connection_pool.connection_kwargs["db"] == 1
+
+    def test_create_redis_client_with_db_option(self):
+        client = create_redis_client("redis://redis:6379/1?db=3", {"DB": 2})
+
+        assert client.connection_pool.connection_kwargs["host"] == "redis"
+        assert client.connection_pool.connection_kwargs["db"] == 2
+
+
+class TieredCacheTestCase(TestCase):
+    def setUp(self):
+        self.client = Mock()
+        patch(
+            "utils.tiered_cache.create_redis_client", return_value=self.client
+        ).start()
+        self.cache = TieredCache(
+            "redis://redis:6379",
+            {"KEY_PREFIX": "ipno", "OPTIONS": {"LOCAL_MAX_BYTES": 1024}},
+        )
+
+    def tearDown(self):
+        patch.stopall()
+
+    def test_serialisation(self):
+        assert dumps(b"content") == b"bcontent"
+        assert loads(dumps(b"content")) == b"content"
+        assert loads(dumps({"officers": [1, 2]})) == {"officers": [1, 2]}
+        assert dumps(12) == b"12"
+        assert loads(dumps(12)) == 12
+        assert loads(dumps(True)) is True
+
+    def test_set_and_get(self):
+        self.cache.set("key", b"content", timeout=60)
+
+        self.client.set.assert_called_with(
+            "ipno:1:key", b"bcontent", px=60000, nx=False
+        )
+        assert self.cache.get("key") == b"content"
+        self.client.get.assert_not_called()
+
+    def test_get_from_redis(self):
+        self.client.get.return_value = dumps({"id": 1})
+
+        assert self.cache.get("key") == {"id": 1}
+        assert self.cache.get("key") == {"id": 1}
+
+        self.client.get.assert_called_once_with("ipno:1:key")
+
+    def test_get_missing(self):
+        self.client.get.return_value = None
+
+        assert self.cache.get("key", "default") == "default"
+
+    def test_get_many(self):
+        self.cache.set("key-1", "value-1")
+        self.client.mget.return_value = [dumps("value-2"), None]
+
+        assert self.cache.get_many(["key-1", "key-2", "key-3"]) == {
+            "key-1": "value-1",
+            "key-2": "value-2",
+        }
+        self.client.mget.assert_called_with(["ipno:1:key-2", "ipno:1:key-3"])
+
+    def test_set_many(self):
+        pipeline = self.client.pipeline.return_value
+
+        self.cache.set_many({"key-1": b"content", "key-2": 2}, timeout=60)
+
+        self.client.pipeline.assert_called_with(transaction=False)
+        pipeline.set.assert_any_call("ipno:1:key-1", b"bcontent", px=60000)
+        pipeline.set.assert_any_call("ipno:1:key-2", b"2", px=60000)
+        pipeline.execute.assert_called_once()
+        assert self.cache.get_many(["key-1", "key-2"]) == {
+            "key-1": b"content",
+            "key-2": 2,
+        }
+        self.client.mget.assert_not_called()
+
+    def test_add_to_set(self):
+        pipeline = self.client.pipeline.return_value
+
+        self.cache.add_to_set("key", ["member-1", "member-2"], timeout=60)
+
+        self.client.pipeline.assert_called_with(transaction=True)
+        pipeline.sadd.assert_called_with("ipno:1:key", b"member-1", b"member-2")
+        pipeline.pexpire.assert_called_with("ipno:1:key", 60000)
+        pipeline.execute.assert_called_once()
+
+    def test_get_sets(self):
+        pipeline = self.client.pipeline.return_value
+        pipeline.execute.return_value = [{b"member-1", b"member-2"}, set()]
+
+        assert self.cache.get_sets(["key-1", "key-2"]) == {
+            "key-1": {"member-1", "member-2"}
+        }
+        pipeline.smembers.assert_any_call("ipno:1:key-1")
+        pipeline.smembers.assert_any_call("ipno:1:key-2")
+
+    def test_incr(self):
+        self.cache.set("key", 1)
+        self.client.exists.return_value = True
+        self.client.incrby.return_value = 3
+
+        assert self.cache.incr("key", 2) == 3
+
+        self.client.incrby.assert_called_with("ipno:1:key", 2)
+        assert self.cache.local.get("ipno:1:key") is None
+
+    def test_incr_missing(self):
+        self.client.exists.return_value = False
+
+        with self.assertRaises(ValueError):
+            self.cache.incr("key")
+
+        self.client.incrby.assert_not_called()
+
+    def test_add_existing_key(self):
+        self.client.set.return_value = None
+
+        assert not self.cache.add("key", "value")
+        self.client.get.return_value = None
+        assert self.cache.get("key") is None
+
+    def test_delete(self):
+        self.cache.set("key", "value")
+
+        self.cache.delete("key")
+
+        self.client.delete.assert_called_with("ipno:1:key")
+        self.client.get.return_value = None
+        assert self.cache.get("key") is None
+
+    def test_clear(self):
+        self.cache.set("key", "value")
+        self.client.scan_iter.return_value = iter([b"ipno:1:key", b"ipno:1:other"])
+
+        self.cache.clear()
+
+        self.client.scan_iter.assert_called_with(match="ipno:*", count=1000)
+        self.client.delete.assert_called_with(b"ipno:1:key", b"ipno:1:other")
+        assert self.cache.local.size == 0
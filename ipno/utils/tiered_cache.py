@@ -0,0 +1,357 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+import redis
+from redis.sentinel import Sentinel
+
+RAW_BYTES_MARKER = b"b"
+PICKLE_MARKER = b"p"
+
+DEFAULT_LOCAL_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_LOCAL_TIMEOUT = 10
+CLEAR_BATCH_SIZE = 1000
+
+
+def dumps(value):
+    # Bytes, like the cached response payloads, are stored as they are
+    if isinstance(value, bytes):
+        return RAW_BYTES_MARKER + value
+
+    # Integers are stored as their digits, to be incremented by Redis
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value).encode()
+
+    return PICKLE_MARKER + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    if data[:1] == RAW_BYTES_MARKER:
+        return data[1:]
+
+    if data[:1] == PICKLE_MARKER:
+        return pickle.loads(data[1:])
+
+    return int(data)
+
+
+class LocalLRUCache:
+    """An in-process cache of serialised values bounded by their total size.
+
+    The least recently used entries are evicted once the size of the entries
+    goes over `max_bytes`, entries larger than `max_bytes` are not kept.
+    """
+
+    def __init__(self, max_bytes, timeout):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _pop(self, key):
+        _, data = self.entries.pop(key)
+        self.size -= len(key) + len(data)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, timeout=None):
+        """Keep the data for `timeout` seconds at most, if set."""
+        entry_size = len(key) + len(data)
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+
+        with self.lock:
+            if key in self.entries:
+                self._pop(key)
+
+            if entry_size > self.max_bytes or timeout <= 0:
+                return
+
+            self.entries[key] = (time.monotonic() + timeout, data)
+            self.size += entry_size
+
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def create_redis_client(location, options):
+    """Connect to a Redis URL, or to the master of `sentinel://` URLs.
+
+    Sentinel URLs are separated by semicolons, as for the Celery broker.
+    """
+    db = options.get("DB")
+
+    if not location.startswith("sentinel://"):
+        if db is not None:
+            # The database of the URL would take priority over the option
+            url = urlparse(location)
+            query = urlencode(
+                [(key, value) for key, value in parse_qsl(url.query) if key != "db"]
+            )
+            location = url._replace(path=f"/{db}", query=query).geturl()
+
+        return redis.Redis.from_url(location)
+
+    urls = [urlparse(url) for url in location.split(";") if url]
+    sentinel = Sentinel(
+        [(url.hostname, url.port or 26379) for url in urls],
+        sentinel_kwargs=options.get("SENTINEL_KWARGS"),
+        password=urls[0].password,
+    )
+
+    return sentinel.master_for(options["SENTINEL_MASTER_NAME"], db=db or 0)
+
+
+class TieredCache(BaseCache):
+    """A cache backend keeping recently used entries in process, before Redis.
+
+    Entries are read from the process memory when they are there, and from
+    Redis otherwise. Each process keeps its copy of an entry for `LOCAL_TIMEOUT`
+    seconds at most, so that the entries deleted or replaced by the other
+    processes are not served for longer than that.
+
+    Options:
+        LOCAL_MAX_BYTES: size of the entries kept in process memory.
+        LOCAL_TIMEOUT: seconds an entry is kept in process memory.
+        DB: Redis database number.
+        SENTINEL_MASTER_NAME, SENTINEL_KWARGS: for `sentinel://` locations.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+        options = params.get("OPTIONS", {})
+        self.location = location
+        self.options = options
+        self.local = LocalLRUCache(
+            options.get("LOCAL_MAX_BYTES", DEFAULT_LOCAL_MAX_BYTES),
+            options.get("LOCAL_TIMEOUT", DEFAULT_LOCAL_TIMEOUT),
+        )
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_redis_client(self.location, self.options)
+
+        return self._client
+
+    def _make_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        return key
+
+    def _get_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+
+        return timeout
+
+    def _get_px(self, timeout):
+        return None if timeout is None else int(timeout * 1000)
+
+    def _set(self, key, value, timeout, nx=False):
+        timeout = self._get_timeout(timeout)
+
+        if timeout is not None and timeout <= 0:
+            self.delete_key(key)
+            return False
+
+        data = dumps(value)
+        stored = self.client.set(key, data, px=self._get_px(timeout), nx=nx)
+
+        if stored:
+            self.local.set(key, data, timeout)
+        else:
+            self.local.delete(key)
+
+        return bool(stored)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._make_key(key, version), value, timeout, nx=True)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._make_key(key, version), value, timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self._make_key(key, version)
+        data = self.local.get(key)
+
+        if data is None:
+            data = self.client.get(key)
+
+            if data is None:
+                return default
+
+            self.local.set(key, data)
+
+        return loads(data)
+
+    def get_many(self, keys, version=None):
+        keys_mapping = {self._make_key(key, version): key for key in keys}
+        result = {}
+        missing_keys = []
+
+        for key in keys_mapping:
+            data = self.local.get(key)
+
+            if data is None:
+                missing_keys.append(key)
+            else:
+                result[keys_mapping[key]] = loads(data)
+
+        if missing_keys:
+            for key, data in zip(missing_keys, self.client.mget(missing_keys)):
+                if data is not None:
+                    self.local.set(key, data)
+                    result[keys_mapping[key]] = loads(data)
+
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Set the entries in a single round trip to Redis."""
+        timeout = self._get_timeout(timeout)
+
+        if timeout is not None and timeout <= 0:
+            self.delete_many(list(data), version=version)
+            return []
+
+        keys_data = {
+            self._make_key(key, version): dumps(value) for key, value in data.items()
+        }
+        pipeline = self.client.pipeline(transaction=False)
+
+        for key, key_data in keys_data.items():
+            pipeline.set(key, key_data, px=self._get_px(timeout))
+
+        pipeline.execute()
+
+        for key, key_data in keys_data.items():
+            self.local.set(key, key_data, timeout)
+
+        return []
+
+    def incr(self, key, delta=1, version=None):
+        """Increment the integer value of an entry in Redis.
+
+        The other processes keep their copies of the previous value for
+        `LOCAL_TIMEOUT` seconds at most.
+        """
+        key = self._make_key(key, version)
+        self.local.delete(key)
+
+        if not self.client.exists(key):
+            raise ValueError(f"Key '{key}' not found")
+
+        return self.client.incrby(key, delta)
+
+    def add_to_set(self, key, members, timeout=DEFAULT_TIMEOUT, version=None):
+        """Add string members to a Redis set and extend its expiry, atomically.
+
+        Sets are only kept in Redis, concurrent additions are all kept.
+        """
+        key = self._make_key(key, version)
+        timeout = self._get_timeout(timeout)
+        pipeline = self.client.pipeline(transaction=True)
+
+        pipeline.sadd(key, *[member.encode() for member in members])
+
+        if timeout is None:
+            pipeline.persist(key)
+        else:
+            pipeline.pexpire(key, self._get_px(timeout))
+
+        pipeline.execute()
+
+    def get_sets(self, keys, version=None):
+        """Get the members of the non empty Redis sets in a single round trip."""
+        keys_mapping = {self._make_key(key, version): key for key in keys}
+        pipeline = self.client.pipeline(transaction=False)
+
+        for key in keys_mapping:
+            pipeline.smembers(key)
+
+        return {
+            keys_mapping[key]: {member.decode() for member in members}
+            for key, members in zip(keys_mapping, pipeline.execute())
+            if members
+        }
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._make_key(key, version)
+        timeout = self._get_timeout(timeout)
+
+        if timeout is None:
+            return bool(self.client.persist(key))
+
+        return bool(self.client.pexpire(key, int(timeout * 1000)))
+
+    def delete_key(self, key):
+        self.local.delete(key)
+
+        return bool(self.client.delete(key))
+
+    def delete(self, key, version=None):
+        return self.delete_key(self._make_key(key, version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._make_key(key, version) for key in keys]
+
+        for key in keys:
+            self.local.delete(key)
+
+        if keys:
+            self.client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        key = self._make_key(key, version)
+
+        return self.local.get(key) is not None or bool(self.client.exists(key))
+
+    def clear(self):
+        """Delete the entries of this cache's key prefix only.
+
+        The Redis database can be shared, with Celery for instance.
+        """
+        self.local.clear()
+
+        pattern = f"{self.key_prefix}:*" if self.key_prefix else "*"
+        keys = []
+
+        for key in self.client.scan_iter(match=pattern, count=CLEAR_BATCH_SIZE):
+            keys.append(key)
+
+            if len(keys) >= CLEAR_BATCH_SIZE:
+                self.client.delete(*keys)
+                keys = []
+
+        if keys:
+            self.client.delete(*keys)